@@ -1,7 +1,50 @@
+import os
+import sys
+
 import src._mocapToRig as mr
 import src.moctor as moctor
+import src.sceneindex as sceneindex
+
+# reload the modules on every import of the package only while developing,
+# set MOCTOR_DEV=1 or call reloadModules(force=True)
+DEV_MODE = os.environ.get('MOCTOR_DEV', '') not in ('', '0')
+
+# the modules of src, a module after the ones it imports
+MODULES = ('profiling', 'lazy', 'names', 'diskcache', 'mappings',
+           'sceneindex', 'suspend', 'bakecurves', 'pose', 'solver',
+           'mocapfile', 'bake', 'animfile', 'preprocess', 'qc', 'moctor',
+           'batch', 'shard', 'incremental', 'live', '_mocapToRig')
+
+try:
+    reload
+except NameError:
+    from importlib import reload
+
+
+def exportModule(module):
+    ''' What ``from module import *`` binds, bound again in this package '''
+    names = getattr(module, '__all__', None) or [
+        name for name in dir(module) if not name.startswith('_')]
+    globals().update((name, getattr(module, name)) for name in names)
+
+
+def reloadModules(force=False):
+    ''' Reload the modules of src that are loaded, in MODULES order, and
+    export the legacy functions again '''
+    global mr, moctor, sceneindex
+    if not (DEV_MODE or force):
+        return
+    # the callbacks of the indices would outlive them
+    sceneindex.clear()
+    for name in MODULES:
+        module = sys.modules.get('src.' + name)
+        if module is not None:
+            reload(module)
+    sceneindex = sys.modules['src.sceneindex']
+    mr = sys.modules['src._mocapToRig']
+    moctor = sys.modules['src.moctor']
+    exportModule(mr)
 
-reload(mr)
-reload(moctor)
 
-from src._mocapToRig import *
+reloadModules()
+exportModule(mr)
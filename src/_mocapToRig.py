@@ -4,10 +4,13 @@ Created on Mar 19, 2018
 @author: qurban.ali
 '''
 import pymel.core as pc
-import re
-import cui
 import os.path as osp
-import qtify_maya_window as qtfy
+
+from .lazy import LazyModule, evalMel, requires
+from .names import allocator
+
+cui = LazyModule('cui')
+qtfy = LazyModule('qtify_maya_window')
 
 melProcedure = '''
 global proc hikUpdateCurrentSourceFromName(string $source)
@@ -101,8 +104,6 @@ global proc hikUpdateCurrentSourceFromName(string $source)
 
 '''
 
-pc.mel.eval(melProcedure)
-
 mocapSkeletonMappings = {
     'Hip': 1,
     'LThigh': 2,
@@ -190,26 +191,20 @@ def getRigControls(namespace):
 
 
 def getUniqueName(name):
-    cnt = 1
-    while pc.objExists(name):
-        match = re.search('\d+', name)
-        if match:
-            name = name.replace(match.group(), str(cnt))
-        else:
-            name += str(cnt)
-        cnt += 1
-    return name
+    return allocator.allocate(name, reserve=False)[0]
 
 
 def createHikDefinition():
-    hikDefinitionName = getUniqueName('Character1')
+    hikDefinitionName = allocator.allocate('Character1')[0]
     pc.mel.hikCreateCharacter(hikDefinitionName)
     pc.mel.hikUpdateCharacterList()  # update the character list
     pc.mel.hikSelectDefinitionTab()  # select and update appropriate tab
     return hikDefinitionName
 
 
+@requires(plugins=('fbxmaya', 'mayaHIK'))
 def applyMocapToRig(mocapPath=None):
+    evalMel(melProcedure)
     pc.mel.HIKCharacterControlsTool()
     startFrame = 0
     pc.playbackOptions(minTime=startFrame)
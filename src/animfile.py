@@ -0,0 +1,238 @@
+'''
+Created on Oct 18, 2026
+
+Compact files of baked animation for handing a retarget to the farm without
+the rig scene.
+
+A file is a directory holding the baked channels of the controls of a rig
+mapping as columns of one float32 array over a shared time base::
+
+    take.anim/
+        header.json     controls and channels of the columns, units, source
+        times.npy       (frames,) float64 scene frames
+        values.npy      (channels, frames) float32, internal units
+
+Every channel is a contiguous row of ``values.npy`` so that :func:`read` can
+memory map the file and a reader only pages in the channels it uses. The
+controls are stored without their namespace and :func:`applyAnimation`
+writes the channels back onto whichever reference of the rig is asked for::
+
+    animfile.exportAnimation('rig:', 'AdvancedSkeleton', 'take.anim')
+    animfile.applyAnimation('crowd07:', 'take.anim')
+
+Nothing but the export and apply functions needs maya.
+'''
+
+import os
+import os.path as osp
+import json
+
+import numpy as np
+
+from . import bakecurves as bc
+
+
+VERSION = 1
+
+HEADER = 'header.json'
+TIMES = 'times.npy'
+VALUES = 'values.npy'
+
+
+class AnimData(object):
+    ''' Baked channels of controls over one time base
+
+    :param channels: [(control, channel)] in the row order of values
+    :param values: (channels, frames) array in internal units, radians for
+        rotations
+    '''
+
+    def __init__(self, times, channels, values, fps=None, source=None):
+        self.times = np.asarray(times, dtype=np.float64)
+        self.channels = [tuple(channel) for channel in channels]
+        self.values = values
+        self.fps = fps
+        self.source = source or {}
+        if self.values.shape != (len(self.channels), len(self.times)):
+            raise ValueError('expected values of shape (%d, %d), got %r' % (
+                len(self.channels), len(self.times), self.values.shape))
+
+    def __len__(self):
+        return len(self.times)
+
+    @property
+    def controls(self):
+        ''' The controls in the order they first appear '''
+        seen = set()
+        return [control for control, _ in self.channels
+                if not (control in seen or seen.add(control))]
+
+    def column(self, control, channel):
+        ''' Values of one channel, read from disk when mapped '''
+        return self.values[self.channels.index((control, channel))]
+
+    def curves(self, namespace=''):
+        ''' :class:`bakecurves.BakedCurve` per channel, controls in
+        namespace, sharing one times array '''
+        return [bc.BakedCurve(namespace + control, channel, self.times,
+                              np.asarray(self.values[idx], dtype=np.float64))
+                for idx, (control, channel) in enumerate(self.channels)]
+
+    def __repr__(self):
+        return 'AnimData(%d channels, %d frames)' % (
+            len(self.channels), len(self.times))
+
+
+def write(path, anim):
+    ''' Write anim as a directory at path, replacing the files of an older
+    one '''
+    if not osp.isdir(path):
+        os.makedirs(path)
+    np.save(osp.join(path, TIMES), anim.times)
+    np.save(osp.join(path, VALUES),
+            np.ascontiguousarray(anim.values, dtype=np.float32))
+    header = {
+        'version': VERSION,
+        'frames': len(anim.times),
+        'fps': anim.fps,
+        'channels': [list(channel) for channel in anim.channels],
+        'source': anim.source}
+    with open(osp.join(path, HEADER), 'w+') as _file:
+        json.dump(header, _file, indent=1)
+    return path
+
+
+def read(path, mmap=True):
+    ''' The :class:`AnimData` of a file, its values memory mapped unless
+    mmap is False '''
+    with open(osp.join(path, HEADER)) as _file:
+        header = json.load(_file)
+    if header.get('version', 0) > VERSION:
+        raise ValueError('%s is version %s, only %d can be read' % (
+            path, header['version'], VERSION))
+    values = np.load(osp.join(path, VALUES), mmap_mode='r' if mmap else None)
+    return AnimData(np.load(osp.join(path, TIMES)), header['channels'],
+                    values, header.get('fps'), header.get('source'))
+
+
+def resample(times, keyTimes, keyValues):
+    ''' Values of a curve at times from its keys, linear between keys and
+    held past the ends '''
+    if len(keyTimes) == len(times) and np.array_equal(keyTimes, times):
+        return keyValues
+    return np.interp(times, keyTimes, keyValues)
+
+
+def collect(keys, timeBase=None, dtype=np.float32):
+    ''' Line up the keys of curves on one time base
+
+    :param keys: [(times, values)] per channel
+    :param timeBase: times to sample at, all the key times by default
+    :return: times and (channels, frames) values of dtype
+    '''
+    if timeBase is None:
+        timeBase = np.unique(np.concatenate(
+            [np.asarray(times, dtype=np.float64) for times, _ in keys]
+            or [np.zeros(0)]))
+    timeBase = np.asarray(timeBase, dtype=np.float64)
+    values = np.empty((len(keys), len(timeBase)), dtype=dtype)
+    for row, (times, curveValues) in enumerate(keys):
+        values[row] = resample(timeBase, times, curveValues)
+    return timeBase, values
+
+
+##########
+#  Maya  #
+##########
+
+
+def readAnimation(controls, channels=bc.CHANNELS, timeBase=None,
+                  namespace=''):
+    ''' :class:`AnimData` of the animCurves on the channels of controls,
+    namespace stripped from their names
+
+    Channels without an animCurve are left out. Every curve is read with one
+    keyframe query, curves not keyed on the whole time base, as left by
+    :func:`bake.reduceControls`, are evaluated on it through their tangents.
+    '''
+    import maya.api.OpenMaya as om
+    from . import bake
+
+    pairs, plugs = bake.getPlugs(controls, channels)
+    found, curves, keys = [], [], []
+    for (control, channel), plug in zip(pairs, plugs):
+        animCurve = bake.getAnimCurve(plug)
+        if animCurve is None:
+            continue
+        times, values = bake.getCurveKeys(
+                om.MFnDependencyNode(animCurve).name())
+        if not len(times):
+            continue
+        if namespace and control.startswith(namespace):
+            control = control[len(namespace):]
+        found.append((control, channel))
+        curves.append(animCurve)
+        keys.append((times, bake.toInternal(
+            values, bc.isRotateChannel(channel))))
+    times, values = collect(keys, timeBase)
+    for row, ((keyTimes, _), animCurve) in enumerate(zip(keys, curves)):
+        if not (len(keyTimes) == len(times) and
+                np.array_equal(keyTimes, times)):
+            values[row] = bake.evaluateCurve(animCurve, times)
+    return AnimData(times, found, values)
+
+
+def exportAnimation(namespace, rigMapping, path, channels=bc.CHANNELS,
+                    timeBase=None):
+    ''' Write the baked channels of the controls of the cr mapping of a rig
+    in namespace to path
+
+    :return: the :class:`AnimData` written
+    '''
+    import pymel.core as pc
+    from .mappings import MappingTypes, loadMapping
+
+    if namespace and not namespace.endswith(':'):
+        namespace += ':'
+    controls = [namespace + control for control in
+                loadMapping(rigMapping, MappingTypes.cr).keys()]
+    anim = readAnimation(controls, channels, timeBase, namespace)
+    anim.fps = pc.mel.currentTimeUnitToFPS()
+    anim.source = {'namespace': namespace, 'rigMapping': rigMapping,
+                   'scene': str(pc.sceneName())}
+    write(path, anim)
+    return anim
+
+
+def applyAnimation(namespace, path, preserveOutsideKeys=True,
+                   evaluation=None):
+    ''' Write the channels of a file onto the controls of a rig in namespace
+
+    Channels the rig does not have, or has locked, are skipped with a
+    warning.
+
+    :return: names of the animCurves written
+    '''
+    import pymel.core as pc
+    from . import bake
+    from .suspend import suspended
+
+    if namespace and not namespace.endswith(':'):
+        namespace += ':'
+    anim = read(path)
+    curves = anim.curves(namespace)
+    pairs, plugs = bake.getPlugs(
+            [namespace + control for control in anim.controls],
+            sorted(set(channel for _, channel in anim.channels)),
+            drivenOnly=False)
+    plugIndex = dict(zip(pairs, plugs))
+    found = [curve for curve in curves
+             if (curve.node, curve.channel) in plugIndex]
+    if len(found) < len(curves):
+        pc.warning('%d channels of %s not found on %s' % (
+            len(curves) - len(found), path, namespace or 'the rig'))
+    with suspended('applyAnimation', undo='off',
+                   evaluation=evaluation):
+        return bake.writeCurves(
+                found, [plugIndex[(curve.node, curve.channel)]
+                        for curve in found], preserveOutsideKeys)
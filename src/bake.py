@@ -0,0 +1,566 @@
+'''
+Created on Oct 18, 2026
+
+Maya adapter of the bulk bake engine. The retargeted plugs of the controls are
+sampled for the whole range through DG context evaluation, turned into curves
+by :mod:`bakecurves` and written with one ``MFnAnimCurve.addKeys`` call per
+curve instead of stepping the scene and keying frame by frame as
+``bakeResults -simulation true`` does.
+'''
+
+import time
+
+import numpy as np
+import pymel.core as pc
+import maya.api.OpenMaya as om
+import maya.api.OpenMayaAnim as oma
+
+from . import bakecurves as bc
+from .suspend import undoOff
+
+
+def getPlug(node, channel):
+    sel = om.MSelectionList()
+    sel.add('%s.%s' % (node, channel))
+    return sel.getPlug(0)
+
+
+def getPlugs(controls, channels=bc.CHANNELS, drivenOnly=True):
+    ''' Bakeable channels of controls as [(node, channel)] and [MPlug]
+
+    Locked and non keyable channels are skipped, as are channels with no
+    incoming connection unless ``drivenOnly`` is False '''
+    pairs, plugs = [], []
+    for ctrl in controls:
+        sel = om.MSelectionList()
+        try:
+            sel.add(ctrl)
+        except RuntimeError:
+            pc.warning('Object %s not found' % ctrl)
+            continue
+        depNode = om.MFnDependencyNode(sel.getDependNode(0))
+        for channel in channels:
+            try:
+                plug = depNode.findPlug(channel, False)
+            except RuntimeError:
+                continue
+            if plug.isLocked or not plug.isKeyable:
+                continue
+            if drivenOnly and not plug.isDestination:
+                continue
+            pairs.append((ctrl, channel))
+            plugs.append(plug)
+    return pairs, plugs
+
+
+def evaluatePlugs(plugs, mtime):
+    ''' Values of plugs at mtime in internal units, without changing the
+    current time '''
+    context = om.MDGContext(mtime)
+    if hasattr(context, 'makeCurrent'):
+        previous = context.makeCurrent()
+        try:
+            return [plug.asDouble() for plug in plugs]
+        finally:
+            previous.makeCurrent()
+    return [plug.asDouble(context) for plug in plugs]
+
+
+def samplePlugs(plugs, times, simulation=False):
+    ''' Sample plugs over times into a (frames, plugs) array
+
+    :param simulation: step the current time through the range and read the
+        plugs at each step, for setups that need sequential evaluation
+    '''
+    samples = np.empty((len(times), len(plugs)), dtype=np.float64)
+    unit = om.MTime.uiUnit()
+    currentTime = oma.MAnimControl.currentTime()
+    try:
+        for row, frame in enumerate(times):
+            mtime = om.MTime(float(frame), unit)
+            if simulation:
+                oma.MAnimControl.setCurrentTime(mtime)
+                samples[row] = [plug.asDouble() for plug in plugs]
+            else:
+                samples[row] = evaluatePlugs(plugs, mtime)
+    finally:
+        if simulation:
+            oma.MAnimControl.setCurrentTime(currentTime)
+    return samples
+
+
+def getAnimCurve(plug):
+    ''' The animCurve directly driving plug or None '''
+    source = plug.source()
+    if not source.isNull and source.node().hasFn(om.MFn.kAnimCurve):
+        return source.node()
+
+
+def getCurvesKeys(nodes, channels=bc.CHANNELS):
+    ''' Keys of the animCurves on the channels of nodes, one keyframe query a
+    curve
+
+    :return: [(node, channel)], [MPlug] and [(times, values)] in ui units of
+        the channels that have an animCurve with keys
+    '''
+    pairs, plugs = getPlugs(nodes, channels)
+    found, foundPlugs, keys = [], [], []
+    for pair, plug in zip(pairs, plugs):
+        animCurve = getAnimCurve(plug)
+        if animCurve is None:
+            continue
+        times, values = getCurveKeys(om.MFnDependencyNode(animCurve).name())
+        if not len(times):
+            continue
+        found.append(pair)
+        foundPlugs.append(plug)
+        keys.append((times, values))
+    return found, foundPlugs, keys
+
+
+def getControlCurves(controls, channels=bc.CHANNELS):
+    ''' {'node.channel': animCurve} of the channels of controls driven by an
+    animCurve '''
+    pairs, plugs = getPlugs(controls, channels)
+    curves = {}
+    for pair, plug in zip(pairs, plugs):
+        animCurve = getAnimCurve(plug)
+        if animCurve is not None:
+            curves['%s.%s' % pair] = om.MFnDependencyNode(animCurve).name()
+    return curves
+
+
+@undoOff
+def reconnectCurves(animCurves):
+    ''' Drive plugs by their animCurves again, {'node.channel': animCurve},
+    disconnecting whatever drives them now
+
+    :return: plugs reconnected
+    '''
+    modifier = om.MDGModifier()
+    reconnected = []
+    for name, animCurve in sorted(animCurves.items()):
+        sel = om.MSelectionList()
+        try:
+            sel.add(name)
+            sel.add(animCurve)
+        except RuntimeError:
+            pc.warning('Could not reconnect %s to %s' % (animCurve, name))
+            continue
+        plug = sel.getPlug(0)
+        output = om.MFnDependencyNode(sel.getDependNode(1)).findPlug(
+                'output', False)
+        source = plug.source()
+        if not source.isNull and source == output:
+            continue
+        if not source.isNull:
+            modifier.disconnect(source, plug)
+        modifier.connect(output, plug)
+        reconnected.append(name)
+    modifier.doIt()
+    return reconnected
+
+
+def evaluateCurve(animCurve, times):
+    ''' Values of an animCurve at times in internal units, through its
+    tangents '''
+    fnCurve = oma.MFnAnimCurve(animCurve)
+    unit = om.MTime.uiUnit()
+    return np.array([fnCurve.evaluate(om.MTime(float(frame), unit))
+                     for frame in times], dtype=np.float64)
+
+
+def getCurveValues(plugs, pairs, frame):
+    ''' {'node.channel': value} of the animCurves on plugs at frame, in
+    internal units '''
+    mtime = om.MTime(float(frame), om.MTime.uiUnit())
+    values = {}
+    for pair, plug in zip(pairs, plugs):
+        animCurve = getAnimCurve(plug)
+        if animCurve is not None:
+            values['%s.%s' % pair] = oma.MFnAnimCurve(animCurve).evaluate(
+                    mtime)
+    return values
+
+
+def disconnectDriver(plug):
+    source = plug.source()
+    if source.isNull:
+        return
+    modifier = om.MDGModifier()
+    modifier.disconnect(source, plug)
+    modifier.doIt()
+
+
+@undoOff
+def writeCurves(curves, plugs=None, preserveOutsideKeys=True):
+    ''' Write baked curves to animCurves on their plugs in bulk
+
+    Whatever drives a plug other than an animCurve is disconnected and
+    replaced by a new animCurve. Keys of an existing animCurve in the baked
+    range are replaced, the ones outside are kept if preserveOutsideKeys.
+    The curves are written through the API with undo off and cannot be
+    undone, see :func:`suspend.undoOff`.
+
+    :return: names of the animCurves written
+    '''
+    unit = om.MTime.uiUnit()
+    written = []
+    # curves baked together share their times, the MTimeArray is built once
+    lastTimes, times = None, None
+    for idx, curve in enumerate(curves):
+        if not len(curve):
+            continue
+        plug = plugs[idx] if plugs else getPlug(curve.node, curve.channel)
+        animCurve = getAnimCurve(plug)
+        fnCurve = oma.MFnAnimCurve()
+        keepExisting = False
+        if animCurve is None:
+            disconnectDriver(plug)
+            fnCurve.create(plug)
+        else:
+            fnCurve.setObject(animCurve)
+            if preserveOutsideKeys:
+                pc.cutKey(fnCurve.name(), clear=True, option='keys',
+                          time=(curve.times[0], curve.times[-1]))
+                keepExisting = True
+
+        if lastTimes is None or not (
+                curve.times is lastTimes or
+                np.array_equal(curve.times, lastTimes)):
+            lastTimes, times = curve.times, om.MTimeArray()
+            for frame in curve.times:
+                times.append(om.MTime(float(frame), unit))
+        fnCurve.addKeys(
+                times, om.MDoubleArray(curve.values.tolist()),
+                oma.MFnAnimCurve.kTangentGlobal,
+                oma.MFnAnimCurve.kTangentGlobal,
+                keepExisting)
+        written.append(fnCurve.name())
+    return written
+
+
+class ChunkWriter(object):
+    ''' Appends the chunks of a bake to new animCurves that stay unconnected
+    until :meth:`finish`, so that the drivers of the plugs keep driving them
+    while the later chunks are sampled '''
+
+    def __init__(self, pairs, plugs):
+        self.plugs = plugs
+        self.unit = om.MTime.uiUnit()
+        self.fnCurves = []
+        self.range = None
+        for (node, channel), plug in zip(pairs, plugs):
+            fnCurve = oma.MFnAnimCurve()
+            fnCurve.create(fnCurve.timedAnimCurveTypeForPlug(plug))
+            om.MFnDependencyNode(fnCurve.object()).setName('%s_%s' % (
+                node.split('|')[-1].replace(':', '_'), channel))
+            self.fnCurves.append(fnCurve)
+
+    def __call__(self, curves):
+        for fnCurve, curve in zip(self.fnCurves, curves):
+            times = om.MTimeArray()
+            for frame in curve.times:
+                times.append(om.MTime(float(frame), self.unit))
+            fnCurve.addKeys(
+                    times, om.MDoubleArray(curve.values.tolist()),
+                    oma.MFnAnimCurve.kTangentGlobal,
+                    oma.MFnAnimCurve.kTangentGlobal, True)
+        if curves and len(curves[0]):
+            first = curves[0].times[0] if self.range is None else (
+                    self.range[0])
+            self.range = (first, curves[0].times[-1])
+
+    def finish(self, preserveOutsideKeys=True):
+        ''' Put the baked curves on their plugs, merging them into the
+        animCurves already there if preserveOutsideKeys
+
+        :return: names of the animCurves written
+        '''
+        written = []
+        modifier = om.MDGModifier()
+        for fnCurve, plug in zip(self.fnCurves, self.plugs):
+            if self.range is None or not fnCurve.numKeys:
+                modifier.deleteNode(fnCurve.object())
+                continue
+            animCurve = getAnimCurve(plug)
+            if animCurve is not None and preserveOutsideKeys:
+                existing = oma.MFnAnimCurve(animCurve)
+                pc.cutKey(existing.name(), clear=True, option='keys',
+                          time=self.range)
+                times = om.MTimeArray()
+                values = om.MDoubleArray()
+                for idx in range(fnCurve.numKeys):
+                    times.append(fnCurve.input(idx))
+                    values.append(fnCurve.value(idx))
+                existing.addKeys(
+                        times, values, oma.MFnAnimCurve.kTangentGlobal,
+                        oma.MFnAnimCurve.kTangentGlobal, True)
+                modifier.deleteNode(fnCurve.object())
+                written.append(existing.name())
+                continue
+            source = plug.source()
+            if not source.isNull:
+                modifier.disconnect(source, plug)
+            modifier.connect(fnCurve.findPlug('output', False), plug)
+            written.append(fnCurve.name())
+        modifier.doIt()
+        self.fnCurves = []
+        return written
+
+
+class ProgressWindow(object):
+    ''' Progress callback of a chunked bake showing maya's progress window,
+    escape cancels the bake '''
+
+    def __init__(self, title='Baking'):
+        self.title = title
+        self.open = False
+
+    def __call__(self, progress):
+        if pc.about(batch=True):
+            return True
+        if not self.open:
+            pc.progressWindow(title=self.title, progress=0, maxValue=100,
+                              isInterruptable=True)
+            self.open = True
+        if pc.progressWindow(q=True, isCancelled=True):
+            self.close()
+            return False
+        eta = progress.eta
+        pc.progressWindow(
+                e=True, progress=int(100 * progress.fraction),
+                status='frame %d of %d%s' % (
+                    progress.frame, progress.endFrame,
+                    '' if eta is None else ', %ds left' % eta))
+        return True
+
+    def close(self):
+        if self.open:
+            pc.progressWindow(endProgress=True)
+            self.open = False
+
+
+@undoOff
+def bakeControls(controls, startFrame, endFrame, sampleBy=1,
+                 simulation=False, minimizeRotation=True,
+                 preserveOutsideKeys=True, channels=bc.CHANNELS,
+                 chunkSize=None, callback=None):
+    ''' Bake the driven channels of controls over a frame range in bulk
+
+    :param chunkSize: bake this many frames at a time instead of sampling
+        the whole range at once, memory then depends on the chunk size only
+    :param callback: callback(progress) after every chunk, see
+        :func:`bakecurves.bakeInChunks`, returning False cancels the bake
+        which keeps the frames baked so far. :class:`ProgressWindow` shows
+        maya's progress window.
+    :return: names of the animCurves written
+    '''
+    pairs, plugs = getPlugs(controls, channels)
+    if not plugs:
+        return []
+    times = bc.frameTimes(startFrame, endFrame, sampleBy)
+    if chunkSize is None and callback is None:
+        samples = samplePlugs(plugs, times, simulation=simulation)
+        curves = bc.buildCurves(
+                times, samples, pairs, minimizeRotation=minimizeRotation)
+        return writeCurves(curves, plugs, preserveOutsideKeys)
+
+    writer = ChunkWriter(pairs, plugs)
+    try:
+        bc.bakeInChunks(
+                times, pairs,
+                lambda chunk: samplePlugs(plugs, chunk, simulation),
+                writer, chunkSize or bc.DEFAULT_CHUNK_SIZE,
+                minimizeRotation, callback=callback)
+    finally:
+        # complete chunks are valid whether the bake finished, was
+        # cancelled or failed
+        written = writer.finish(preserveOutsideKeys)
+        close = getattr(callback, 'close', None)
+        if close is not None:
+            close()
+    return written
+
+
+@undoOff
+def spliceControls(controlWindows, sampleBy=1, animCurves=None,
+                   simulation=False, minimizeRotation=True,
+                   channels=bc.CHANNELS):
+    ''' Bake the driven channels of controls over frame windows only and
+    splice the keys into their animCurves, keeping the keys outside
+
+    Everything is sampled before anything is written, so the controls baked
+    first do not change what the others sample. The rotations of a window
+    are unrolled to continue from the curve at the frame before it.
+
+    :param controlWindows: [(controls, [(startFrame, endFrame)])], the
+        windows of a list not overlapping
+    :param animCurves: {'node.channel': animCurve} to drive the plugs again
+        before the keys are spliced, see :func:`getControlCurves`, for plugs
+        driven by something else while sampled
+    :return: names of the animCurves written
+    '''
+    sampled = []
+    for controls, windows in controlWindows:
+        pairs, plugs = getPlugs(controls, channels)
+        if not plugs or not windows:
+            continue
+        blocks = [bc.frameTimes(start, end, sampleBy)
+                  for start, end in sorted(windows)]
+        samples = samplePlugs(plugs, np.concatenate(blocks), simulation)
+        sampled.append((pairs, plugs, blocks, samples))
+    if animCurves:
+        reconnectCurves(animCurves)
+
+    written = set()
+    for pairs, plugs, blocks, samples in sampled:
+        offset = 0
+        for times in blocks:
+            references = None
+            if minimizeRotation:
+                references = getCurveValues(plugs, pairs, times[0] - sampleBy)
+            curves = bc.buildCurves(
+                    times, samples[offset:offset + len(times)], pairs,
+                    minimizeRotation=minimizeRotation, references=references)
+            offset += len(times)
+            written.update(writeCurves(curves, plugs, True))
+    return sorted(written)
+
+
+def bakeResults(controls, startFrame, endFrame, sampleBy=1):
+    ''' The bakeResults -simulation path bakeControls replaces '''
+    controls = [ctrl for ctrl in controls if pc.objExists(ctrl)]
+    if not controls:
+        return
+    pc.mel.eval((
+            'bakeResults -simulation true -t "%s:%s" -sampleBy %s '
+            '-disableImplicitControl true -preserveOutsideKeys true '
+            '-sparseAnimCurveBake false '
+            '-removeBakedAttributeFromLayer false '
+            '-removeBakedAnimFromLayer false -bakeOnOverrideLayer false '
+            '-minimizeRotation true -controlPoints false -shape true %s;') % (
+                startFrame, endFrame, sampleBy,
+                ' '.join('"%s"' % ctrl for ctrl in controls)))
+
+
+def getDrivers(controls, channels=bc.CHANNELS):
+    return dict(
+            (plug.name(), plug.source().name())
+            for plug in getPlugs(controls, channels)[1])
+
+
+def restoreDrivers(drivers):
+    ''' Reconnect the drivers recorded by getDrivers, deleting the animCurves
+    that replaced them '''
+    for dest, source in drivers.items():
+        current = pc.listConnections(dest, s=True, d=False, p=True)
+        if current and str(current[0]) == source:
+            continue
+        curves = pc.listConnections(dest, s=True, d=False, type='animCurve')
+        if curves:
+            pc.delete(curves)
+        pc.connectAttr(source, dest, f=True)
+
+
+def benchmarkBake(controls, startFrame, endFrame, sampleBy=1):
+    ''' Time bakeControls against bakeResults on the same controls and range
+
+    The drivers are reconnected after each run so that both methods start
+    from the same scene, the scene is left baked by bakeResults.
+
+    :return: {method: seconds}
+    '''
+    drivers = getDrivers(controls)
+    timings = {}
+
+    start = time.time()
+    bakeControls(controls, startFrame, endFrame, sampleBy)
+    timings['bulk'] = time.time() - start
+    restoreDrivers(drivers)
+
+    start = time.time()
+    bakeResults(controls, startFrame, endFrame, sampleBy)
+    timings['bakeResults'] = time.time() - start
+    return timings
+
+
+def getCurveKeys(animCurve):
+    ''' (times, values) of all keys of an animCurve in ui units '''
+    keys = pc.keyframe(animCurve, q=True, timeChange=True, valueChange=True)
+    keys = np.asarray(keys or [], dtype=np.float64).reshape(-1, 2)
+    return keys[:, 0], keys[:, 1]
+
+
+def toInternal(values, rotation):
+    ''' Values of a channel in ui units, degrees for rotations, in internal
+    units '''
+    if rotation:
+        return np.radians(values)
+    return np.asarray(values) * om.MDistance.uiToInternal(1.0)
+
+
+def reduceCurve(animCurve, kept, slopes, rotation=False):
+    ''' Remove the keys of animCurve that are not kept and fix the tangents
+    of the remaining ones to the original slopes (per frame, ui units) '''
+    dropped = np.nonzero(~kept)[0]
+    if len(dropped):
+        pc.cutKey(animCurve, clear=True,
+                  index=[(int(idx), int(idx)) for idx in dropped])
+
+    fps = pc.mel.currentTimeUnitToFPS()
+    slopes = toInternal(slopes[kept] * fps, rotation)
+    fnCurve = oma.MFnAnimCurve(getPlug(animCurve, 'output').node())
+    fnCurve.setIsWeighted(False)
+    for idx, slope in enumerate(slopes):
+        fnCurve.setTangentsLocked(idx, False)
+        for inTangent in (True, False):
+            fnCurve.setTangentType(
+                    idx, oma.MFnAnimCurve.kTangentFixed, inTangent)
+            fnCurve.setTangent(idx, 1.0, slope, inTangent, None, False)
+        fnCurve.setTangentsLocked(idx, True)
+
+
+def reduceControls(controls, rotationTolerance=0.05,
+                   translationTolerance=0.01, channels=bc.CHANNELS):
+    ''' Remove the keys of the baked channels of controls that are within
+    tolerance of the curve through the remaining keys
+
+    Curves with the same key times, usually all of a bake, are reduced
+    together in one vectorized batch.
+
+    :param rotationTolerance: maximum error on rotations in degrees
+    :param translationTolerance: maximum error on translations in scene units
+    :return: {control: {'before': keys, 'after': keys, 'maxError': {channel:
+        error}}}
+    '''
+    batches = {}
+    for node, channel in getPlugs(controls, channels)[0]:
+        curves = pc.listConnections(
+                '%s.%s' % (node, channel), s=True, d=False, type='animCurve')
+        if not curves:
+            continue
+        times, values = getCurveKeys(curves[0])
+        if len(times) < 3:
+            continue
+        key = (len(times), times[0], times[-1], hash(times.tobytes()))
+        batches.setdefault(key, []).append(
+                (node, channel, str(curves[0]), times, values))
+
+    report = {}
+    for batch in batches.values():
+        times = batch[0][3]
+        values = np.vstack([item[4] for item in batch])
+        rotation = np.array([bc.isRotateChannel(item[1]) for item in batch])
+        tolerance = np.where(
+                rotation, rotationTolerance, translationTolerance)
+        kept, slopes, errors = bc.reduceKeys(times, values, tolerance)
+
+        for idx, (node, channel, animCurve, _, _) in enumerate(batch):
+            reduceCurve(animCurve, kept[idx], slopes[idx], rotation[idx])
+            entry = report.setdefault(
+                    node, {'before': 0, 'after': 0, 'maxError': {}})
+            entry['before'] += len(times)
+            entry['after'] += int(kept[idx].sum())
+            entry['maxError'][channel] = float(errors[idx])
+    return report
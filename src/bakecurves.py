@@ -0,0 +1,378 @@
+'''
+Created on Oct 18, 2026
+
+Pure python / numpy core of the bulk bake engine. Nothing in here talks to
+maya, samples come in as arrays of shape (frames, plugs) and go out as
+:class:`BakedCurve` objects holding whole arrays of times and values that the
+maya adapter in :mod:`bake` writes to animCurves in one call per curve.
+
+Rotations are expected in maya's internal unit (radians) unless a different
+``period`` is given.
+'''
+
+import math
+import time
+import numpy as np
+
+
+TRANSLATE_CHANNELS = ('translateX', 'translateY', 'translateZ')
+ROTATE_CHANNELS = ('rotateX', 'rotateY', 'rotateZ')
+CHANNELS = TRANSLATE_CHANNELS + ROTATE_CHANNELS
+
+RADIANS_PERIOD = 2 * math.pi
+DEGREES_PERIOD = 360.0
+
+DEFAULT_CHUNK_SIZE = 500
+
+
+def isRotateChannel(channel):
+    return channel.split('.')[-1] in ROTATE_CHANNELS + ('rx', 'ry', 'rz')
+
+
+def frameTimes(startFrame, endFrame, sampleBy=1.0):
+    ''' Sample times from start to end, both inclusive '''
+    if sampleBy <= 0:
+        raise ValueError('sampleBy must be positive')
+    if endFrame < startFrame:
+        raise ValueError('end frame %r is before start frame %r' % (
+            endFrame, startFrame))
+    count = int(math.floor((endFrame - startFrame) / float(sampleBy) + 1e-6))
+    times = startFrame + np.arange(count + 1, dtype=np.float64) * sampleBy
+    if times[-1] < endFrame - 1e-6:
+        times = np.append(times, endFrame)
+    return times
+
+
+def unrollEuler(values, period=RADIANS_PERIOD, axis=0, reference=None):
+    ''' Shift every sample by whole turns so that it lies closest to the
+    previous one, the equivalent of bakeResults -minimizeRotation
+
+    :param reference: optional value(s) the first sample is brought close to,
+        used to keep continuity with keys baked before this block
+    '''
+    values = np.asarray(values, dtype=np.float64)
+    if not values.size:
+        return values.copy()
+    values = np.moveaxis(values, axis, 0)
+    deltas = np.diff(values, axis=0)
+    turns = np.round(deltas / period)
+    offsets = np.concatenate(
+            [np.zeros_like(values[:1]), np.cumsum(turns, axis=0)], axis=0)
+    result = values - offsets * period
+    if reference is not None:
+        first = np.round((result[:1] - np.asarray(reference)) / period)
+        result = result - first * period
+    return np.moveaxis(result, 0, axis)
+
+
+class BakedCurve(object):
+    ''' Baked keys of one plug as whole arrays of times and values '''
+
+    __slots__ = ('node', 'channel', 'times', 'values')
+
+    def __init__(self, node, channel, times, values):
+        self.node = node
+        self.channel = channel
+        self.times = np.asarray(times, dtype=np.float64)
+        self.values = np.asarray(values, dtype=np.float64)
+        if self.times.shape != self.values.shape:
+            raise ValueError('times and values of %s differ in length' %
+                             self.plug)
+
+    @property
+    def plug(self):
+        return '%s.%s' % (self.node, self.channel)
+
+    @property
+    def isRotation(self):
+        return isRotateChannel(self.channel)
+
+    def __len__(self):
+        return len(self.times)
+
+    def __repr__(self):
+        return 'BakedCurve(%r, %d keys)' % (self.plug, len(self))
+
+
+def buildCurves(times, samples, plugs, minimizeRotation=True,
+                period=RADIANS_PERIOD, references=None):
+    ''' Turn a (frames, plugs) sample block into one curve per plug
+
+    :param plugs: list of (node, channel) in the column order of samples
+    :param references: optional {plug: value} used to keep rotations
+        continuous with keys outside of the block
+    '''
+    times = np.asarray(times, dtype=np.float64)
+    samples = np.asarray(samples, dtype=np.float64)
+    if samples.ndim != 2 or samples.shape != (len(times), len(plugs)):
+        raise ValueError('expected samples of shape (%d, %d), got %r' % (
+            len(times), len(plugs), samples.shape))
+
+    if minimizeRotation:
+        rotColumns = [idx for idx, (node, channel) in enumerate(plugs)
+                      if isRotateChannel(channel)]
+        if rotColumns:
+            samples = samples.copy()
+            reference = None
+            if references:
+                reference = np.array([
+                    references.get('%s.%s' % plugs[idx], np.nan)
+                    for idx in rotColumns])
+                known = ~np.isnan(reference)
+                reference = np.where(known, reference,
+                                     samples[0, rotColumns])
+            samples[:, rotColumns] = unrollEuler(
+                    samples[:, rotColumns], period, reference=reference)
+
+    return [BakedCurve(node, channel, times, samples[:, idx])
+            for idx, (node, channel) in enumerate(plugs)]
+
+
+####################
+#  Chunked baking  #
+####################
+
+
+class Progress(object):
+    ''' How far a chunked bake got, passed to the progress callback after
+    every chunk '''
+
+    def __init__(self, total, startFrame=None, endFrame=None):
+        self.total = total
+        self.done = 0
+        self.chunks = 0
+        self.frame = startFrame
+        self.startFrame = startFrame
+        self.endFrame = endFrame
+        self.startTime = time.time()
+        self.cancelled = False
+
+    def update(self, done, frame):
+        self.done = done
+        self.frame = frame
+        self.chunks += 1
+
+    @property
+    def finished(self):
+        return self.done >= self.total
+
+    @property
+    def fraction(self):
+        return self.done / float(self.total) if self.total else 1.0
+
+    @property
+    def elapsed(self):
+        return time.time() - self.startTime
+
+    @property
+    def eta(self):
+        ''' Seconds left at the rate so far, None before the first chunk '''
+        if not self.done:
+            return None
+        return self.elapsed * (self.total - self.done) / float(self.done)
+
+    def __repr__(self):
+        eta = self.eta
+        return 'Progress(%d/%d frames, %.1fs, eta %s)' % (
+            self.done, self.total, self.elapsed,
+            '-' if eta is None else '%.1fs' % eta)
+
+
+def bakeInChunks(times, plugs, sample, write, chunkSize=DEFAULT_CHUNK_SIZE,
+                 minimizeRotation=True, period=RADIANS_PERIOD,
+                 callback=None):
+    ''' Bake a range chunk by chunk so that only one chunk of samples is held
+    at a time
+
+    Rotations are unrolled across chunk borders: the first sample of a chunk
+    is brought within half a turn of the last baked value of the previous
+    one, which gives the same curves as baking the range in one block.
+
+    :param plugs: list of (node, channel), the columns of the samples
+    :param sample: sample(times) returns a (len(times), len(plugs)) array
+    :param write: write(curves) stores the :class:`BakedCurve` of a chunk
+    :param callback: callback(progress) is called after every chunk written,
+        returning False cancels the bake, leaving the chunks written so far
+    :return: the :class:`Progress` of the bake
+    '''
+    times = np.asarray(times, dtype=np.float64)
+    chunkSize = max(1, int(chunkSize or len(times) or 1))
+    progress = Progress(len(times), *(times[[0, -1]] if len(times) else ()))
+    references = None
+    for start in range(0, len(times), chunkSize):
+        chunk = times[start:start + chunkSize]
+        curves = buildCurves(chunk, sample(chunk), plugs, minimizeRotation,
+                             period, references)
+        write(curves)
+        references = dict((curve.plug, curve.values[-1])
+                          for curve in curves if curve.isRotation)
+        progress.update(start + len(chunk), chunk[-1])
+        if callback is not None and callback(progress) is False:
+            progress.cancelled = not progress.finished
+            break
+    return progress
+
+
+####################
+#  Sharded baking  #
+####################
+
+
+def splitTimes(count, shards, overlap=0):
+    ''' Split count samples into shards (start, stop) index ranges that
+    cover them in order, neighbours sharing overlap samples '''
+    shards = max(1, min(int(shards), count))
+    bounds = np.linspace(0, count, shards + 1).round().astype(int)
+    # only neighbours may overlap
+    overlap = min(overlap, int(np.diff(bounds).min()))
+    segments = []
+    for idx in range(shards):
+        start = max(0, bounds[idx] - (overlap + 1) // 2)
+        stop = min(count, bounds[idx + 1] + overlap // 2)
+        segments.append((int(start), int(stop)))
+    return segments
+
+
+def _overlapWeights(segments, count):
+    ''' Per segment weights ramping across the overlaps so that the
+    segments covering a sample always sum to one '''
+    weights = [np.ones(stop - start) for start, stop in segments]
+    for idx in range(1, len(segments)):
+        start = segments[idx][0]
+        stop = segments[idx - 1][1]
+        if stop <= start:
+            continue
+        ramp = np.linspace(0.0, 1.0, stop - start + 2)[1:-1]
+        previousStart = segments[idx - 1][0]
+        weights[idx - 1][start - previousStart:] *= 1.0 - ramp
+        weights[idx][:stop - start] *= ramp
+    return weights
+
+
+def mergeSegments(segments, samples, plugs, period=RADIANS_PERIOD):
+    ''' Merge the samples baked for overlapping segments into one block
+
+    The rotations of a segment are first shifted by whole turns to agree
+    with the previous segment over their overlap, then the overlaps are
+    cross faded so that a segment warming up at its start does not show.
+
+    :param segments: (start, stop) sample indices as by :func:`splitTimes`
+    :param samples: (stop - start, plugs) array per segment
+    :param plugs: list of (node, channel) in the column order of samples
+    :return: (samples, largest difference between two segments over an
+        overlap)
+    '''
+    count = max(stop for _, stop in segments)
+    width = len(plugs)
+    rotColumns = [idx for idx, (node, channel) in enumerate(plugs)
+                  if isRotateChannel(channel)]
+    merged = np.zeros((count, width), dtype=np.float64)
+    covered = np.zeros(count, dtype=np.float64)
+    discrepancy = 0.0
+    aligned = []
+    for idx, ((start, stop), block) in enumerate(zip(segments, samples)):
+        block = np.array(block, dtype=np.float64)
+        if block.shape != (stop - start, width):
+            raise ValueError('segment %d-%d has samples of shape %r' % (
+                start, stop, block.shape))
+        if idx and rotColumns:
+            previousStart, previousStop = segments[idx - 1]
+            previous = aligned[-1]
+            if previousStop > start:
+                mine = block[:previousStop - start, rotColumns]
+                theirs = previous[start - previousStart:, rotColumns]
+            else:
+                mine = block[:1, rotColumns]
+                theirs = previous[-1:, rotColumns]
+            turns = np.round((mine - theirs).mean(axis=0) / period)
+            block[:, rotColumns] -= turns * period
+        if idx:
+            previousStart, previousStop = segments[idx - 1]
+            if previousStop > start:
+                difference = np.abs(
+                        block[:previousStop - start] -
+                        aligned[-1][start - previousStart:])
+                discrepancy = max(discrepancy, float(difference.max()))
+        aligned.append(block)
+
+    for (start, stop), block, weight in zip(
+            segments, aligned, _overlapWeights(segments, count)):
+        merged[start:stop] += block * weight[:, None]
+        covered[start:stop] += weight
+    if not np.allclose(covered, 1.0):
+        raise ValueError('segments do not cover the samples once')
+    return merged, discrepancy
+
+
+###################
+#  Key reduction  #
+###################
+
+
+def _neighbourKeys(kept):
+    ''' Index of the kept key at or before and at or after every frame '''
+    frames = np.arange(kept.shape[-1])
+    previous = np.maximum.accumulate(np.where(kept, frames, 0), axis=-1)
+    following = np.minimum.accumulate(
+            np.where(kept, frames, frames[-1])[..., ::-1], axis=-1)[..., ::-1]
+    return previous, following
+
+
+def hermite(times, values, slopes, kept):
+    ''' Evaluate curves that keep only the ``kept`` keys, each with its
+    original value and slope, as maya does with fixed, non weighted tangents
+
+    :param times: (frames,) key times shared by all curves
+    :param values: (curves, frames) original values
+    :param slopes: (curves, frames) value change per unit of time
+    :param kept: (curves, frames) bool mask of the keys that stay
+    '''
+    previous, following = _neighbourKeys(kept)
+    rows = np.arange(values.shape[0])[:, None]
+    t0, t1 = times[previous], times[following]
+    span = t1 - t0
+    s = np.where(span > 0, (times - t0) / np.where(span > 0, span, 1), 0.0)
+    s2, s3 = s * s, s * s * s
+    return ((2 * s3 - 3 * s2 + 1) * values[rows, previous] +
+            (s3 - 2 * s2 + s) * span * slopes[rows, previous] +
+            (-2 * s3 + 3 * s2) * values[rows, following] +
+            (s3 - s2) * span * slopes[rows, following])
+
+
+def reduceKeys(times, values, tolerance, slopes=None):
+    ''' Pick the keys to keep on a batch of curves sampled on the same times
+    so that none strays from the original by more than its tolerance
+
+    Works top down like Douglas-Peucker on every segment of every curve at
+    once, each pass keeps the worst frame of each segment that is still out
+    of tolerance.
+
+    :param values: (curves, frames)
+    :param tolerance: scalar or (curves,) maximum absolute error
+    :return: kept mask (curves, frames), slopes (curves, frames) and the
+        maximum error of each curve (curves,)
+    '''
+    times = np.asarray(times, dtype=np.float64)
+    values = np.atleast_2d(np.asarray(values, dtype=np.float64))
+    curves, frames = values.shape
+    tolerance = np.broadcast_to(
+            np.asarray(tolerance, dtype=np.float64), (curves,))
+    if slopes is None:
+        slopes = np.gradient(values, times, axis=1) if frames > 1 else (
+                np.zeros_like(values))
+
+    kept = np.zeros((curves, frames), dtype=bool)
+    if not frames:
+        return kept, slopes, np.zeros(curves)
+    kept[:, 0] = kept[:, -1] = True
+    while True:
+        error = np.abs(hermite(times, values, slopes, kept) - values)
+        rows, cols = np.nonzero(error > tolerance[:, None])
+        if not len(rows):
+            break
+        segments = rows * frames + _neighbourKeys(kept)[0][rows, cols]
+        order = np.lexsort((-error[rows, cols], segments))
+        first = np.unique(segments[order], return_index=True)[1]
+        kept[rows[order][first], cols[order][first]] = True
+
+    return kept, slopes, error.max(axis=1)
@@ -0,0 +1,508 @@
+'''
+Created on Oct 18, 2026
+
+Headless batch retargeting of many takes. A manifest of jobs is fanned out
+over a pool of workers, each worker running the whole moctor chain on one
+take in its own mayapy process and saving the result:
+
+    python -m mocapToRig.src.batch manifest.json --workers 4
+
+The manifest is a json list of objects with the keys mocapPath, rigPath,
+mocapMapping, rigMapping and outputPath (and an optional name). A job with
+``qc`` set, true or a dict of :mod:`qc` thresholds, checks the retarget before
+saving, writes the report next to the output as ``<output>.qc.json`` and fails
+if it is over the thresholds. A job with ``animPath`` also exports the baked
+controls there as an :mod:`animfile` for jobs downstream. ``preprocess``,
+true or a dict of options, smooths and resamples the take first, see
+:func:`moctor.preprocessMocap`. A job runs the plain moctor chain, import,
+characterize, link and bake, unless ``useCache`` is true: then the take comes
+characterized from :data:`moctor.takeCache` and the rig plan from
+:data:`moctor.rigCache`. The stages of a job are timed by :mod:`profiling`.
+
+The scheduler never imports maya itself. How a job is run is up to the
+launcher, :class:`MayapyLauncher` starts a mayapy process per job while
+:class:`CallableLauncher` calls a python function which lets the scheduler be
+driven by a stub worker on machines without maya.
+'''
+
+import os
+import os.path as osp
+import sys
+import json
+import time
+import shutil
+import signal
+import tempfile
+import threading
+import traceback
+import subprocess
+from multiprocessing.pool import ThreadPool
+
+
+class JobStatus:
+    ''' States of a batch job '''
+    pending = 'pending'
+    running = 'running'
+    done = 'done'
+    failed = 'failed'
+
+
+class Job(object):
+    ''' One take to retarget onto one rig '''
+
+    fields = ('mocapPath', 'rigPath', 'mocapMapping', 'rigMapping',
+              'outputPath', 'name', 'qc', 'animPath', 'preprocess',
+              'useCache')
+
+    def __init__(self, mocapPath, rigPath, mocapMapping, rigMapping,
+                 outputPath, name=None, qc=None, animPath=None,
+                 preprocess=None, useCache=False):
+        self.mocapPath = mocapPath
+        self.rigPath = rigPath
+        self.mocapMapping = mocapMapping
+        self.rigMapping = rigMapping
+        self.outputPath = outputPath
+        self.name = name or osp.splitext(osp.basename(outputPath))[0]
+        self.qc = qc
+        self.animPath = animPath
+        self.preprocess = preprocess
+        self.useCache = useCache
+
+    def toDict(self):
+        return dict((field, getattr(self, field)) for field in self.fields)
+
+    @classmethod
+    def fromDict(cls, data):
+        return cls(**dict((str(key), value) for key, value in data.items()
+                          if key in cls.fields))
+
+    def __repr__(self):
+        return 'Job(%r)' % self.name
+
+
+class JobResult(object):
+    ''' Status, timing and failure of a job '''
+
+    def __init__(self, job, status=JobStatus.pending, startTime=None,
+                 endTime=None, error='', log='', stages=None):
+        self.job = job
+        self.status = status
+        self.startTime = startTime
+        self.endTime = endTime
+        self.error = error
+        self.log = log
+        self.stages = stages or {}
+
+    @property
+    def duration(self):
+        if self.startTime is None or self.endTime is None:
+            return None
+        return self.endTime - self.startTime
+
+    @property
+    def ok(self):
+        return self.status == JobStatus.done
+
+    def toDict(self):
+        return {
+            'job': self.job.toDict(),
+            'status': self.status,
+            'startTime': self.startTime,
+            'endTime': self.endTime,
+            'duration': self.duration,
+            'error': self.error,
+            'log': self.log,
+            'stages': self.stages}
+
+    def __repr__(self):
+        return 'JobResult(%r, %r, %s)' % (
+            self.job.name, self.status,
+            '%.2fs' % self.duration if self.duration is not None else '-')
+
+
+def loadManifest(path):
+    with open(path) as _file:
+        data = json.load(_file)
+    if isinstance(data, dict):
+        data = data.get('jobs', [])
+    return [Job.fromDict(item) for item in data]
+
+
+def dumpManifest(jobs, path):
+    with open(path, 'w+') as _file:
+        json.dump([job.toDict() for job in jobs], _file, indent=2)
+
+
+###############
+#  Launchers  #
+###############
+
+
+class CallableLauncher(object):
+    ''' Runs jobs by calling ``func(job)`` in the scheduler process
+
+    func may return a dict of stage timings, any exception fails the job. '''
+
+    def __init__(self, func):
+        self.func = func
+
+    def __call__(self, job):
+        result = JobResult(job, JobStatus.running, startTime=time.time())
+        try:
+            result.stages = self.func(job) or {}
+            result.status = JobStatus.done
+        except Exception:
+            result.status = JobStatus.failed
+            result.error = traceback.format_exc()
+        result.endTime = time.time()
+        return result
+
+
+def moduleName(name, spec=None, default=None):
+    ''' The dotted name a module is importable as, also when it runs as
+    ``__main__`` with ``python -m``, default when there is no spec to tell
+    '''
+    if name != '__main__':
+        return name
+    if spec is not None and spec.name:
+        return spec.name
+    return default
+
+
+MODULE = moduleName(__name__, globals().get('__spec__'),
+                    'src.batch')
+
+
+def getPackageRoot(module=MODULE, path=__file__):
+    ''' The sys.path entry module, in the file at path, is importable from
+    '''
+    root = osp.dirname(osp.abspath(path))
+    for _ in module.split('.')[:-1]:
+        root = osp.dirname(root)
+    return root
+
+
+class MayapyLauncher(object):
+    ''' Runs every job in a fresh mayapy process
+
+    The worker gets the job as a json file and writes its result to another
+    one, its stdout and stderr are kept as the log of the job. '''
+
+    def __init__(self, mayapy='mayapy', timeout=None, env=None):
+        self.mayapy = mayapy
+        self.timeout = timeout
+        self.env = env
+
+    module = MODULE
+
+    def command(self, jobPath, resultPath):
+        return [self.mayapy, '-m', self.module, '--worker', jobPath,
+                resultPath]
+
+    def __call__(self, job):
+        result = JobResult(job, JobStatus.running, startTime=time.time())
+        tmpdir = tempfile.mkdtemp(prefix='moctor_')
+        jobPath = osp.join(tmpdir, 'job.json')
+        resultPath = osp.join(tmpdir, 'result.json')
+        with open(jobPath, 'w+') as _file:
+            json.dump(job.toDict(), _file)
+
+        env = dict(os.environ)
+        env.update(self.env or {})
+        env['PYTHONPATH'] = os.pathsep.join(
+                filter(None, [getPackageRoot(self.module),
+                              env.get('PYTHONPATH')]))
+
+        try:
+            # in a process group of its own, so that a timeout also kills
+            # what mayapy started
+            process = subprocess.Popen(
+                    self.command(jobPath, resultPath), env=env,
+                    stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                    preexec_fn=getattr(os, 'setsid', None))
+        except OSError as error:
+            result.status = JobStatus.failed
+            result.error = 'Could not start %s: %s' % (self.mayapy, error)
+            result.endTime = time.time()
+            shutil.rmtree(tmpdir, ignore_errors=True)
+            return result
+
+        timer = None
+        timedOut = []
+
+        def kill():
+            timedOut.append(True)
+            try:
+                if hasattr(os, 'killpg'):
+                    os.killpg(process.pid, signal.SIGKILL)
+                else:
+                    process.kill()
+            except OSError:
+                pass
+
+        if self.timeout:
+            timer = threading.Timer(self.timeout, kill)
+            timer.start()
+        try:
+            output = process.communicate()[0]
+        finally:
+            if timer:
+                timer.cancel()
+        result.endTime = time.time()
+        result.log = output.decode('utf-8', 'replace')
+
+        try:
+            with open(resultPath) as _file:
+                workerResult = json.load(_file)
+            result.status = workerResult['status']
+            result.error = workerResult.get('error', '')
+            result.stages = workerResult.get('stages', {})
+        except (IOError, OSError, ValueError, KeyError):
+            result.status = JobStatus.failed
+            if timedOut:
+                result.error = 'Worker killed after the %ss timeout' % (
+                    self.timeout)
+            else:
+                result.error = (
+                    'Worker exited with code %s without a result' % (
+                        process.returncode))
+        shutil.rmtree(tmpdir, ignore_errors=True)
+        return result
+
+
+###############
+#  Scheduler  #
+###############
+
+
+class Scheduler(object):
+    ''' Fans jobs out over a pool of ``workers`` concurrent launches '''
+
+    def __init__(self, launcher=None, workers=None, callback=None):
+        self.launcher = launcher or MayapyLauncher()
+        self.workers = max(1, workers or 1)
+        self.callback = callback
+        self._lock = threading.Lock()
+
+    def _run(self, job):
+        try:
+            result = self.launcher(job)
+        except Exception:
+            result = JobResult(job, JobStatus.failed, error=(
+                traceback.format_exc()))
+        if self.callback is not None:
+            with self._lock:
+                self.callback(result)
+        return result
+
+    def run(self, jobs):
+        ''' Run all jobs and return their results in manifest order '''
+        jobs = list(jobs)
+        if not jobs:
+            return []
+        pool = ThreadPool(min(self.workers, len(jobs)))
+        try:
+            return pool.map(self._run, jobs, chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+
+
+def summarize(results):
+    done = [result for result in results if result.ok]
+    return {
+        'jobs': len(results),
+        'done': len(done),
+        'failed': len(results) - len(done),
+        'time': sum(result.duration or 0 for result in results)}
+
+
+############
+#  Worker  #
+############
+
+
+def checkJob(job, mocapNamespace, rigNamespace):
+    ''' Check the retarget of a job, write its report and fail it over the
+    thresholds '''
+    from . import qc
+
+    report = qc.checkRetarget(
+            mocapNamespace, job.mocapMapping, rigNamespace, job.rigMapping,
+            thresholds=job.qc if isinstance(job.qc, dict) else None)
+    outputDir = osp.dirname(job.outputPath)
+    if outputDir and not osp.exists(outputDir):
+        os.makedirs(outputDir)
+    with open(job.outputPath + '.qc.json', 'w+') as _file:
+        json.dump(report.toDict(), _file, indent=2)
+    if not report.passed:
+        raise RuntimeError('QC failed for %s\n%s' % (
+            job.name, report.summary()))
+    return report
+
+
+def stageTimes(events):
+    ''' {stage: seconds} summed over :mod:`profiling` trace events '''
+    times = {}
+    for event in events:
+        times[event['name']] = times.get(event['name'], 0.0) + (
+                event['dur'] / 1e6)
+    return times
+
+
+def runJob(job):
+    ''' Run the moctor chain for one job in the current maya session
+
+    The stages are recorded by :mod:`profiling`, which is enabled for the
+    run if it is not, along with the stages of moctor they contain.
+
+    :return: {stage: seconds}
+    '''
+    from . import profiling
+
+    enabled = profiling.profiler.enabled
+    profiling.enable()
+    first = len(profiling.profiler.events)
+    try:
+        _runJob(job)
+    finally:
+        if not enabled:
+            profiling.disable()
+    return stageTimes(profiling.profiler.events[first:])
+
+
+def _runJob(job):
+    import pymel.core as pc
+    from . import moctor, animfile
+    from .profiling import stage
+
+    mocapMapping = moctor.loadMapping(job.mocapMapping, moctor.MappingTypes.sk)
+
+    pc.newFile(force=True)
+    with stage('importRig'):
+        rigNamespace = moctor.importRig(job.rigPath)
+    if rigNamespace in (None, '-1'):
+        raise RuntimeError('Could not reference rig %s' % job.rigPath)
+    rigNamespace += ':'
+
+    if not osp.exists(job.mocapPath):
+        raise IOError('Mocap %s does not exist' % job.mocapPath)
+    if job.useCache:
+        # the same take goes onto many rigs, it is characterized once and
+        # then imported from the take cache
+        with stage('importCharacterizedMocap'):
+            mocapNamespace, mocapDefinition = (
+                    moctor.importCharacterizedMocap(
+                        job.mocapPath, job.mocapMapping,
+                        preprocess=job.preprocess))
+    else:
+        with stage('importMocap'):
+            mocapNamespace = moctor.importMocap(job.mocapPath) or ''
+    if not pc.objExists(mocapNamespace + moctor.getMappingRoot(mocapMapping)):
+        raise RuntimeError('Could not find mocap root node')
+
+    if not job.useCache:
+        if job.preprocess:
+            moctor.preprocessMocap(
+                    mocapNamespace, job.mocapMapping, job.preprocess)
+        with stage('mapMocapSkeleton'):
+            mocapDefinition = moctor.mapMocapSkeleton(
+                    mocapNamespace, mocapMapping)
+
+    with stage('setRange'):
+        moctor.setRange(mocapMapping, mocapNamespace)
+    if job.useCache:
+        # as is the characterization of the rig, from the rig cache
+        with stage('mapRigCached'):
+            rigDefinition = moctor.mapRigCached(
+                    rigNamespace, job.rigMapping, job.rigPath)
+    else:
+        with stage('mapRigSkeleton'):
+            rigDefinition = moctor.mapRigSkeleton(
+                    rigNamespace, moctor.loadMapping(
+                        job.rigMapping, moctor.MappingTypes.sk))
+        with stage('mapRigControls'):
+            moctor.mapRigControls(
+                    rigNamespace, rigDefinition, moctor.loadMapping(
+                        job.rigMapping, moctor.MappingTypes.cr))
+    with stage('linkMocapHikToRigHik'):
+        moctor.linkMocapHikToRigHik(mocapDefinition, rigDefinition)
+    with stage('bakeRig'):
+        moctor.bakeRig(rigNamespace, mocapNamespace, job.mocapMapping,
+                       job.rigMapping)
+    if job.qc:
+        with stage('qc'):
+            checkJob(job, mocapNamespace, rigNamespace)
+    if job.animPath:
+        with stage('exportAnimation'):
+            animfile.exportAnimation(rigNamespace, job.rigMapping,
+                                     job.animPath)
+    with stage('cleanup'):
+        moctor.cleanupHIK(mocapDefinition, rigDefinition)
+    with stage('deleteMocap'):
+        moctor.deleteMocap(mocapNamespace, job.mocapMapping)
+
+    outputDir = osp.dirname(job.outputPath)
+    if outputDir and not osp.exists(outputDir):
+        os.makedirs(outputDir)
+    with stage('save'):
+        pc.saveAs(job.outputPath, force=True)
+
+
+def workerMain(jobPath, resultPath):
+    ''' Entry point of a mayapy worker process '''
+    with open(jobPath) as _file:
+        job = Job.fromDict(json.load(_file))
+    result = {'status': JobStatus.failed}
+    try:
+        import maya.standalone
+        maya.standalone.initialize(name='python')
+        result['stages'] = runJob(job)
+        result['status'] = JobStatus.done
+    except Exception:
+        result['error'] = traceback.format_exc()
+        sys.stderr.write(result['error'])
+    with open(resultPath, 'w+') as _file:
+        json.dump(result, _file)
+    return 0 if result['status'] == JobStatus.done else 1
+
+
+def main(args=None):
+    import argparse
+
+    args = sys.argv[1:] if args is None else args
+    if args and args[0] == '--worker':
+        return workerMain(*args[1:3])
+
+    parser = argparse.ArgumentParser(
+            description='Retarget mocap takes onto rigs in batch')
+    parser.add_argument('manifest', help='json list of jobs')
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--mayapy', default='mayapy')
+    parser.add_argument('--timeout', type=float, default=None,
+                        help='seconds after which a job is killed')
+    parser.add_argument('--report', help='write the results to this json')
+    opts = parser.parse_args(args)
+
+    def report(result):
+        sys.stdout.write('%s\n' % result)
+        if not result.ok:
+            sys.stdout.write(result.error + '\n')
+        sys.stdout.flush()
+
+    scheduler = Scheduler(
+            MayapyLauncher(opts.mayapy, opts.timeout), opts.workers, report)
+    results = scheduler.run(loadManifest(opts.manifest))
+    summary = summarize(results)
+    sys.stdout.write('%(done)d/%(jobs)d jobs done in %(time).1fs\n' % summary)
+
+    if opts.report:
+        with open(opts.report, 'w+') as _file:
+            json.dump({'summary': summary,
+                       'results': [result.toDict() for result in results]},
+                      _file, indent=2)
+    return 0 if not summary['failed'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
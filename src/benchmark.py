@@ -0,0 +1,449 @@
+'''
+Created on Oct 18, 2026
+
+Benchmarks of moctor on the in-memory :mod:`standin` scene, with budgets of
+scene commands that fail the run when they are exceeded::
+
+    python -m mocapToRig.src.benchmark --characters 2 --frames 500
+
+For every skeleton mapping in the mappings directory a keyed mocap skeleton
+is built, and for every mapping with controls ``characters`` rigs are built
+(skeleton and controls). Each scenario is timed and the commands it sends to
+the scene are counted. Budgets are given in calls per unit, the unit being a
+mapped node, a control or an animCurve depending on the scenario, so they do
+not depend on the size of the scene: a change that adds a round trip per
+joint is caught however small the synthetic takes are. The import of the
+modules is timed in fresh interpreters and must not send any command.
+
+This imports moctor against the stand-in and so cannot be run inside maya.
+'''
+
+import sys
+import json
+import math
+import time
+import subprocess
+from collections import Counter
+
+from . import standin
+from .mappings import (MappingTypes, getMappingNames, loadMapping,
+                       getMappingRoot)
+
+
+# {scenario: {command or 'total': budget}}, a budget is the max calls per unit
+# or (calls per unit, calls per run) for commands with a fixed overhead.
+BUDGETS = {
+    'detectMappings': {'ls': 1, 'objExists': 0, 'total': 1},
+    'getAnimRange': {'listConnections': (0, 1), 'keyframe': 2,
+                     'total': (2, 1)},
+    'mapMocapSkeleton': {'mel.setCharacterObject': 1, 'xform': 0,
+                         'objExists': 0, 'total': (1, 16)},
+    'mapRigSkeleton': {'mel.setCharacterObject': 1, 'setAttr': (0, 1),
+                       'xform': 0, 'objExists': 0, 'total': (1, 20)},
+    'mapRigControls': {'mel.RetargeterAddMapping': 2, 'getAttr': 0,
+                       'listAttr': 0, 'mel.moctorLockedAttrs': (0, 1),
+                       'total': (4, 10)},
+    'applyRigPlan': {'mel.setCharacterObject': 0,
+                     'mel.RetargeterAddMapping': 0, 'mel.eval': (0, 2),
+                     'xform': 0, 'objExists': 0, 'total': (0, 20)},
+    'mocapZeroOut': {'setAttr': 0, 'total': (0, 2)},
+    'mocapSetKeyframe': {'setKeyframe': (0, 1), 'total': (0, 2)},
+    'captureControlStance': {'getAttr': 4, 'xform': 2, 'total': (8, 2)},
+    'legacy.mapSkeletons': {'mel.setCharacterObject': 1, 'objExists': 0,
+                            'total': (1, 8)},
+    'legacy.mapRigControls': {'mel.hikCustomRigAssignEffector': 1,
+                              'total': (2, 1)},
+    'import': {'total': 0},
+    'hikLookups': {'total': 0},
+    'referenceLookups': {'total': 0},
+}
+
+
+class Measurement(object):
+    ''' Wall time and scene commands of one run of a scenario '''
+
+    def __init__(self, scenario, subject, units, wall, calls):
+        self.scenario = scenario
+        self.subject = subject
+        self.units = max(units, 1)
+        self.wall = wall
+        self.calls = calls
+
+    @property
+    def total(self):
+        return sum(self.calls.values())
+
+    def count(self, command):
+        if command == 'total':
+            return self.total
+        return self.calls.get(command, 0)
+
+    def perUnit(self, command):
+        return self.count(command) / float(self.units)
+
+    def overBudget(self, budgets=BUDGETS):
+        ''' {command: (calls, allowed calls)} of the exceeded budgets '''
+        over = {}
+        for command, budget in budgets.get(self.scenario, {}).items():
+            perUnit, fixed = (budget if isinstance(budget, tuple)
+                              else (budget, 0))
+            allowed = perUnit * self.units + fixed
+            if self.count(command) > allowed:
+                over[command] = (self.count(command), allowed)
+        return over
+
+    def toDict(self):
+        return {'scenario': self.scenario, 'subject': self.subject,
+                'units': self.units, 'wall': self.wall,
+                'calls': dict(self.calls), 'total': self.total}
+
+    def __repr__(self):
+        return 'Measurement(%r, %r, %.4fs, %d calls)' % (
+            self.scenario, self.subject, self.wall, self.total)
+
+
+def measure(scenario, subject, units, func, *args):
+    scene = standin.scene
+    scene.calls.clear()
+    start = time.time()
+    func(*args)
+    wall = time.time() - start
+    measurement = Measurement(scenario, subject, units, wall,
+                              Counter(scene.calls))
+    scene.calls.clear()
+    return measurement
+
+
+######################
+#  Synthetic scenes  #
+######################
+
+
+def _orderedNodes(mapping):
+    ''' Mapped nodes, root first then in id order '''
+    return sorted(mapping, key=lambda name: (mapping[name], name))
+
+
+def _keyAttr(scene, node, attr, times, values):
+    curve = scene.createNode(
+            'animCurveTA' if attr.startswith('rotate') else 'animCurveTL',
+            '%s_%s' % (node.replace(':', '_'), attr))
+    scene.nodes[curve].attrs['keys'] = dict(zip(times, values))
+    scene.connect(curve + '.output', '%s.%s' % (node, attr))
+
+
+def buildSkeleton(scene, namespace, mapping, nodeType='joint', frames=0,
+                  extraJoints=0):
+    ''' Create the nodes of mapping under namespace as a chain from the root,
+    keyed on rotate over frames when frames is given
+
+    :return: names of the nodes created
+    '''
+    created = []
+    parent = None
+    names = _orderedNodes(mapping)
+    names += ['%sExtra%d' % (names[0], idx) for idx in range(extraJoints)]
+    times = [float(frame) for frame in range(1, frames + 1)]
+    for idx, name in enumerate(names):
+        node = namespace + name
+        if node in scene.nodes:
+            continue
+        scene.createNode(nodeType, node, parent)
+        parent = parent or node
+        created.append(node)
+        for axis, attr in enumerate(('rotateX', 'rotateY', 'rotateZ')):
+            if times:
+                _keyAttr(scene, node, attr, times, [
+                    30.0 * math.sin(0.05 * t + idx + axis) for t in times])
+        if times and idx == 0:
+            for attr in ('translateX', 'translateY', 'translateZ'):
+                _keyAttr(scene, node, attr, times, [
+                    0.1 * t for t in times])
+    return created
+
+
+def buildScene(characters=1, frames=100, extraJoints=0, mappings=None,
+               references=100):
+    ''' Reset the stand-in scene and fill it with a keyed mocap skeleton per
+    skeleton mapping, ``characters`` rigs per mapping with controls, each
+    with a reference node, and ``references`` more references
+
+    :return: {'mocap': {mapping: namespace}, 'rigs': [(mapping, namespace)],
+        'references': [(path, namespace)]}
+    '''
+    scene = standin.scene
+    scene.reset()
+    names = mappings or getMappingNames(MappingTypes.sk)
+    layout = {'mocap': {}, 'rigs': [], 'references': []}
+    for num in range(references):
+        path = '/project/assets/set/prop%03d/prop%03d.ma' % (num, num)
+        layout['references'].append(
+            (path, standin.createReference(path).namespace))
+
+    for name in names:
+        namespace = 'mocap_%s:' % name
+        buildSkeleton(scene, namespace, loadMapping(name, MappingTypes.sk),
+                      frames=frames, extraJoints=extraJoints)
+        layout['mocap'][name] = namespace
+
+    rigNames = [name for name in getMappingNames(MappingTypes.cr)
+                if name in names]
+    for num in range(characters):
+        for name in rigNames:
+            namespace = 'rig%d_%s:' % (num + 1, name)
+            buildSkeleton(scene, namespace,
+                          loadMapping(name, MappingTypes.sk))
+            for ctrl in buildSkeleton(scene, namespace,
+                                      loadMapping(name, MappingTypes.cr),
+                                      nodeType='transform'):
+                if 'FK' in ctrl:
+                    scene.nodes[ctrl].locked.update(
+                            standin.COMPOUNDS['translate'])
+            path = '/project/assets/char/%s/rig.ma' % namespace.rstrip(':')
+            standin.createReference(path, namespace.rstrip(':'))
+            layout['rigs'].append((name, namespace))
+            layout['references'].append((path, namespace.rstrip(':')))
+
+    scene.calls.clear()
+    return layout
+
+
+###############
+#  Scenarios  #
+###############
+
+
+def _found(namespace, mapping):
+    return len([name for name in mapping
+                if namespace + name in standin.scene.nodes])
+
+
+def watchScene(index):
+    ''' Have a :class:`sceneindex.SceneIndex` invalidated by the stand-in '''
+    def register(callback):
+        key = standin.addCallback(lambda event, name: callback())
+        return lambda: standin.removeCallback(key)
+    index.unwatch()
+    return index.watch(register)
+
+
+def benchmarkMoctor(layout):
+    from . import moctor
+
+    results = []
+    scene = standin.scene
+    watchScene(moctor.hikIndex)
+    watchScene(moctor.referenceIndex)
+    mocapDefinitions = {}
+    results.append(measure('detectMappings', 'scene', 1,
+                           moctor.detectMappings))
+
+    for name, namespace in sorted(layout['mocap'].items()):
+        mapping = loadMapping(name, MappingTypes.sk)
+        units = _found(namespace, mapping)
+        root = namespace + getMappingRoot(mapping)
+        curves = len(scene.connected(root, destination=False,
+                                     nodeType='animCurve'))
+        results.append(measure('getAnimRange', name, curves,
+                               moctor.getAnimRange, root))
+        results.append(measure(
+            'mapMocapSkeleton', name, units,
+            lambda: mocapDefinitions.__setitem__(
+                name, moctor.mapMocapSkeleton(namespace, mapping))))
+        results.append(measure('mocapZeroOut', name, units,
+                               moctor.mocapZeroOut, namespace, mapping))
+        results.append(measure('mocapSetKeyframe', name, units,
+                               moctor.mocapSetKeyframe, namespace, mapping))
+
+    for name, namespace in layout['rigs']:
+        skMapping = loadMapping(name, MappingTypes.sk)
+        crMapping = loadMapping(name, MappingTypes.cr)
+        subject = namespace.rstrip(':')
+        definition = []
+        results.append(measure(
+            'mapRigSkeleton', subject, _found(namespace, skMapping),
+            lambda: definition.append(
+                moctor.mapRigSkeleton(namespace, skMapping))))
+        units = _found(namespace, crMapping)
+        results.append(measure('mapRigControls', subject, units,
+                               moctor.mapRigControls, namespace,
+                               definition[0], crMapping))
+        moctor.linkMocapHikToRigHik(mocapDefinitions[name], definition[0])
+        try:
+            import numpy  # noqa
+        except ImportError:
+            # the stance is solver data
+            continue
+        results.append(measure('captureControlStance', subject, units,
+                               moctor.captureControlStance, namespace,
+                               crMapping))
+
+    # with the index warm every lookup is answered without the scene
+    lookups = []
+    for name, namespace in layout['rigs']:
+        lookups.append((moctor.getHikDefFromSKRoot, namespace,
+                        getMappingRoot(loadMapping(name, MappingTypes.sk))))
+        lookups.append((moctor.getHikDefFromCRRoot, namespace,
+                        getMappingRoot(loadMapping(name, MappingTypes.cr))))
+    for name, namespace in layout['mocap'].items():
+        lookups.append((moctor.getHikDestinations, mocapDefinitions[name]))
+
+    def lookup():
+        for item in lookups:
+            item[0](*item[1:])
+    lookup()
+    results.append(measure('hikLookups', 'scene', len(lookups), lookup))
+
+    def referenceLookup():
+        for path, namespace in layout['references']:
+            moctor.getNamespaceFromReferencePath(path)
+            moctor.getReferencePathFromNamespace(namespace)
+    referenceLookup()
+    results.append(measure('referenceLookups', 'scene',
+                           2 * len(layout['references']), referenceLookup))
+
+    # characterizing again from the plan a rig cache would hold
+    for name, namespace in layout['rigs']:
+        skMapping = loadMapping(name, MappingTypes.sk)
+        crMapping = loadMapping(name, MappingTypes.cr)
+        plan = moctor.planRig(namespace, skMapping, crMapping)
+        moctor.cleanupRigHIK(moctor.getHikDefFromSKRoot(
+            namespace, getMappingRoot(skMapping)))
+        results.append(measure(
+            'applyRigPlan', namespace.rstrip(':'),
+            len(plan['joints']) + len(plan['controls']),
+            moctor.applyRigPlan, namespace, plan, skMapping))
+    return results
+
+
+def benchmarkLegacy(characters=1):
+    ''' The hard coded mappings of _mocapToRig on their own scene '''
+    from . import _mocapToRig as legacy
+
+    scene = standin.scene
+    scene.reset()
+    buildSkeleton(scene, '', legacy.mocapSkeletonMappings)
+    namespaces = ['legacy%d:' % (num + 1) for num in range(characters)]
+    for namespace in namespaces:
+        buildSkeleton(scene, namespace, legacy.rigSkeletonMappings)
+        buildSkeleton(scene, namespace, legacy.rigControlsMappings,
+                      nodeType='transform')
+    scene.calls.clear()
+
+    def mapSkeletons(namespace):
+        legacy.mapMocapSkeleton('', legacy.createHikDefinition())
+        legacy.mapRigSkeleton(namespace, legacy.createHikDefinition())
+
+    results = []
+    for namespace in namespaces:
+        subject = namespace.rstrip(':')
+        results.append(measure(
+            'legacy.mapSkeletons', subject,
+            len(legacy.mocapSkeletonMappings) +
+            len(legacy.rigSkeletonMappings), mapSkeletons, namespace))
+        results.append(measure(
+            'legacy.mapRigControls', subject,
+            len(legacy.rigControlsMappings), legacy.mapRigControls,
+            namespace))
+    return results
+
+
+IMPORT_SCRIPT = '''
+import sys, json, time
+sys.path.insert(0, %(root)r)
+from %(package)s import standin
+scene = standin.install()
+start = time.time()
+import %(module)s
+json.dump({'wall': time.time() - start, 'calls': dict(scene.calls)},
+          sys.stdout)
+'''
+
+
+def benchmarkImport(modules=('moctor', '_mocapToRig', 'mappings'),
+                    repeat=3):
+    ''' Time importing each module in a fresh interpreter, best of repeat,
+    and count the scene commands sent while importing '''
+    from .batch import getPackageRoot
+
+    package = standin.__name__.rpartition('.')[0]
+    results = []
+    for name in modules:
+        best = None
+        for _ in range(repeat):
+            output = subprocess.check_output([
+                sys.executable, '-c', IMPORT_SCRIPT % {
+                    'root': getPackageRoot(), 'package': package,
+                    'module': '%s.%s' % (package, name)}])
+            data = json.loads(output.decode('utf-8'))
+            if best is None or data['wall'] < best['wall']:
+                best = data
+        results.append(Measurement('import', name, 1, best['wall'],
+                                   Counter(best['calls'])))
+    return results
+
+
+def run(characters=1, frames=100, extraJoints=0, mappings=None,
+        references=100, legacy=True, imports=True):
+    ''' Build the scenes and run every scenario, list of
+    :class:`Measurement` '''
+    standin.install()
+    results = benchmarkImport() if imports else []
+    layout = buildScene(characters, frames, extraJoints, mappings,
+                        references)
+    results.extend(benchmarkMoctor(layout))
+    if legacy:
+        results.extend(benchmarkLegacy(characters))
+    return results
+
+
+def failures(results, budgets=BUDGETS):
+    return [(result, over) for result in results
+            for over in [result.overBudget(budgets)] if over]
+
+
+def report(results, budgets=BUDGETS, stream=sys.stdout):
+    byScenario = {}
+    for result in results:
+        byScenario.setdefault(result.scenario, []).append(result)
+    stream.write('%-24s %5s %9s %8s %8s\n' % (
+        'scenario', 'runs', 'wall(ms)', 'calls', 'per unit'))
+    for scenario, items in sorted(byScenario.items()):
+        stream.write('%-24s %5d %9.2f %8d %8.2f\n' % (
+            scenario, len(items), 1000 * sum(item.wall for item in items),
+            sum(item.total for item in items),
+            max(item.perUnit('total') for item in items)))
+    for result, over in failures(results, budgets):
+        for command, (value, allowed) in sorted(over.items()):
+            stream.write('OVER BUDGET %s %s: %d %s calls > %d\n' % (
+                result.scenario, result.subject, value, command, allowed))
+
+
+def main(args=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(
+            description='Benchmark moctor on an in-memory scene')
+    parser.add_argument('--characters', type=int, default=1)
+    parser.add_argument('--frames', type=int, default=100)
+    parser.add_argument('--extra-joints', type=int, default=0,
+                        help='unmapped joints added to every mocap skeleton')
+    parser.add_argument('--references', type=int, default=100,
+                        help='file references in the scene besides the rigs')
+    parser.add_argument('--mapping', action='append', dest='mappings',
+                        help='only build this mapping, may be repeated')
+    parser.add_argument('--report', help='write the measurements to a json')
+    opts = parser.parse_args(sys.argv[1:] if args is None else args)
+
+    results = run(opts.characters, opts.frames, opts.extra_joints,
+                  opts.mappings, opts.references)
+    report(results)
+    if opts.report:
+        with open(opts.report, 'w+') as _file:
+            json.dump([result.toDict() for result in results], _file,
+                      indent=2)
+    return 1 if failures(results) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
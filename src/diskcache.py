@@ -0,0 +1,219 @@
+'''
+Created on Oct 18, 2026
+
+A directory of cached files addressed by the hash of what they were made
+from, evicted least recently used first once the directory grows over a size.
+
+Every entry is a data file, ``<key><extension>``, and a json of metadata,
+``<key>.json``, that also records when the entry was last used. Entries are
+written to a temporary file and renamed into place so that several mayapy
+workers can share a cache directory. :meth:`DiskCache.fileHash` keeps the
+hashes of input files by path, mtime and size so that keying on a file
+unchanged since the last lookup does not read it. Nothing here needs maya::
+
+    cache = DiskCache('~/.moctor/cache/takes', 2 << 30, '.mb')
+    key = cache.key(hashFile(mocapPath), hashData(mapping.items()))
+    entry = cache.get(key)
+    if entry is None:
+        entry = cache.put(key, lambda path: export(path), {'root': root})
+    load(cache.path(key))
+'''
+
+import os
+import os.path as osp
+import json
+import time
+import hashlib
+import tempfile
+
+
+_replace = getattr(os, 'replace', os.rename)
+
+
+def hashFile(path, blockSize=1 << 20):
+    ''' sha1 of the contents of a file, read a block at a time '''
+    digest = hashlib.sha1()
+    with open(path, 'rb') as _file:
+        block = _file.read(blockSize)
+        while block:
+            digest.update(block)
+            block = _file.read(blockSize)
+    return digest.hexdigest()
+
+
+def hashData(data):
+    ''' sha1 of json serializable data, dict keys sorted '''
+    text = json.dumps(data, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+class DiskCache(object):
+    ''' Files cached in a directory under the hash of their inputs
+
+    :param maxSize: bytes the data files may take, the least recently used
+        entries are evicted past it. None does not evict.
+    :param extension: of the data files
+    '''
+
+    def __init__(self, directory, maxSize=None, extension=''):
+        self.directory = osp.abspath(osp.expanduser(directory))
+        self.maxSize = maxSize
+        self.extension = extension
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(*parts):
+        return hashData([str(part) for part in parts])
+
+    def path(self, key):
+        return osp.join(self.directory, key + self.extension)
+
+    def metadataPath(self, key):
+        return osp.join(self.directory, key + '.json')
+
+    def fileHash(self, path):
+        ''' :func:`hashFile` of path, remembered under the path, mtime and
+        size of the file so that the contents of an unchanged file are not
+        read again '''
+        info = os.stat(path)
+        stamp = osp.join(self.directory, 'hashes', hashData(
+            [osp.normcase(osp.abspath(path)), info.st_mtime, info.st_size]))
+        try:
+            with open(stamp) as _file:
+                digest = _file.read().strip()
+            if digest:
+                return digest
+        except (IOError, OSError):
+            pass
+        digest = hashFile(path)
+        try:
+            if not osp.isdir(osp.dirname(stamp)):
+                os.makedirs(osp.dirname(stamp))
+            handle, temp = tempfile.mkstemp(dir=osp.dirname(stamp))
+            with os.fdopen(handle, 'w') as _file:
+                _file.write(digest)
+            _replace(temp, stamp)
+        except (IOError, OSError):
+            # a read only cache hashes every time
+            pass
+        return digest
+
+    def _readMetadata(self, key):
+        try:
+            with open(self.metadataPath(key)) as _file:
+                return json.load(_file)
+        except (IOError, OSError, ValueError):
+            return None
+
+    def _writeMetadata(self, key, metadata):
+        handle, temp = tempfile.mkstemp(suffix='.json', dir=self.directory)
+        with os.fdopen(handle, 'w') as _file:
+            json.dump(metadata, _file, indent=2)
+        _replace(temp, self.metadataPath(key))
+
+    def __contains__(self, key):
+        return (osp.exists(self.path(key)) and
+                osp.exists(self.metadataPath(key)))
+
+    def get(self, key):
+        ''' Metadata of the entry, marked as used, or None on a miss '''
+        metadata = self._readMetadata(key) if key in self else None
+        if metadata is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        metadata['lastUsed'] = time.time()
+        try:
+            self._writeMetadata(key, metadata)
+        except (IOError, OSError):
+            # a read only cache still serves its entries
+            pass
+        return metadata
+
+    def put(self, key, write, metadata=None):
+        ''' Add an entry, write(path) writes its data file
+
+        :return: the metadata stored
+        '''
+        if not osp.isdir(self.directory):
+            os.makedirs(self.directory)
+        handle, temp = tempfile.mkstemp(
+                suffix=self.extension, dir=self.directory)
+        os.close(handle)
+        try:
+            write(temp)
+            _replace(temp, self.path(key))
+        finally:
+            if osp.exists(temp):
+                os.remove(temp)
+        metadata = dict(metadata or {})
+        metadata.update(key=key, size=osp.getsize(self.path(key)),
+                        created=time.time(), lastUsed=time.time())
+        self._writeMetadata(key, metadata)
+        self.evict(keep=key)
+        return metadata
+
+    def remove(self, key):
+        for path in (self.path(key), self.metadataPath(key)):
+            if osp.exists(path):
+                os.remove(path)
+
+    def entries(self):
+        ''' Metadata of all the entries, least recently used first '''
+        if not osp.isdir(self.directory):
+            return []
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.json'):
+                continue
+            metadata = self._readMetadata(name[:-len('.json')])
+            if metadata is not None and 'key' in metadata:
+                entries.append(metadata)
+        return sorted(entries, key=lambda entry: entry.get('lastUsed', 0))
+
+    def size(self):
+        return sum(entry.get('size', 0) for entry in self.entries())
+
+    def evict(self, keep=None):
+        ''' Remove the least recently used entries until the cache fits in
+        maxSize, keep is never evicted
+
+        :return: keys evicted
+        '''
+        if self.maxSize is None:
+            return []
+        entries = self.entries()
+        size = sum(entry.get('size', 0) for entry in entries)
+        evicted = []
+        for entry in entries:
+            if size <= self.maxSize:
+                break
+            if entry['key'] == keep:
+                continue
+            self.remove(entry['key'])
+            size -= entry.get('size', 0)
+            evicted.append(entry['key'])
+        self.evictions += len(evicted)
+        return evicted
+
+    def clear(self):
+        for entry in self.entries():
+            self.remove(entry['key'])
+
+    def stats(self):
+        entries = self.entries()
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hitRate': self.hits / float(lookups) if lookups else 0.0,
+            'evictions': self.evictions,
+            'entries': len(entries),
+            'size': sum(entry.get('size', 0) for entry in entries),
+            'maxSize': self.maxSize}
+
+    def __repr__(self):
+        return 'DiskCache(%r, %d hits, %d misses)' % (
+            self.directory, self.hits, self.misses)
@@ -0,0 +1,331 @@
+'''
+Created on Oct 18, 2026
+
+Re-retargeting only what an edit touched.
+
+Every :func:`reapply` keeps a record of the run: digests of the mappings, of
+every entry of the cr mapping and checksums of the mocap curves per joint
+and block of frames. The next run compares the take and mappings against the
+record:
+
+* an entry of the cr mapping changed, the control is baked again over the
+  whole range
+* the curves of a mocap joint changed over some blocks, every control is
+  baked again over those frames, padded by ``margin``, as HIK solves the
+  whole body from every joint
+* anything else changed, a skeleton mapping, the bake options or the frame
+  range of the take, or there is no record, the whole rig is baked as
+  :func:`moctor.apply` would
+
+The new keys are spliced into the curves baked before with
+:func:`bake.spliceControls`, so a fix to a few frames of a take costs a bake
+of those frames only::
+
+    incremental.reapply('take_v2.fbx', 'rig:', 'iPi', 'AdvancedSkeleton')
+
+Records are kept in :data:`recordCache` by scene and rig namespace. The
+comparison, :func:`diff`, needs no maya.
+'''
+
+import os
+import json
+import zlib
+
+import numpy as np
+
+from .diskcache import DiskCache, hashData
+
+
+VERSION = 1
+
+# frames a checksum covers
+DEFAULT_BLOCK_SIZE = 16
+# frames a dirty window is padded by at both ends
+DEFAULT_MARGIN = 4
+
+RECORD_DIR = os.environ.get(
+        'MOCTOR_RECORDS', os.path.join('~', '.moctor', 'records'))
+
+recordCache = DiskCache(RECORD_DIR, None, '.record')
+
+
+class Dirty(object):
+    ''' What a run has to bake again
+
+    :ivar full: bake everything, the reasons say why
+    :ivar controls: controls, without namespace, to bake over the whole range
+    :ivar windows: [(startFrame, endFrame)] to bake every control over
+    '''
+
+    def __init__(self, full=False, controls=(), windows=(), reasons=()):
+        self.full = full
+        self.controls = sorted(controls)
+        self.windows = list(windows)
+        self.reasons = list(reasons)
+
+    @property
+    def clean(self):
+        return not (self.full or self.controls or self.windows)
+
+    @property
+    def frames(self):
+        ''' Frames of the windows '''
+        return sum(end - start + 1 for start, end in self.windows)
+
+    def toDict(self):
+        return {'full': self.full, 'controls': self.controls,
+                'windows': self.windows, 'reasons': self.reasons}
+
+    def __repr__(self):
+        if self.full:
+            return 'Dirty(full: %s)' % '; '.join(self.reasons)
+        return 'Dirty(%d controls, %d windows over %d frames)' % (
+            len(self.controls), len(self.windows), self.frames)
+
+
+def mappingDigests(mapping):
+    ''' {node: digest} of the entries of a mapping '''
+    return dict((str(node), hashData(value))
+                for node, value in mapping.items())
+
+
+def blockChecksums(times, values, columns, blockSize=DEFAULT_BLOCK_SIZE):
+    ''' Checksums of the values of groups of channels over blocks of frames
+
+    :param times: (frames,) increasing frames
+    :param values: (frames, channels)
+    :param columns: {name: [channel column]}
+    :return: {name: {block: crc32}}, block being frame // blockSize
+    '''
+    times = np.asarray(times, dtype=np.float64)
+    # rounded so that curves read back the same compare the same
+    values = np.round(np.asarray(values, dtype=np.float64), 6)
+    blocks = np.floor(times / blockSize).astype(int)
+    starts = np.flatnonzero(np.r_[True, blocks[1:] != blocks[:-1]])
+    stops = np.r_[starts[1:], len(blocks)]
+    checksums = {}
+    for name, cols in columns.items():
+        group = np.ascontiguousarray(values[:, cols])
+        checksums[name] = dict(
+            (str(blocks[start]), zlib.crc32(group[start:stop].tobytes()))
+            for start, stop in zip(starts, stops))
+    return checksums
+
+
+def dirtyBlocks(previous, current):
+    ''' Blocks whose checksum of any name differs, or that only one of the
+    two has '''
+    dirty = set()
+    for name in set(previous) | set(current):
+        old, new = previous.get(name, {}), current.get(name, {})
+        dirty.update(int(block) for block in set(old) | set(new)
+                     if old.get(block) != new.get(block))
+    return dirty
+
+
+def blockWindows(blocks, blockSize, margin, startFrame, endFrame):
+    ''' Merge blocks into frame windows, padded by margin and clipped to the
+    range '''
+    windows = []
+    for block in sorted(blocks):
+        start = max(block * blockSize - margin, startFrame)
+        end = min((block + 1) * blockSize - 1 + margin, endFrame)
+        if start > end:
+            continue
+        if windows and start <= windows[-1][1] + 1:
+            windows[-1] = (windows[-1][0], max(windows[-1][1], end))
+        else:
+            windows.append((start, end))
+    return windows
+
+
+# compared as they are, a change of any of them bakes everything. A new range
+# does too, the keys baked past a shorter take would be kept otherwise
+_GLOBAL_KEYS = ('version', 'mocapMapping', 'rigMapping', 'mocapSkeleton',
+                'rigSkeleton', 'sampleBy', 'blockSize', 'preprocess', 'range')
+
+
+def diff(previous, record, margin=DEFAULT_MARGIN):
+    ''' :class:`Dirty` from the record of the last run to that of this one
+    '''
+    if not previous:
+        return Dirty(True, reasons=['no record of a previous run'])
+    reasons = ['%s changed' % key for key in _GLOBAL_KEYS
+               if previous.get(key) != record.get(key)]
+    if reasons:
+        return Dirty(True, reasons=reasons)
+
+    old, new = previous['controls'], record['controls']
+    controls = [control for control in new if old.get(control) != new[control]]
+    removed = sorted(set(old) - set(new))
+    if removed:
+        reasons.append('%d controls no longer mapped keep their keys' %
+                       len(removed))
+    if controls:
+        reasons.append('%d cr mapping entries changed' % len(controls))
+
+    startFrame, endFrame = record['range']
+    blocks = dirtyBlocks(previous['blocks'], record['blocks'])
+    windows = blockWindows(blocks, record['blockSize'], margin,
+                           startFrame, endFrame)
+    if windows:
+        reasons.append('mocap changed over %d blocks' % len(blocks))
+    return Dirty(False, controls, windows, reasons)
+
+
+##########
+#  Maya  #
+##########
+
+
+def recordKey(rigNamespace):
+    import pymel.core as pc
+    return recordCache.key(str(pc.sceneName()), rigNamespace)
+
+
+def loadRecord(rigNamespace, cache=None):
+    ''' The record of the last run on a rig or None '''
+    cache = recordCache if cache is None else cache
+    key = recordKey(rigNamespace)
+    if cache.get(key) is None:
+        return None
+    try:
+        with open(cache.path(key)) as _file:
+            return json.load(_file)
+    except (IOError, OSError, ValueError):
+        return None
+
+
+def saveRecord(rigNamespace, record, cache=None):
+    cache = recordCache if cache is None else cache
+
+    def write(path):
+        with open(path, 'w') as _file:
+            json.dump(record, _file)
+    return cache.put(recordKey(rigNamespace), write,
+                     {'rigNamespace': rigNamespace})
+
+
+def takeChecksums(mocapNamespace, mocapMapping, startFrame, endFrame,
+                  sampleBy=1, blockSize=DEFAULT_BLOCK_SIZE):
+    ''' :func:`blockChecksums` of the curves of every joint of a take '''
+    from . import animfile, bake, preprocess
+    from . import bakecurves as bc
+
+    joints = preprocess.skeletonJoints(mocapNamespace, mocapMapping)
+    pairs, _, keys = bake.getCurvesKeys(joints)
+    times = bc.frameTimes(startFrame, endFrame, sampleBy)
+    values = animfile.collect(keys, times, np.float64)[1].T
+    columns = {}
+    for idx, (joint, _) in enumerate(pairs):
+        columns.setdefault(joint[len(mocapNamespace):], []).append(idx)
+    return blockChecksums(times, values, columns, blockSize)
+
+
+def makeRecord(retarget, mocapPath, startFrame, endFrame, sampleBy=1,
+               blockSize=DEFAULT_BLOCK_SIZE, preprocess=None):
+    ''' The record of a run on a :class:`moctor.Retarget` '''
+    from .mappings import MappingTypes, loadMapping
+
+    def load(name, typ):
+        return list(loadMapping(name, typ).items())
+
+    return {
+        'version': VERSION,
+        'mocapPath': mocapPath,
+        'mocapNamespace': retarget.mocapNamespace,
+        'mocapMapping': retarget.mocapMapping,
+        'rigMapping': retarget.rigMapping,
+        'mocapSkeleton': hashData(
+            load(retarget.mocapMapping, MappingTypes.sk)),
+        'rigSkeleton': hashData(load(retarget.rigMapping, MappingTypes.sk)),
+        'controls': mappingDigests(loadMapping(
+            retarget.rigMapping, MappingTypes.cr)),
+        'sampleBy': sampleBy,
+        'blockSize': blockSize,
+        'preprocess': preprocess or None,
+        'range': [startFrame, endFrame],
+        'blocks': takeChecksums(retarget.mocapNamespace,
+                                retarget.mocapMapping, startFrame, endFrame,
+                                sampleBy, blockSize)}
+
+
+def reapply(mocapPath, rigNamespace, mocapMapping='iPi',
+            rigMapping='AdvancedSkeleton', sampleBy=1,
+            margin=DEFAULT_MARGIN, blockSize=DEFAULT_BLOCK_SIZE,
+            useCache=False, preprocess=None, evaluation=None, force=False,
+            cache=None):
+    ''' Retarget a take onto a rig baked before, baking again only the
+    controls and frames the changes since the last run touch
+
+    The take left in the scene by the last run is replaced by mocapPath,
+    both are characterized again, see :func:`moctor.characterize`, the
+    dirty part is baked and spliced and the record is updated.
+
+    :param force: bake everything, and record the run
+    :param cache: of the records, :data:`recordCache` by default
+    :return: the :class:`Dirty` baked
+    '''
+    import pymel.core as pc
+    from . import bake, moctor
+    from .profiling import stage
+    from .suspend import suspended
+
+    if not rigNamespace.endswith(':'):
+        rigNamespace += ':'
+    previous = loadRecord(rigNamespace, cache)
+    moctor.prepareHIK(0)
+
+    with suspended('reapply', undo='off', evaluation=evaluation):
+        crMapping = moctor.loadMapping(rigMapping, moctor.MappingTypes.cr)
+        controls = moctor.getRigControls(rigNamespace, crMapping)
+        # the curves baked last time, the re-link drives the controls from
+        # HIK again
+        animCurves = bake.getControlCurves(controls)
+
+        if previous and previous.get('mocapMapping'):
+            oldRoot = previous['mocapNamespace'] + moctor.getMappingRoot(
+                    moctor.loadMapping(previous['mocapMapping']))
+            if pc.objExists(oldRoot):
+                pc.delete(oldRoot)
+
+        retarget = moctor.characterize(
+                mocapPath, rigNamespace, mocapMapping, rigMapping,
+                useCache=useCache, preprocess=preprocess)
+        try:
+            startFrame, endFrame = moctor.getAnimRange(retarget.mocapRoot)
+            pc.playbackOptions(minTime=startFrame, maxTime=endFrame)
+            with stage('recordTake'):
+                record = makeRecord(retarget, mocapPath, startFrame, endFrame,
+                                    sampleBy, blockSize, preprocess)
+            dirty = diff(None if force else previous, record, margin)
+
+            # controls never baked are dirty over the whole range
+            baked = set(name.rsplit('.', 1)[0] for name in animCurves)
+            unbaked = [control[len(rigNamespace):] for control in controls
+                       if control not in baked and pc.objExists(control)]
+            if unbaked and not dirty.full:
+                dirty.controls = sorted(set(dirty.controls) | set(unbaked))
+                dirty.reasons.append('%d controls not baked before' %
+                                     len(unbaked))
+
+            with stage('bakeRig'):
+                if dirty.full:
+                    moctor.bakeRig(rigNamespace, retarget.mocapNamespace,
+                                   mocapMapping, rigMapping, sampleBy=sampleBy)
+                else:
+                    full = set(rigNamespace + control
+                               for control in dirty.controls)
+                    rest = [control for control in controls
+                            if control not in full]
+                    # also drives the clean controls by their curves again
+                    bake.spliceControls(
+                            [(sorted(full), [(startFrame, endFrame)]),
+                             (rest, dirty.windows)],
+                            sampleBy, animCurves)
+        finally:
+            with stage('cleanupHIK'):
+                moctor.cleanupHIK(retarget.mocapDefinition,
+                                  retarget.rigDefinition)
+        saveRecord(rigNamespace, record, cache)
+    return dirty
@@ -0,0 +1,122 @@
+'''
+Created on Oct 18, 2026
+
+Loading plugins, mel scripts and modules on first use rather than on import.
+
+Functions that need a plugin or a mel procedure are decorated with
+:func:`requires`, which loads what is missing the first time any of them is
+called and costs a set lookup afterwards. Modules that are only needed to show
+a dialog are bound to a :class:`LazyModule` that imports them on first
+attribute access::
+
+    cui = LazyModule('cui')
+
+    @requires(plugins=('mayaHIK',), mel=(MEL_PROC_FILE,))
+    def mapSkeleton(...):
+        ...
+'''
+
+import sys
+import functools
+import threading
+
+import pymel.core as pc
+
+
+_loaded = set()
+_lock = threading.RLock()
+
+
+def loadPlugins(*names):
+    ''' Load the plugins that are not loaded yet '''
+    for name in names:
+        key = ('plugin', name)
+        if key in _loaded:
+            continue
+        with _lock:
+            if key in _loaded:
+                continue
+            if not pc.pluginInfo(name, q=True, loaded=True):
+                pc.loadPlugin(name, quiet=True)
+            _loaded.add(key)
+
+
+def sourceMel(*paths):
+    ''' Source the mel files that were not sourced by this module yet '''
+    for path in paths:
+        key = ('mel', path)
+        if key in _loaded:
+            continue
+        with _lock:
+            if key in _loaded:
+                continue
+            pc.mel.source(path.replace('\\', '/'))
+            _loaded.add(key)
+
+
+def evalMel(script):
+    ''' Evaluate a mel script, defining global procs say, once '''
+    key = ('eval', hash(script))
+    if key in _loaded:
+        return
+    with _lock:
+        if key not in _loaded:
+            pc.mel.eval(script)
+            _loaded.add(key)
+
+
+def requires(plugins=(), mel=()):
+    ''' Decorator loading plugins and sourcing mel files before the first call
+    of the decorated function '''
+    def decorator(func):
+        keys = set([('plugin', name) for name in plugins] +
+                   [('mel', path) for path in mel])
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not keys.issubset(_loaded):
+                loadPlugins(*plugins)
+                sourceMel(*mel)
+            return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def reset():
+    ''' Forget what was loaded, after a new maya session for instance '''
+    with _lock:
+        _loaded.clear()
+
+
+def loaded():
+    return sorted(_loaded)
+
+
+class LazyModule(object):
+    ''' A module imported on first attribute access '''
+
+    def __init__(self, name):
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+
+    def _load(self):
+        module = self.__dict__['_module']
+        if module is None:
+            __import__(self._name)
+            module = sys.modules[self._name]
+            self.__dict__['_module'] = module
+        return module
+
+    @property
+    def isLoaded(self):
+        return self.__dict__['_module'] is not None
+
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._load(), name, value)
+
+    def __repr__(self):
+        return '<LazyModule %r%s>' % (
+            self._name, '' if self.isLoaded else ' (not loaded)')
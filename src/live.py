@@ -0,0 +1,645 @@
+'''
+Created on Oct 18, 2026
+
+Live mocap: joint rotations streamed to a local socket are applied to the
+mocap skeleton, or straight to the rig controls, as they arrive.
+
+A frame is a json object, one per datagram over udp or one per line over
+tcp::
+
+    {"frame": 12, "time": 1760745600.25,
+     "joints": {"Hips": [tx, ty, tz, rx, ry, rz], "1": [rx, ry, rz], ...}}
+
+Joints are addressed by the names of the mocap mapping or by their HIK ids,
+with three rotate values in degrees or translate and rotate. ``time`` is when
+the frame was sent and gives the transit latency on the same machine.
+
+The :class:`Receiver` runs an asyncio loop in a thread and fills a bounded
+:class:`JitterBuffer`. Maya takes the newest frame from it whenever it is
+idle, so the frames it had no time for are dropped rather than queued up::
+
+    session = LiveSession.toSkeleton('rokoko:', 'rokoko')
+    session.start()
+    session.startRecording()
+    ...
+    session.stop()
+    print(session.stats.snapshot())
+
+Takes are replayed to a receiver for testing with::
+
+    python -m mocapToRig.src.live take.bvh --port 9763 --loop
+
+The asyncio receiver needs python 3, maya 2022 or later.
+'''
+
+import sys
+import json
+import time
+import asyncio
+import threading
+from collections import deque
+
+from . import mappings
+
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 9763
+
+
+############
+#  Frames  #
+############
+
+
+class LiveFrame(object):
+    ''' A decoded frame, joints are {name: values} '''
+
+    __slots__ = ('frame', 'sent', 'received', 'joints')
+
+    def __init__(self, frame, joints, sent=None, received=None):
+        self.frame = frame
+        self.joints = joints
+        self.sent = sent
+        self.received = received
+
+    def __repr__(self):
+        return 'LiveFrame(%d, %d joints)' % (self.frame, len(self.joints))
+
+
+def encodeFrame(frame, joints, sent=None):
+    ''' A frame as sent on the wire, joints are {name or id: values} '''
+    return json.dumps({
+        'frame': frame,
+        'time': time.time() if sent is None else sent,
+        'joints': dict((str(key), [round(float(value), 5)
+                                   for value in values])
+                       for key, values in joints.items())},
+        separators=(',', ':')).encode('utf-8')
+
+
+def jointResolver(mapping):
+    ''' {key on the wire: joint name} for the joints of a skeleton mapping,
+    their names, short names and HIK ids '''
+    resolve = {}
+    for name, num in mapping.items():
+        resolve.setdefault(str(num), name)
+        resolve[name] = name
+        resolve.setdefault(name.split(':')[-1], name)
+    return resolve
+
+
+def decodeFrame(data, resolve=None, received=None):
+    ''' A :class:`LiveFrame` from bytes, joints not in resolve are left out
+    when it is given
+
+    :raises ValueError: on malformed frames
+    '''
+    if isinstance(data, bytes):
+        data = data.decode('utf-8')
+    message = json.loads(data)
+    joints = {}
+    for key, values in message['joints'].items():
+        if resolve is not None:
+            key = resolve.get(key)
+            if key is None:
+                continue
+        if len(values) not in (3, 6):
+            raise ValueError('Joint %s has %d values' % (key, len(values)))
+        joints[key] = [float(value) for value in values]
+    return LiveFrame(int(message['frame']), joints, message.get('time'),
+                     time.time() if received is None else received)
+
+
+###########
+#  Stats  #
+###########
+
+
+class LiveStats(object):
+    ''' Counters and latencies of a live session
+
+    transit is from the sender to the receiver, apply from the receiver to
+    the frame being applied in maya, both in seconds over the last window
+    frames '''
+
+    def __init__(self, window=120):
+        self.received = 0
+        self.malformed = 0
+        self.overflow = 0
+        self.stale = 0
+        self.skipped = 0
+        self.applied = 0
+        self.recorded = 0
+        self.transit = deque(maxlen=window)
+        self.apply = deque(maxlen=window)
+        self.appliedTimes = deque(maxlen=window)
+        self.startTime = time.time()
+
+    def frameApplied(self, frame, now=None):
+        now = time.time() if now is None else now
+        self.applied += 1
+        self.appliedTimes.append(now)
+        if frame.sent is not None:
+            self.transit.append(frame.received - frame.sent)
+        self.apply.append(now - frame.received)
+
+    @staticmethod
+    def _mean(values):
+        return sum(values) / float(len(values)) if values else None
+
+    @property
+    def fps(self):
+        ''' Frames applied per second over the window '''
+        times = self.appliedTimes
+        if len(times) < 2 or times[-1] == times[0]:
+            return 0.0
+        return (len(times) - 1) / (times[-1] - times[0])
+
+    @property
+    def dropped(self):
+        return self.overflow + self.stale + self.skipped
+
+    def snapshot(self):
+        return {
+            'received': self.received,
+            'malformed': self.malformed,
+            'applied': self.applied,
+            'recorded': self.recorded,
+            'dropped': self.dropped,
+            'overflow': self.overflow,
+            'stale': self.stale,
+            'skipped': self.skipped,
+            'fps': self.fps,
+            'transitLatency': self._mean(self.transit),
+            'applyLatency': self._mean(self.apply),
+            'maxApplyLatency': max(self.apply) if self.apply else None,
+            'elapsed': time.time() - self.startTime}
+
+    def __repr__(self):
+        return 'LiveStats(%d received, %d applied, %d dropped, %.1ffps)' % (
+            self.received, self.applied, self.dropped, self.fps)
+
+
+class JitterBuffer(object):
+    ''' The last capacity frames in frame order, shared by the receiver
+    thread and maya
+
+    Frames older than the last one taken are stale and dropped, as is the
+    oldest frame when the buffer is full. :meth:`latest` hands out the newest
+    frame and drops the older ones, which maya had no time for. '''
+
+    def __init__(self, capacity=8, stats=None):
+        self.capacity = capacity
+        self.stats = LiveStats() if stats is None else stats
+        self.frames = deque()
+        self.lastTaken = None
+        self._lock = threading.Lock()
+
+    def push(self, frame):
+        with self._lock:
+            self.stats.received += 1
+            if self.lastTaken is not None and frame.frame <= self.lastTaken:
+                self.stats.stale += 1
+                return False
+            if self.frames and frame.frame <= self.frames[-1].frame:
+                # out of order, rare enough for a linear insert
+                frames = sorted([f for f in self.frames
+                                 if f.frame != frame.frame] + [frame],
+                                key=lambda f: f.frame)
+                self.stats.stale += len(self.frames) + 1 - len(frames)
+                self.frames = deque(frames)
+            else:
+                self.frames.append(frame)
+            while len(self.frames) > self.capacity:
+                self.frames.popleft()
+                self.stats.overflow += 1
+            return True
+
+    def latest(self):
+        ''' The newest frame or None, older frames are dropped '''
+        with self._lock:
+            if not self.frames:
+                return None
+            frame = self.frames.pop()
+            self.stats.skipped += len(self.frames)
+            self.frames.clear()
+            self.lastTaken = frame.frame
+            return frame
+
+    def clear(self):
+        with self._lock:
+            self.frames.clear()
+            self.lastTaken = None
+
+    def __len__(self):
+        return len(self.frames)
+
+
+##############
+#  Receiver  #
+##############
+
+
+class _DatagramProtocol(asyncio.DatagramProtocol):
+
+    def __init__(self, receiver):
+        self.receiver = receiver
+
+    def datagram_received(self, data, addr):
+        self.receiver.feed(data)
+
+
+class _StreamProtocol(asyncio.Protocol):
+
+    def __init__(self, receiver):
+        self.receiver = receiver
+        self.pending = b''
+
+    def data_received(self, data):
+        lines = (self.pending + data).split(b'\n')
+        self.pending = lines.pop()
+        for line in lines:
+            if line.strip():
+                self.receiver.feed(line)
+
+
+class Receiver(object):
+    ''' Listens for frames on a local socket from a thread of its own
+
+    :param resolve: {key on the wire: joint name}, see :func:`jointResolver`
+    :param transport: 'udp' or 'tcp'
+    '''
+
+    def __init__(self, buffer, resolve=None, host=DEFAULT_HOST,
+                 port=DEFAULT_PORT, transport='udp'):
+        if transport not in ('udp', 'tcp'):
+            raise ValueError('Unknown transport %r' % transport)
+        self.buffer = buffer
+        self.resolve = resolve
+        self.host = host
+        self.port = port
+        self.transport = transport
+        self.address = None
+        self._loop = None
+        self._thread = None
+        self._ready = threading.Event()
+        self._error = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def feed(self, data):
+        try:
+            frame = decodeFrame(data, self.resolve)
+        except (ValueError, KeyError, TypeError):
+            self.buffer.stats.malformed += 1
+            return
+        self.buffer.push(frame)
+
+    async def _serve(self):
+        loop = asyncio.get_event_loop()
+        if self.transport == 'udp':
+            endpoint, _ = await loop.create_datagram_endpoint(
+                    lambda: _DatagramProtocol(self),
+                    local_addr=(self.host, self.port))
+            self.address = endpoint.get_extra_info('sockname')[:2]
+        else:
+            endpoint = await loop.create_server(
+                    lambda: _StreamProtocol(self), self.host, self.port)
+            self.address = endpoint.sockets[0].getsockname()[:2]
+        return endpoint
+
+    def _run(self):
+        loop = self._loop
+        asyncio.set_event_loop(loop)
+        try:
+            endpoint = loop.run_until_complete(self._serve())
+        except OSError as error:
+            self._error = error
+            self._ready.set()
+            loop.close()
+            return
+        self._ready.set()
+        try:
+            loop.run_forever()
+        finally:
+            endpoint.close()
+            loop.close()
+
+    def start(self, timeout=5.0):
+        ''' Start listening, :return: the (host, port) bound '''
+        if self.running:
+            return self.address
+        self._loop = asyncio.new_event_loop()
+        self._ready.clear()
+        self._error = None
+        self._thread = threading.Thread(
+                target=self._run, name='moctor-live-receiver')
+        self._thread.daemon = True
+        self._thread.start()
+        self._ready.wait(timeout)
+        if self._error is not None:
+            raise self._error
+        return self.address
+
+    def stop(self, timeout=5.0):
+        if not self.running:
+            return
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout)
+        self._thread = None
+
+
+############
+#  Target  #
+############
+
+
+class LiveTarget(object):
+    ''' The scene nodes a live frame drives
+
+    :param nodes: {joint name: [scene nodes]}
+    :param translated: joints whose translation is applied as well
+    '''
+
+    def __init__(self, nodes, translated=()):
+        self.nodes = nodes
+        self.translated = set(translated)
+
+    @classmethod
+    def fromSkeleton(cls, namespace, mocapMapping):
+        ''' The joints of the mocap skeleton in namespace '''
+        from . import pose
+
+        mapping = mappings.loadMapping(mocapMapping, mappings.MappingTypes.sk)
+        found = set(pose.mappingNodes(namespace, mapping))
+        nodes = dict((name, [namespace + name]) for name in mapping
+                     if namespace + name in found)
+        return cls(nodes, [mappings.getMappingRoot(mapping)])
+
+    @classmethod
+    def fromControls(cls, namespace, mocapMapping, rigMapping):
+        ''' The rig controls in namespace on the HIK ids of the joints, the
+        rotations are copied as they come, with no retargeting '''
+        from . import pose
+
+        mapping = mappings.loadMapping(mocapMapping, mappings.MappingTypes.sk)
+        controls = mappings.loadMapping(rigMapping, mappings.MappingTypes.cr)
+        found = set(pose.mappingNodes(namespace, controls))
+        nodes = {}
+        for name, num in mapping.items():
+            targets = [namespace + control
+                       for control in controls.getElements(num)
+                       if namespace + control in found]
+            if targets:
+                nodes[name] = targets
+        return cls(nodes, [mappings.getMappingRoot(mapping)])
+
+    def values(self, frame):
+        ''' {node: {attr: values}} of a frame for :func:`pose.setValues` '''
+        values = {}
+        for joint, jointValues in frame.joints.items():
+            targets = self.nodes.get(joint)
+            if not targets:
+                continue
+            attrs = {'rotate': jointValues[-3:]}
+            if len(jointValues) == 6 and joint in self.translated:
+                attrs['translate'] = jointValues[:3]
+            for node in targets:
+                values[node] = attrs
+        return values
+
+    def allNodes(self):
+        return sorted(set(node for nodes in self.nodes.values()
+                          for node in nodes))
+
+
+#############
+#  Session  #
+#############
+
+
+class LiveSession(object):
+    ''' Receives frames and applies the newest one whenever maya is idle
+
+    :param rate: frames per second of the capture, to place the recorded
+        keys, by default one key per scene frame
+    '''
+
+    def __init__(self, target, resolve=None, host=DEFAULT_HOST,
+                 port=DEFAULT_PORT, transport='udp', capacity=8, rate=None):
+        self.target = target
+        self.stats = LiveStats()
+        self.buffer = JitterBuffer(capacity, self.stats)
+        self.receiver = Receiver(self.buffer, resolve, host, port, transport)
+        self.rate = rate
+        self.recording = False
+        self.recordStart = None
+        self.firstFrame = None
+        self._job = None
+
+    @classmethod
+    def toSkeleton(cls, namespace, mocapMapping, **kwargs):
+        mapping = mappings.loadMapping(mocapMapping, mappings.MappingTypes.sk)
+        return cls(LiveTarget.fromSkeleton(namespace, mocapMapping),
+                   jointResolver(mapping), **kwargs)
+
+    @classmethod
+    def toControls(cls, namespace, mocapMapping, rigMapping, **kwargs):
+        mapping = mappings.loadMapping(mocapMapping, mappings.MappingTypes.sk)
+        return cls(LiveTarget.fromControls(namespace, mocapMapping,
+                                           rigMapping),
+                   jointResolver(mapping), **kwargs)
+
+    def start(self, idle=True):
+        ''' Start receiving, and applying frames on maya's idle event unless
+        idle is False, call :meth:`poll` then
+
+        :return: the (host, port) listened on
+        '''
+        address = self.receiver.start()
+        if idle and self._job is None:
+            import pymel.core as pc
+            self._job = pc.scriptJob(idleEvent=self.poll)
+        return address
+
+    def stop(self):
+        if self._job is not None:
+            import pymel.core as pc
+            if pc.scriptJob(exists=self._job):
+                pc.scriptJob(kill=self._job, force=True)
+            self._job = None
+        self.receiver.stop()
+        self.stopRecording()
+        self.buffer.clear()
+
+    def startRecording(self, startTime=None):
+        ''' Key the nodes with every frame applied from startTime on, the
+        current time by default '''
+        import pymel.core as pc
+        self.recordStart = (pc.currentTime(q=True) if startTime is None
+                            else startTime)
+        self.firstFrame = None
+        self.recording = True
+
+    def stopRecording(self):
+        self.recording = False
+
+    def recordTime(self, frame):
+        if self.firstFrame is None:
+            self.firstFrame = frame.frame
+        offset = frame.frame - self.firstFrame
+        if self.rate:
+            import pymel.core as pc
+            offset *= pc.mel.currentTimeUnitToFPS() / float(self.rate)
+        return self.recordStart + offset
+
+    def poll(self):
+        ''' Apply the newest frame received, if any
+
+        :return: the frame applied or None
+        '''
+        from . import pose
+
+        frame = self.buffer.latest()
+        if frame is None:
+            return None
+        values = self.target.values(frame)
+        if values:
+            pose.setValues(values)
+        self.stats.frameApplied(frame)
+        if self.recording and values:
+            translated = [node for node, attrs in values.items()
+                          if 'translate' in attrs]
+            time_ = self.recordTime(frame)
+            pose.keyNodes(sorted(values), ('rotate',), time_)
+            if translated:
+                pose.keyNodes(translated, ('translate',), time_)
+            self.stats.recorded += 1
+        return frame
+
+
+############
+#  Replay  #
+############
+
+
+class ReplaySender(object):
+    ''' Streams a recorded take to a receiver at its frame rate
+
+    :param mapping: send the joints by the HIK ids of this skeleton mapping
+        rather than by name
+    :param speed: multiplies the frame rate
+    '''
+
+    def __init__(self, path, host=DEFAULT_HOST, port=DEFAULT_PORT,
+                 transport='udp', speed=1.0, loop=False, mapping=None):
+        from . import mocapfile
+
+        self.take = mocapfile.read(path)
+        self.host = host
+        self.port = port
+        self.transport = transport
+        self.speed = speed
+        self.loop = loop
+        self.keys = list(self.take.joints)
+        if mapping is not None:
+            mapping = mappings.loadMapping(mapping, mappings.MappingTypes.sk)
+            ids = dict((name.split(':')[-1], num)
+                       for name, num in mapping.items())
+            self.keys = [ids.get(name, name) for name in self.take.shortNames]
+        self.sent = 0
+        self._stopped = threading.Event()
+
+    def frames(self):
+        ''' (frame, joints) to send, frames keep counting up when looping
+        so that the receiver does not take them for stale ones '''
+        take = self.take
+        frame = take.startFrame
+        while True:
+            for row in range(take.frameCount):
+                data = take.data[row]
+                yield frame, dict(
+                    (key, data[idx]) for idx, key in enumerate(self.keys))
+                frame += 1
+            if not self.loop:
+                return
+
+    async def _send(self):
+        loop = asyncio.get_event_loop()
+        if self.transport == 'udp':
+            transport, _ = await loop.create_datagram_endpoint(
+                    asyncio.DatagramProtocol,
+                    remote_addr=(self.host, self.port))
+            send = transport.sendto
+        else:
+            transport, _ = await loop.create_connection(
+                    asyncio.Protocol, self.host, self.port)
+
+            def send(data):
+                transport.write(data + b'\n')
+        interval = 1.0 / ((self.take.frameRate or 30.0) * self.speed)
+        start = loop.time()
+        count = 0
+        try:
+            for frame, joints in self.frames():
+                if self._stopped.is_set():
+                    break
+                send(encodeFrame(frame, joints))
+                self.sent += 1
+                count += 1
+                # on the clock rather than sleeping an interval per frame so
+                # that the rate does not drift
+                delay = start + count * interval - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+        finally:
+            transport.close()
+
+    def run(self):
+        ''' Send the take, blocks until it is over or :meth:`stop` '''
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(self._send())
+        finally:
+            loop.close()
+
+    def start(self):
+        thread = threading.Thread(target=self.run, name='moctor-live-replay')
+        thread.daemon = True
+        thread.start()
+        return thread
+
+    def stop(self):
+        self._stopped.set()
+
+
+def main(args=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(
+            description='Stream a bvh or ascii fbx take to a live session')
+    parser.add_argument('path')
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--tcp', action='store_true')
+    parser.add_argument('--speed', type=float, default=1.0)
+    parser.add_argument('--loop', action='store_true')
+    parser.add_argument('--mapping', help='send joints by the HIK ids of '
+                        'this skeleton mapping')
+    opts = parser.parse_args(args)
+
+    sender = ReplaySender(opts.path, opts.host, opts.port,
+                          'tcp' if opts.tcp else 'udp', opts.speed,
+                          opts.loop, opts.mapping)
+    try:
+        sender.run()
+    except KeyboardInterrupt:
+        pass
+    sys.stdout.write('%d frames sent\n' % sender.sent)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
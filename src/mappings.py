@@ -0,0 +1,209 @@
+'''
+Created on Oct 18, 2026
+
+Storing and loading the node to HIK id mappings in MAPPINGS_DIR. Nothing here
+needs maya so mappings can be read and matched against skeletons from plain
+python as well, :mod:`moctor` re-exports all of it.
+'''
+
+import os
+import os.path as osp
+import json
+import glob
+from collections import OrderedDict, namedtuple
+
+
+##################################
+#  Storing and Loading Mappings  #
+##################################
+
+
+MAPPINGS_DIR = osp.join(osp.dirname(osp.dirname(__file__)), 'mappings')
+
+
+class MappingTypes:
+    ''' Mapping Types, Either Skeleton or Control Rig '''
+    sk = Skeleton = 'sk'
+    cr = ControlRig = 'cr'
+
+
+class Mapping(OrderedDict):
+    ''' A loaded node -> HIK id mapping with a precomputed id -> nodes index
+
+    Mappings are shared by every caller through the registry so they are read
+    only, use :meth:`copy` to get an editable dict. '''
+
+    def __init__(self, items=(), name='', typ=MappingTypes.sk):
+        OrderedDict.__init__(self)
+        index = OrderedDict()
+        for node, num in items:
+            OrderedDict.__setitem__(self, node, num)
+            index.setdefault(num, []).append(node)
+        self.name = name
+        self.typ = typ
+        self._index = index
+        self._frozen = True
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError('Mapping %s.%s is read only, use copy()' % (
+            self.name, self.typ))
+
+    def __setitem__(self, key, value, *args, **kwargs):
+        if getattr(self, '_frozen', False):
+            self._readonly()
+        OrderedDict.__setitem__(self, key, value, *args, **kwargs)
+
+    def __delitem__(self, key, *args, **kwargs):
+        if getattr(self, '_frozen', False):
+            self._readonly()
+        OrderedDict.__delitem__(self, key, *args, **kwargs)
+
+    update = pop = popitem = clear = setdefault = _readonly
+
+    def __reduce__(self):
+        return (Mapping, (list(self.items()), self.name, self.typ))
+
+    def copy(self):
+        return OrderedDict(self.items())
+
+    def getIds(self):
+        return list(self._index.keys())
+
+    def getElements(self, index):
+        ''' All nodes mapped on a HIK id, in file order '''
+        return list(self._index.get(index, []))
+
+    def getElement(self, index):
+        nodes = self._index.get(index)
+        if nodes:
+            return nodes[0]
+        return ''
+
+
+class MappingRegistry(object):
+    ''' Process-wide cache of the mappings in a mappings directory
+
+    Every mapping file is parsed once and reparsed only when its
+    modification time or size changes on disk. '''
+
+    def __init__(self, directory=None):
+        self.directory = directory or MAPPINGS_DIR
+        self._cache = {}
+        self.hits = 0
+        self.misses = 0
+
+    def path(self, name, typ=MappingTypes.sk):
+        return osp.join(self.directory, '%s.%s.json' % (name, typ))
+
+    def names(self, typ=MappingTypes.sk):
+        return sorted(
+                osp.basename(_file).split('.')[0]
+                for _file in glob.glob(
+                    osp.join(self.directory, '*.%s.json' % typ)))
+
+    def get(self, name, typ=MappingTypes.sk):
+        path = self.path(name, typ)
+        stat = os.stat(path)
+        stamp = (stat.st_mtime, stat.st_size)
+        cached = self._cache.get((name, typ))
+        if cached is not None and cached[0] == stamp:
+            self.hits += 1
+            return cached[1]
+        self.misses += 1
+        with open(path) as _file:
+            items = json.load(_file, object_pairs_hook=lambda x: x)
+        mapping = Mapping(items, name=name, typ=typ)
+        self._cache[(name, typ)] = (stamp, mapping)
+        return mapping
+
+    def invalidate(self, name=None, typ=None):
+        for key in list(self._cache.keys()):
+            if ((name is None or key[0] == name) and
+                    (typ is None or key[1] == typ)):
+                del self._cache[key]
+
+
+registry = MappingRegistry()
+
+
+def getMappingNames(typ=MappingTypes.sk):
+    return registry.names(typ)
+
+
+def dumpMapping(data, name, typ=MappingTypes.sk):
+    with open(registry.path(name, typ), 'w+') as _fl:
+        result = json.dump(data, _fl, indent=2)
+    registry.invalidate(name, typ)
+    return result
+
+
+def loadMapping(name, typ=MappingTypes.sk):
+    return registry.get(name, typ)
+
+
+def getMappingElement(mapping, index):
+    if isinstance(mapping, Mapping):
+        return mapping.getElement(index)
+    for node, num in mapping.items():
+        if num == index:
+            return node
+    return ''
+
+
+def getMappingElements(mapping, index):
+    if isinstance(mapping, Mapping):
+        return mapping.getElements(index)
+    return [node for node, num in mapping.items() if num == index]
+
+
+def getMappingRoot(mapping):
+    return getMappingElement(mapping, 0) or getMappingElement(mapping, 1)
+
+
+MappingMatch = namedtuple(
+        'MappingMatch',
+        'mapping namespace coverage rootFound found total typ')
+
+
+def scoreMapping(mapping, sceneNodes, namespace=None):
+    ''' Score one mapping against a {namespace: set(names)} listing such as
+    moctor.listSceneNodes, returns (namespace, found, total, rootFound) for
+    every candidate namespace '''
+    if namespace is not None:
+        # as the listing has them, 'ns:' or '' for the root namespace
+        namespace = namespace.strip(':')
+        namespace = namespace + ':' if namespace else ''
+        namespaces = [namespace] if namespace in sceneNodes else []
+    else:
+        namespaces = list(sceneNodes.keys())
+    nodes = set(mapping.keys())
+    root = getMappingRoot(mapping)
+    scores = []
+    for ns in namespaces:
+        names = sceneNodes[ns]
+        found = len(nodes & names)
+        if found:
+            scores.append((ns, found, len(nodes), root in names))
+    return scores
+
+
+def rankMappings(sceneNodes, namespace=None, typ=MappingTypes.sk, names=None,
+                 minCoverage=0.0):
+    ''' Rank every mapping in MAPPINGS_DIR against a {namespace: names}
+    listing, best first on root found, coverage and number of nodes found '''
+    if names is None:
+        names = getMappingNames(typ)
+    matches = []
+    for name in names:
+        mapping = loadMapping(name, typ)
+        if not mapping:
+            continue
+        for ns, found, total, rootFound in scoreMapping(
+                mapping, sceneNodes, namespace):
+            coverage = float(found) / total
+            if coverage >= minCoverage:
+                matches.append(MappingMatch(
+                    name, ns, coverage, rootFound, found, total, typ))
+    matches.sort(key=lambda m: (m.rootFound, m.coverage, m.found),
+                 reverse=True)
+    return matches
@@ -0,0 +1,513 @@
+'''
+Created on Oct 18, 2026
+
+Streaming readers for BVH and ASCII FBX (7.x) mocap takes that need no maya.
+
+The files are read line by line. :func:`readInfo` only parses the hierarchy
+and timing so the frame range, frame rate and joint names of a take are
+available without touching its motion data. :func:`read` fills a single
+preallocated float32 array of shape (frames, joints, 6) holding translate
+x, y, z and rotate x, y, z in degrees for every joint, channels a joint does
+not animate hold its rest value and are flagged False in ``take.animated``.
+'''
+
+import re
+import os.path as osp
+import numpy as np
+
+from . import mappings
+
+
+CHANNELS = ('Xposition', 'Yposition', 'Zposition',
+            'Xrotation', 'Yrotation', 'Zrotation')
+
+FBX_TICKS_PER_SECOND = 46186158000.0
+
+FBX_TIME_MODES = {
+    1: 120.0, 2: 100.0, 3: 60.0, 4: 50.0, 5: 48.0, 6: 30.0, 7: 30.0,
+    8: 29.97, 9: 29.97, 10: 25.0, 11: 24.0, 12: 1000.0, 13: 23.976,
+    15: 96.0, 16: 72.0, 17: 59.94, 18: 119.88}
+
+FBX_ROTATE_ORDERS = ('xyz', 'xzy', 'yzx', 'yxz', 'zxy', 'zyx')
+
+
+class MocapInfo(object):
+    ''' Hierarchy and timing of a take '''
+
+    def __init__(self, path, fmt, joints, parents, offsets, rotateOrders,
+                 frameCount, frameRate, startFrame=0):
+        self.path = path
+        self.format = fmt
+        self.joints = joints
+        self.parents = parents
+        self.offsets = np.asarray(offsets, dtype=np.float32).reshape(-1, 3)
+        self.rotateOrders = rotateOrders
+        self.frameCount = frameCount
+        self.frameRate = frameRate
+        self.startFrame = startFrame
+
+    @property
+    def endFrame(self):
+        return self.startFrame + max(self.frameCount - 1, 0)
+
+    @property
+    def frameRange(self):
+        return self.startFrame, self.endFrame
+
+    @property
+    def shortNames(self):
+        return [joint.split(':')[-1] for joint in self.joints]
+
+    def jointIndex(self, name):
+        try:
+            return self.joints.index(name)
+        except ValueError:
+            return self.shortNames.index(name.split(':')[-1])
+
+    def matchMappings(self, names=None, minCoverage=0.0):
+        ''' Rank the skeleton mappings against the joints of the take '''
+        return mappings.rankMappings(
+                {'': set(self.shortNames)}, '', mappings.MappingTypes.sk,
+                names, minCoverage)
+
+    def __repr__(self):
+        return '%s(%r, %d joints, frames %s-%s @ %sfps)' % (
+            type(self).__name__, osp.basename(self.path), len(self.joints),
+            self.startFrame, self.endFrame, self.frameRate)
+
+
+class MocapTake(MocapInfo):
+    ''' A take with its motion in ``data`` (frames, joints, 6) '''
+
+    def __init__(self, info, data, animated):
+        MocapInfo.__init__(
+                self, info.path, info.format, info.joints, info.parents,
+                info.offsets, info.rotateOrders, info.frameCount,
+                info.frameRate, info.startFrame)
+        self.data = data
+        self.animated = animated
+
+    @property
+    def frames(self):
+        return np.arange(self.frameCount) + self.startFrame
+
+    @property
+    def translations(self):
+        return self.data[:, :, :3]
+
+    @property
+    def rotations(self):
+        return self.data[:, :, 3:]
+
+    def channel(self, joint, channel):
+        return self.data[:, self.jointIndex(joint), CHANNELS.index(channel)]
+
+
+#########
+#  BVH  #
+#########
+
+
+class _BvhHeader(object):
+
+    def __init__(self):
+        self.joints = []
+        self.parents = []
+        self.offsets = []
+        self.channels = []
+        self.frameCount = 0
+        self.frameTime = 0.0
+
+
+def _readBvhHeader(_file):
+    header = _BvhHeader()
+    stack = []
+    endSite = 0
+    for line in _file:
+        tokens = line.split()
+        if not tokens:
+            continue
+        key = tokens[0]
+        if key in ('ROOT', 'JOINT'):
+            header.parents.append(stack[-1] if stack else -1)
+            header.joints.append(tokens[-1])
+            header.offsets.append((0.0, 0.0, 0.0))
+            header.channels.append(())
+            stack.append(len(header.joints) - 1)
+        elif key == 'End':
+            endSite += 1
+        elif key == 'OFFSET' and not endSite:
+            header.offsets[stack[-1]] = tuple(float(x) for x in tokens[1:4])
+        elif key == 'CHANNELS':
+            header.channels[stack[-1]] = tuple(tokens[2:2 + int(tokens[1])])
+        elif key == '}':
+            if endSite:
+                endSite -= 1
+            elif stack:
+                stack.pop()
+        elif key.startswith('Frames'):
+            header.frameCount = int(tokens[-1])
+        elif key == 'Frame' and tokens[1].startswith('Time'):
+            header.frameTime = float(tokens[-1])
+            return header
+    raise ValueError('%s has no MOTION section' % getattr(_file, 'name', ''))
+
+
+def _bvhRotateOrder(channels):
+    axes = [channel[0].lower() for channel in channels
+            if channel.endswith('rotation')]
+    return ''.join(reversed(axes)) or 'xyz'
+
+
+def _bvhInfo(path, header, startFrame):
+    frameRate = round(1.0 / header.frameTime, 3) if header.frameTime else 0.0
+    return MocapInfo(
+            path, 'bvh', header.joints, header.parents, header.offsets,
+            [_bvhRotateOrder(chans) for chans in header.channels],
+            header.frameCount, frameRate, startFrame)
+
+
+def readBvhInfo(path, startFrame=0):
+    with open(path) as _file:
+        return _bvhInfo(path, _readBvhHeader(_file), startFrame)
+
+
+def iterBvhFrames(path, chunkSize=1024):
+    ''' Yield (frameIndex, block) with blocks of at most chunkSize frames of
+    the raw motion rows, shape (frames, channels in file order) '''
+    with open(path) as _file:
+        header = _readBvhHeader(_file)
+        width = sum(len(chans) for chans in header.channels)
+        index = 0
+        lines = []
+        for line in _file:
+            if not line.strip():
+                continue
+            lines.append(line)
+            if len(lines) == chunkSize:
+                yield index, _parseRows(lines, width)
+                index += len(lines)
+                lines = []
+        if lines:
+            yield index, _parseRows(lines, width)
+
+
+def _parseRows(lines, width):
+    block = np.array(' '.join(lines).split(), dtype=np.float32)
+    if block.size != len(lines) * width:
+        raise ValueError('Expected %d values per frame' % width)
+    return block.reshape(len(lines), width)
+
+
+def readBvh(path, startFrame=0, chunkSize=1024):
+    with open(path) as _file:
+        header = _readBvhHeader(_file)
+    info = _bvhInfo(path, header, startFrame)
+
+    targets = []
+    for joint, chans in enumerate(header.channels):
+        for channel in chans:
+            targets.append((joint, CHANNELS.index(channel)))
+    targets = tuple(np.array(idx) for idx in zip(*targets)) if targets else (
+            np.array([], dtype=int), np.array([], dtype=int))
+
+    data = np.zeros((info.frameCount, len(info.joints), 6), dtype=np.float32)
+    data[:, :, :3] = info.offsets
+    animated = np.zeros((len(info.joints), 6), dtype=bool)
+    animated[targets] = True
+
+    frames = 0
+    for index, block in iterBvhFrames(path, chunkSize):
+        if index >= info.frameCount:
+            break
+        block = block[:info.frameCount - index]
+        data[index:index + len(block), targets[0], targets[1]] = block
+        frames = index + len(block)
+    if frames < info.frameCount:
+        data = data[:frames]
+        info.frameCount = frames
+    return MocapTake(info, data, animated)
+
+
+###############
+#  ASCII FBX  #
+###############
+
+
+_FBX_OBJECT = re.compile(r'^(\w+):\s*(-?\d+),\s*"([^"]*)",\s*"([^"]*)"')
+_FBX_TOKEN = re.compile(r'"([^"]*)"|([^,\s]+)')
+
+
+def _fbxTokens(text):
+    return [quoted or bare for quoted, bare in _FBX_TOKEN.findall(text)]
+
+
+class _FbxScene(object):
+
+    def __init__(self):
+        self.version = 0
+        self.timeMode = 0
+        self.customFrameRate = -1.0
+        self.timeSpan = None
+        self.takeSpan = None
+        self.models = {}
+        self.modelOrder = []
+        self.curveNodes = {}
+        self.curves = {}
+        self.connections = []
+
+    @property
+    def frameRate(self):
+        if self.timeMode == 14 and self.customFrameRate > 0:
+            return self.customFrameRate
+        return FBX_TIME_MODES.get(self.timeMode, 30.0)
+
+
+def _parseFbx(path, keys=True, onCurve=None):
+    ''' Stream an ASCII FBX into an _FbxScene, arrays of anim curves are only
+    parsed if keys. onCurve(uid, curve) is called as each AnimationCurve
+    ends, its arrays are then dropped so that only one curve's keys are held
+    at a time. '''
+    scene = _FbxScene()
+    stack = []
+    current = None
+    currentUid = None
+    arrayName = None
+    arrayText = []
+
+    with open(path, 'rb') as _file:
+        if _file.read(18) == b'Kaydara FBX Binary':
+            raise ValueError('%s is a binary FBX, only ASCII FBX can be '
+                             'streamed' % path)
+
+    with open(path) as _file:
+        for line in _file:
+            line = line.strip()
+            if not line or line.startswith(';'):
+                continue
+
+            if arrayName is not None:
+                if line.startswith('}'):
+                    if keys and current is not None:
+                        text = ''.join(arrayText)
+                        current[arrayName] = np.array(
+                                text.split(','), dtype=np.float64
+                                ) if text else np.zeros(0)
+                    arrayName = None
+                    arrayText = []
+                    stack.pop()
+                elif keys and current is not None:
+                    arrayText.append(line[2:] if line.startswith('a:') else (
+                        line))
+                continue
+
+            if line.startswith('}'):
+                section = stack.pop() if stack else None
+                if section in ('Model', 'AnimationCurveNode',
+                               'AnimationCurve') and len(stack) == 1:
+                    if (section == 'AnimationCurve' and onCurve is not None
+                            and current is not None):
+                        onCurve(currentUid, current)
+                        current.pop('KeyTime', None)
+                        current.pop('KeyValueFloat', None)
+                    current = None
+                continue
+
+            key, _, rest = line.partition(':')
+            opens = line.endswith('{')
+
+            if key == 'FBXVersion' and not stack[-1:] == ['Properties70']:
+                scene.version = int(rest.strip())
+            elif key == 'P' and stack:
+                tokens = _fbxTokens(rest)
+                name, values = tokens[0], tokens[4:]
+                if stack[0] == 'GlobalSettings':
+                    if name == 'TimeMode':
+                        scene.timeMode = int(values[0])
+                    elif name == 'CustomFrameRate':
+                        scene.customFrameRate = float(values[0])
+                    elif name == 'TimeSpanStart':
+                        scene.timeSpan = [int(values[0]), None]
+                    elif name == 'TimeSpanStop' and scene.timeSpan:
+                        scene.timeSpan[1] = int(values[0])
+                elif current is not None and values:
+                    current.setdefault('props', {})[name] = values
+            elif key == 'C' and stack == ['Connections']:
+                scene.connections.append(_fbxTokens(rest))
+            elif key in ('LocalTime', 'ReferenceTime') and stack[:1] == [
+                    'Takes'] and scene.takeSpan is None:
+                scene.takeSpan = [int(value) for value in rest.split(',')]
+            elif stack == ['Objects'] and opens:
+                match = _FBX_OBJECT.match(line)
+                if match:
+                    kind, uid, name, subtype = match.groups()
+                    uid = currentUid = int(uid)
+                    name = name.split('::', 1)[-1]
+                    current = {'name': name, 'type': subtype}
+                    if kind == 'Model':
+                        scene.models[uid] = current
+                        scene.modelOrder.append(uid)
+                    elif kind == 'AnimationCurveNode':
+                        scene.curveNodes[uid] = current
+                    elif kind == 'AnimationCurve':
+                        scene.curves[uid] = current
+                    else:
+                        current = None
+            elif key in ('KeyTime', 'KeyValueFloat') and opens:
+                arrayName = key
+                stack.append(key)
+                continue
+
+            if opens:
+                stack.append(key)
+
+    if scene.version and scene.version < 7000:
+        raise ValueError('%s is FBX %s, only FBX 7 ASCII is supported' % (
+            path, scene.version))
+    return scene
+
+
+def _fbxSkeleton(scene):
+    joints = [uid for uid in scene.modelOrder
+              if scene.models[uid]['type'] in ('LimbNode', 'Root')]
+    jointSet = set(joints)
+    parents = {}
+    for conn in scene.connections:
+        if conn[0] == 'OO':
+            child, parent = int(conn[1]), int(conn[2])
+            if child in jointSet:
+                parents[child] = parent
+    index = dict((uid, idx) for idx, uid in enumerate(joints))
+    return joints, [index.get(parents.get(uid), -1) for uid in joints]
+
+
+def _fbxProp(model, name, default):
+    values = model.get('props', {}).get(name)
+    if not values:
+        return default
+    return [float(value) for value in values]
+
+
+def _fbxInfo(path, scene, joints, parents):
+    frameRate = scene.frameRate
+    span = scene.takeSpan or scene.timeSpan or [0, 0]
+    toFrame = frameRate / FBX_TICKS_PER_SECOND
+    startFrame = int(round(span[0] * toFrame))
+    endFrame = int(round((span[1] or 0) * toFrame))
+    models = [scene.models[uid] for uid in joints]
+    return MocapInfo(
+            path, 'fbx', [model['name'] for model in models], parents,
+            [_fbxProp(model, 'Lcl Translation', [0.0] * 3)
+             for model in models],
+            [FBX_ROTATE_ORDERS[int(_fbxProp(model, 'RotationOrder', [0])[0])]
+             for model in models],
+            endFrame - startFrame + 1, frameRate, startFrame)
+
+
+def readFbxInfo(path):
+    scene = _parseFbx(path, keys=False)
+    joints, parents = _fbxSkeleton(scene)
+    return _fbxInfo(path, scene, joints, parents)
+
+
+def readFbx(path):
+    ''' The take of an ASCII FBX, read in two passes: the hierarchy and
+    connections first, then the curves, each resampled into the take as soon
+    as it is parsed so that memory does not grow with the number of keys '''
+    scene = _parseFbx(path, keys=False)
+    joints, parents = _fbxSkeleton(scene)
+    info = _fbxInfo(path, scene, joints, parents)
+
+    data = np.zeros((info.frameCount, len(joints), 6), dtype=np.float32)
+    animated = np.zeros((len(joints), 6), dtype=bool)
+    index = dict((uid, idx) for idx, uid in enumerate(joints))
+    for joint, uid in enumerate(joints):
+        model = scene.models[uid]
+        data[:, joint, :3] = _fbxProp(model, 'Lcl Translation', [0.0] * 3)
+        data[:, joint, 3:] = _fbxProp(model, 'Lcl Rotation', [0.0] * 3)
+
+    # curve node -> (joint, offset) and curve -> (curve node, axis)
+    curveNodes, curves = {}, {}
+    for conn in scene.connections:
+        if conn[0] != 'OP' or len(conn) < 4:
+            continue
+        src, dst, prop = int(conn[1]), int(conn[2]), conn[3]
+        if src in scene.curveNodes and dst in index:
+            if prop == 'Lcl Translation':
+                curveNodes[src] = (index[dst], 0)
+            elif prop == 'Lcl Rotation':
+                curveNodes[src] = (index[dst], 3)
+        elif src in scene.curves and prop in ('d|X', 'd|Y', 'd|Z'):
+            curves[src] = (dst, 'XYZ'.index(prop[-1]))
+
+    frames = np.arange(info.frameCount, dtype=np.float64) + info.startFrame
+    toFrame = info.frameRate / FBX_TICKS_PER_SECOND
+
+    def fill(uid, curve):
+        curveNode, axis = curves.get(uid, (None, None))
+        if curveNode not in curveNodes:
+            return
+        times, values = curve.get('KeyTime'), curve.get('KeyValueFloat')
+        if times is None or values is None or not len(times):
+            return
+        joint, offset = curveNodes[curveNode]
+        data[:, joint, offset + axis] = np.interp(
+                frames, times * toFrame, values)
+        animated[joint, offset + axis] = True
+
+    _parseFbx(path, onCurve=fill)
+    return MocapTake(info, data, animated)
+
+
+##############
+#  Dispatch  #
+##############
+
+
+def readInfo(path):
+    ''' Hierarchy and timing of a .bvh or ASCII .fbx take '''
+    ext = osp.splitext(path)[1].lower()
+    if ext == '.bvh':
+        return readBvhInfo(path)
+    elif ext == '.fbx':
+        return readFbxInfo(path)
+    raise ValueError('Unsupported mocap file %s' % path)
+
+
+def read(path):
+    ''' The full take from a .bvh or ASCII .fbx file '''
+    ext = osp.splitext(path)[1].lower()
+    if ext == '.bvh':
+        return readBvh(path)
+    elif ext == '.fbx':
+        return readFbx(path)
+    raise ValueError('Unsupported mocap file %s' % path)
+
+
+def triage(paths, names=None, minCoverage=0.5):
+    ''' Range, rate and best matching skeleton mapping of many takes without
+    loading their motion
+
+    :return: list of dicts, one per path, with an 'error' for unreadable ones
+    '''
+    report = []
+    for path in paths:
+        entry = {'path': path}
+        try:
+            info = readInfo(path)
+        except (IOError, OSError, ValueError, IndexError) as error:
+            entry['error'] = str(error)
+            report.append(entry)
+            continue
+        matches = info.matchMappings(names, minCoverage)
+        best = matches[0] if matches else None
+        entry.update({
+            'format': info.format,
+            'joints': len(info.joints),
+            'frameRange': info.frameRange,
+            'frameRate': info.frameRate,
+            'mapping': best.mapping if best else None,
+            'coverage': best.coverage if best else 0.0,
+            'rootFound': best.rootFound if best else False})
+        report.append(entry)
+    return report
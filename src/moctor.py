@@ -13,52 +13,50 @@ supported.
 '''
 
 
+import os
+import json
 import pymel.core as pc
-import re
-import cui
 import os.path as osp
-import qtify_maya_window as qtfy
-import json
-import glob
-import imaya
-
+from collections import namedtuple
+
+from . import pose
+from .diskcache import DiskCache, hashFile, hashData
+from .lazy import LazyModule, requires
+from .names import allocator
+from .profiling import stage
+from .suspend import keepSelection, suspended
+from .sceneindex import hikIndex, referenceIndex
+from .mappings import (
+        MAPPINGS_DIR, MappingTypes, Mapping, MappingRegistry, MappingMatch,
+        registry, getMappingNames, dumpMapping, loadMapping, getMappingElement,
+        getMappingElements, getMappingRoot, scoreMapping, rankMappings)
+
+
+# the dialogs, the plugins and the mel procs are loaded on first use so that
+# importing moctor (for the mappings say) stays cheap
+cui = LazyModule('cui')
+qtfy = LazyModule('qtify_maya_window')
+imaya = LazyModule('imaya')
 
 MEL_PROC_FILE = osp.join(
     osp.dirname(__file__), 'hikUpdateCurrentSourceFromName.mel')
-pc.mel.source(MEL_PROC_FILE.replace('\\', '/'))
-
-
-pc.loadPlugin('fbxmaya')
-pc.loadPlugin('mayaHIK')
-
-
-##################################
-#  Storing and Loading Mappings  #
-##################################
-
-
-MAPPINGS_DIR = osp.join(osp.dirname(osp.dirname(__file__)), 'mappings')
-
-
-class MappingTypes:
-    ''' Mapping Types, Either Skeleton or Control Rig '''
-    sk = Skeleton = 'sk'
-    cr = ControlRig = 'cr'
 
+requiresHIK = requires(plugins=('mayaHIK',), mel=(MEL_PROC_FILE,))
+requiresFBX = requires(plugins=('fbxmaya',))
 
-def getMappingNames(typ=MappingTypes.sk):
-    return [osp.basename(_file).split('.')[0]
-            for _file in glob.glob(osp.join(MAPPINGS_DIR, '*.%s.json' % typ))]
+# characterized mocap takes, see importCharacterizedMocap
+TAKE_CACHE_DIR = os.environ.get(
+        'MOCTOR_TAKE_CACHE', osp.join('~', '.moctor', 'cache', 'takes'))
+TAKE_CACHE_SIZE = int(os.environ.get('MOCTOR_TAKE_CACHE_MB', 2048)) << 20
 
+takeCache = DiskCache(TAKE_CACHE_DIR, TAKE_CACHE_SIZE, '.mb')
 
-def dumpMapping(data, name, typ=MappingTypes.sk):
-    with open(osp.join(MAPPINGS_DIR, '%s.%s.json' % (name, typ)), 'w+') as _fl:
-        return json.dump(data, _fl, indent=2)
+# characterization plans of rig files, see mapRigCached
+RIG_CACHE_DIR = os.environ.get(
+        'MOCTOR_RIG_CACHE', osp.join('~', '.moctor', 'cache', 'rigs'))
+RIG_CACHE_SIZE = int(os.environ.get('MOCTOR_RIG_CACHE_MB', 64)) << 20
 
-
-def loadMapping(name, typ=MappingTypes.sk):
-    with open(osp.join(MAPPINGS_DIR, '%s.%s.json' % (name, typ))) as _file:
-        return json.load(_file)
+rigCache = DiskCache(RIG_CACHE_DIR, RIG_CACHE_SIZE, '.json')
 
 
 #######################
@@ -86,186 +84,297 @@ def checkMappingRoot(mappingName, namespace='', typ=MappingTypes.sk):
     return ''
 
 
-def getMappingElement(mapping, index):
-    for node, num in mapping.items():
-        if num == index:
-            return node
-    return ''
+def listSceneNodes(types=('transform', 'joint')):
+    ''' List the scene's transforms and joints in one query, grouped as
+    {namespace: set(short names)} with namespaces ending in ':' '''
+    sceneNodes = {}
+    for node in pc.ls(type=list(types)):
+        name = str(node).split('|')[-1]
+        namespace, _, short = name.rpartition(':')
+        if namespace:
+            namespace += ':'
+        sceneNodes.setdefault(namespace, set()).add(short)
+    return sceneNodes
 
 
-def getMappingRoot(mapping):
-    return getMappingElement(mapping, 0) or getMappingElement(mapping, 1)
+def detectMappings(namespace=None, typ=MappingTypes.sk, sceneNodes=None,
+                   names=None, minCoverage=0.0):
+    ''' Rank every mapping in MAPPINGS_DIR against the scene
 
+    The scene is listed once (or ``sceneNodes`` is used as given) and all the
+    mappings are matched against that listing, so no per node queries are
+    sent to maya. Matches are sorted best first on root found, coverage and
+    number of nodes found.
+    '''
+    if sceneNodes is None:
+        sceneNodes = listSceneNodes()
+    return rankMappings(sceneNodes, namespace, typ, names, minCoverage)
 
-def getHikDefFromSKRoot(namespace, skRoot):
-    try:
-        node = pc.PyNode(namespace + skRoot)
-        characterNode = node.Character.outputs(type=pc.nt.HIKCharacterNode)
-        if characterNode:
-            return characterNode[0].name()
-    except (AttributeError, IndexError, pc.MayaNodeError):
-        pass
-    return ''
 
+def detectMapping(namespace=None, typ=MappingTypes.sk, sceneNodes=None,
+                  names=None, minCoverage=0.5):
+    ''' Best :class:`MappingMatch` whose root exists, or None '''
+    for match in detectMappings(namespace, typ, sceneNodes, names,
+                                minCoverage):
+        if match.rootFound:
+            return match
 
-def getHikDefFromCRRoot(namespace, crRoot):
-    crRoot = pc.PyNode(namespace + crRoot)
 
-    try:
-        mappingNode = crRoot.message.outputs(
-                type='CustomRigDefaultMappingNode')[0]
-        skeletonRoot = mappingNode.destinationSkeleton.inputs(
-                type='CustomRigDefaultMappingNode')[0]
-        characterNode = skeletonRoot.Character.outputs(
-                type='HIKCharacterNode')
-
-        if characterNode:
-            return characterNode[0].name()
-        else:
-            ''
+# the HIK lookups answer from hikIndex, see sceneindex
 
-    except IndexError:
-        return ''
+
+@requiresHIK
+def getHikDefFromSKRoot(namespace, skRoot):
+    return hikIndex.definitionOfJoint(namespace + skRoot)
+
+
+@requiresHIK
+def getHikDefFromCRRoot(namespace, crRoot):
+    return hikIndex.definitionOfControl(namespace + crRoot)
 
 
+@requiresHIK
 def getHikDestinationSourceMapping():
-    destSourceMapping = {}
-    for node in pc.ls(type='HIKRetargeterNode'):
-        source = ''
-        try:
-            destination = node.InputCharacterDefinitionDst.inputs()[0]
-        except IndexError:
-            continue
-        try:
-            source = node.InputCharacterDefinitionSrc.inputs()[0]
-        except IndexError:
-            pass
-        destSourceMapping[str(destination)] = str(source)
-    return destSourceMapping
+    return hikIndex.destinationSourceMapping()
 
 
+@requiresHIK
 def getHikSource(definition):
     return pc.mel.hikGetCharacterInputString(definition)
 
 
+@requiresHIK
 def getHikDestinations(definition):
-    dests = []
-    mapping = getHikDestinationSourceMapping()
-    for dest, source in mapping.items():
-        if source == definition:
-            dests.append(source)
-    return dests
+    return hikIndex.destinations(definition)
 
 
-def lockDefinition(defname):
+@requiresHIK
+def lockDefinition(defname, namespace='', mapping=None,
+                   captureStance=False):
+    ''' Lock the definition, the stance of the joints of mapping is kept in
+    :data:`stances` for :func:`quickRetarget` if captureStance '''
     pc.mel.hikReadStancePoseTRSOffsets(defname)
     pc.setAttr(defname + '.InputCharacterizationLock', True)
+    if captureStance and mapping is not None:
+        stances[defname] = captureSkeletonStance(namespace, mapping)
 
 
 def unlockDefinition(defname):
     pc.setAttr(defname + '.InputCharacterizationLock', False)
 
 
-def mapMocapSkeleton(namespace, mocapSkeletonMappings):
+def mapMocapSkeleton(namespace, mocapSkeletonMappings, captureStance=False):
     prepareHIK()
-    selection = pc.selected()
-    root = getMappingRoot(mocapSkeletonMappings)
-    defname = getHikDefFromSKRoot(namespace, root)
-
-    if not defname:
-        defname = createHikDefinition(name='MocapCharacter1')
-    else:
-        pc.mel.hikSetCurrentCharacter(defname)
-        unlockDefinition(defname)
+    with keepSelection():
+        root = getMappingRoot(mocapSkeletonMappings)
+        defname = getHikDefFromSKRoot(namespace, root)
 
-    for name, num in mocapSkeletonMappings.items():
-        node = namespace + name
-        try:
-            pc.mel.setCharacterObject(node, defname, num, 0)
-        except (pc.MayaNodeError, RuntimeError) as re:
-            pc.warning(str(re), namespace + node, 'not found')
-
-    lockDefinition(defname)
-    pc.select(selection)
+        if not defname:
+            defname = createHikDefinition(name='MocapCharacter1')
+        else:
+            pc.mel.hikSetCurrentCharacter(defname)
+            unlockDefinition(defname)
+
+        for name, num in mocapSkeletonMappings.items():
+            node = namespace + name
+            try:
+                pc.mel.setCharacterObject(node, defname, num, 0)
+            except (pc.MayaNodeError, RuntimeError) as re:
+                pc.warning(str(re), namespace + node, 'not found')
+
+        lockDefinition(defname, namespace, mocapSkeletonMappings,
+                       captureStance)
     return defname
 
 
 def mocapZeroOut(namespace, mocapSkeletonMappings):
-    for name, num in mocapSkeletonMappings.items():
-        node = namespace + name
-        if pc.objExists(node):
-            pc.setAttr(node + '.rx', 0)
-            pc.setAttr(node + '.ry', 0)
-            pc.setAttr(node + '.rz', 0)
+    pose.zeroOut(pose.mappingNodes(namespace, mocapSkeletonMappings))
 
 
 def mocapSetKeyframe(namespace, mocapSkeletenmappings):
-    for name, num in mocapSkeletenmappings.items():
-        node = namespace + name
-        if pc.objExists(node):
-            pc.setKeyframe(node + '.rx')
-            pc.setKeyframe(node + '.ry')
-            pc.setKeyframe(node + '.rz')
+    pose.keyNodes(pose.mappingNodes(namespace, mocapSkeletenmappings))
 
 
-def mapRigSkeleton(namespace, rigSkeletonMappings):
+def mapRigSkeleton(namespace, rigSkeletonMappings, captureStance=False):
     prepareHIK()
-    selection = pc.selected()
-    root = getMappingRoot(rigSkeletonMappings)
-    defname = getHikDefFromSKRoot(namespace, root)
-    if not defname:
-        defname = createHikDefinition(name='MocapCharacter1')
-    else:
-        pc.mel.hikSetCurrentCharacter(defname)
-        unlockDefinition(defname)
-    for name, num in rigSkeletonMappings.items():
-        node = namespace + name
-        try:
-            pc.mel.setCharacterObject(
-                    node, defname, num, 0)
-            pc.setAttr(node + '.drawStyle', 2)
-        except (pc.MayaNodeError, RuntimeError) as re:
-            pc.warning(str(re), namespace + node, 'not found')
-    lockDefinition(defname)
-    pc.select(selection)
+    with keepSelection():
+        root = getMappingRoot(rigSkeletonMappings)
+        defname = getHikDefFromSKRoot(namespace, root)
+        if not defname:
+            defname = createHikDefinition(name='MocapCharacter1')
+        else:
+            pc.mel.hikSetCurrentCharacter(defname)
+            unlockDefinition(defname)
+        mapped = []
+        for name, num in rigSkeletonMappings.items():
+            node = namespace + name
+            try:
+                pc.mel.setCharacterObject(
+                        node, defname, num, 0)
+                mapped.append(node)
+            except (pc.MayaNodeError, RuntimeError) as re:
+                pc.warning(str(re), namespace + node, 'not found')
+        pose.setDrawStyle(mapped, 2)
+        lockDefinition(defname, namespace, rigSkeletonMappings,
+                       captureStance)
     return defname
 
 
 def hideSkeleton(namespace, mapping):
-    for node in mapping:
-        try:
-            pc.PyNode(namespace + node).drawStyle.set(2)
-        except:
-            pass
+    pose.setDrawStyle(pose.mappingNodes(namespace, mapping), 2)
 
 
 def mapRigControls(namespace, defname, rigControlsMappings):
     prepareHIK()
-    selection = pc.selected()
+    with keepSelection():
+        retargeter = pc.mel.RetargeterGetName(defname)
+
+        if not pc.mel.RetargeterExists(retargeter):
+            pc.mel.RetargeterCreate(defname)
+            retargeter = pc.mel.RetargeterGetName(defname)
+
+        locked = pose.lockedAttrs(pose.mappingNodes(
+            namespace, rigControlsMappings))
+
+        for name, num in rigControlsMappings.items():
+            node = namespace + name
 
-    retargeter = pc.mel.RetargeterGetName(defname)
+            try:
+                if node not in locked:
+                    raise pc.MayaNodeError(node)
+                body = pc.mel.hikCustomRigElementNameFromId(defname, num)
 
-    if not pc.mel.RetargeterExists(retargeter):
-        pc.mel.RetargeterCreate(defname)
+                if not pose.attrIsLocked(locked[node], 'rotate'):
+                    pc.mel.RetargeterAddMapping(
+                            retargeter, body, "R", node, num)
+                if 'FK' not in node and not pose.attrIsLocked(
+                        locked[node], 'translate'):
+                    pc.mel.RetargeterAddMapping(
+                            retargeter, body, "T", node, num)
 
+            except (RuntimeError, pc.MayaNodeError, AttributeError,
+                    pc.MayaAttributeError) as error:
+                pc.warning("problem in mapping to %s: %s)" % (
+                           namespace+node, str(error)))
+
+
+def planRig(namespace, rigSkeletonMappings, rigControlsMappings):
+    ''' What :func:`mapRigSkeleton` and :func:`mapRigControls` would do to the
+    rig, without namespace: the joints found with their HIK ids, the ones
+    to hide and the controls with the channels to map given their locks
+
+    :return: {'joints': [[name, num]], 'hide': [name],
+        'controls': [[name, num, kinds]]}
+    '''
+    found = set(pose.mappingNodes(namespace, rigSkeletonMappings))
+    joints = [[name, num] for name, num in rigSkeletonMappings.items()
+              if namespace + name in found]
+    hide = [str(node)[len(namespace):] for node in pc.ls(
+        [namespace + name for name, _ in joints], type='joint')]
+
+    locked = pose.lockedAttrs(pose.mappingNodes(
+        namespace, rigControlsMappings))
+    controls = []
     for name, num in rigControlsMappings.items():
         node = namespace + name
-
-        try:
+        if node not in locked:
+            continue
+        kinds = ''
+        if not pose.attrIsLocked(locked[node], 'rotate'):
+            kinds += 'R'
+        if 'FK' not in node and not pose.attrIsLocked(
+                locked[node], 'translate'):
+            kinds += 'T'
+        if kinds:
+            controls.append([name, num, kinds])
+    return {'joints': joints, 'hide': hide, 'controls': controls}
+
+
+@requiresHIK
+def applyRigPlan(namespace, plan, rigSkeletonMappings):
+    ''' Characterize the rig from a :func:`planRig` plan with two mel
+    scripts rather than a call per joint and control
+
+    :return: the HIK definition
+    '''
+    prepareHIK()
+    with keepSelection():
+        root = getMappingRoot(rigSkeletonMappings)
+        defname = getHikDefFromSKRoot(namespace, root)
+        if not defname:
+            defname = createHikDefinition(name='MocapCharacter1')
+        else:
+            pc.mel.hikSetCurrentCharacter(defname)
+            unlockDefinition(defname)
+
+        pc.mel.eval('\n'.join(
+            ['setCharacterObject("%s%s", "%s", %d, 0);' % (
+                namespace, name, defname, num)
+             for name, num in plan['joints']] +
+            ['setAttr "%s%s.drawStyle" 2;' % (namespace, name)
+             for name in plan['hide']]))
+        lockDefinition(defname)
+
+        retargeter = pc.mel.RetargeterGetName(defname)
+        if not pc.mel.RetargeterExists(retargeter):
+            pc.mel.RetargeterCreate(defname)
             retargeter = pc.mel.RetargeterGetName(defname)
-            body = pc.mel.hikCustomRigElementNameFromId(defname, num)
+        statements = [
+            'RetargeterAddMapping("%s", '
+            'hikCustomRigElementNameFromId("%s", %d), "%s", "%s%s", %d);' % (
+                retargeter, defname, num, kind, namespace, name, num)
+            for name, num, kinds in plan['controls'] for kind in kinds]
+        if statements:
+            pc.mel.eval('\n'.join(statements))
+    return defname
+
 
-            if not isLocked(node, 'rotate'):
-                pc.mel.RetargeterAddMapping(retargeter, body, "R", node, num)
-            if 'FK' not in node and not isLocked(node, 'translate'):
-                pc.mel.RetargeterAddMapping(retargeter, body, "T", node, num)
+def rigCacheKey(rigPath, rigSkeletonMappings, rigControlsMappings,
+                cache=None):
+    cache = rigCache if cache is None else cache
+    return cache.key(cache.fileHash(rigPath),
+                        hashData(list(rigSkeletonMappings.items())),
+                        hashData(list(rigControlsMappings.items())))
 
-        except (RuntimeError, pc.MayaNodeError, AttributeError,
-                pc.MayaAttributeError) as error:
-            pc.warning("problem in mapping to %s: %s)" % (
-                       namespace+node, str(error)))
 
-    pc.select(selection)
+def mapRigCached(namespace, rigMapping='AdvancedSkeleton', rigPath=None,
+                 cache=None):
+    ''' Characterize a referenced rig from the plan cached for its file and
+    mappings, see :func:`planRig`
+
+    The plan is keyed by the hash of the rig file, so it is made again from
+    the scene, and cached, when the file changes. The file is only hashed
+    again when its mtime or size changed, see :meth:`DiskCache.fileHash`. Rigs that are not
+    referenced from a file are mapped node by node as by :func:`mapRig`.
+
+    :param rigPath: the file of the rig, by default the one referenced under
+        namespace
+    :param cache: a :class:`diskcache.DiskCache`, :data:`rigCache` by default
+    :return: the HIK definition
+    '''
+    cache = rigCache if cache is None else cache
+    rigSkeletonMappings = loadMapping(rigMapping, MappingTypes.sk)
+    rigControlsMappings = loadMapping(rigMapping, MappingTypes.cr)
+    if rigPath is None:
+        rigPath = getReferencePathFromNamespace(namespace.strip(':'))
+    if not rigPath or not osp.exists(rigPath):
+        defname = mapRigSkeleton(namespace, rigSkeletonMappings)
+        mapRigControls(namespace, defname, rigControlsMappings)
+        return defname
+
+    key = rigCacheKey(rigPath, rigSkeletonMappings, rigControlsMappings,
+                      cache)
+    if cache.get(key) is None:
+        plan = planRig(namespace, rigSkeletonMappings, rigControlsMappings)
+
+        def write(path):
+            with open(path, 'w') as _file:
+                json.dump(plan, _file)
+        cache.put(key, write, {'rigPath': rigPath, 'rigMapping': rigMapping})
+    else:
+        with open(cache.path(key)) as _file:
+            plan = json.load(_file)
+    return applyRigPlan(namespace, plan, rigSkeletonMappings)
 
 
 def mapMocap(prefix, mappingName):
@@ -370,27 +479,174 @@ def linkMocapHikToRigHik(mocapDefinition, rigDefinition):
     pc.mel.hikSetCharacterInput(rigDefinition, mocapDefinition)
 
 
-def bakeRig(namespace, prefix, mocapMappingName, rigMappingName):
+def bakeRig(namespace, prefix, mocapMappingName, rigMappingName,
+            method='bulk', sampleBy=1, chunkSize=None, callback=None,
+            evaluation=None, shards=None):
+    ''' Bake the retargeted rig controls over the mocap range, with the
+    viewport suspended and undo off, see :func:`suspend.suspended`. The bake
+    cannot be undone.
+
+    :param method: 'bulk' samples the controls through context evaluation and
+        writes whole curves at once with :func:`bake.bakeControls`,
+        'bakeResults' uses the old bakeResults -simulation call, 'sharded'
+        splits the range over mayapy workers with :func:`shard.bakeSharded`
+    :param chunkSize: with 'bulk', bake this many frames at a time
+    :param callback: with 'bulk', called with the progress after every chunk,
+        returning False cancels, see :func:`bake.bakeControls`
+    :param evaluation: evaluation manager mode during the bake, for
+        instance :data:`suspend.BAKE_EVALUATION`
+    :param shards: with 'sharded', the number of workers, one per core by
+        default
+    '''
+    from . import bake
+
+    if method not in ('bulk', 'bakeResults', 'sharded'):
+        raise ValueError('Unknown bake method %r' % method)
     mocapMapping = loadMapping(mocapMappingName, typ=MappingTypes.sk)
     rigMapping = loadMapping(rigMappingName, typ=MappingTypes.cr)
 
-    mocapRoot = getMappingRoot(mocapMapping)
-    startFrame, endFrame = getAnimRange(prefix + mocapRoot)
+    with suspended('bakeRig', undo='off', evaluation=evaluation):
+        mocapRoot = getMappingRoot(mocapMapping)
+        startFrame, endFrame = getAnimRange(prefix + mocapRoot)
+        controls = getRigControls(namespace, rigMapping)
+
+        if method == 'bulk':
+            return bake.bakeControls(
+                    controls, startFrame, endFrame, sampleBy,
+                    chunkSize=chunkSize, callback=callback)
+        elif method == 'sharded':
+            from . import shard
+            return shard.bakeSharded(
+                    controls, startFrame, endFrame, shards, sampleBy)
+        return bake.bakeResults(controls, startFrame, endFrame, sampleBy)
+
+
+def reduceRig(namespace, rigMappingName, rotationTolerance=0.05,
+              translationTolerance=0.01):
+    ''' Drop the redundant baked keys on the rig controls, see
+    :func:`bake.reduceControls`
+
+    :return: {control: {'before': keys, 'after': keys, 'maxError':
+        {channel: error}}} for the caller to log
+    '''
+    from . import bake
+
+    rigMapping = loadMapping(rigMappingName, typ=MappingTypes.cr)
+    return bake.reduceControls(
+            getRigControls(namespace, rigMapping), rotationTolerance,
+            translationTolerance)
+
+
+##########################
+#  Retarget without HIK  #
+##########################
 
-    selection = pc.selected()
-    getRigControls(namespace, rigMapping, True)
-    pc.mel.eval((
-            'bakeResults -simulation true -t "%s:%s" -sampleBy 1'
-            '-disableImplicitControl true -preserveOutsideKeys true'
-            '-sparseAnimCurveBake false'
-            '-removeBakedAttributeFromLayer false'
-            '-removeBakedAnimFromLayer false -bakeOnOverrideLayer false'
-            '-minimizeRotation true -controlPoints false -shape true `ls'
-            '-sl`;') % (startFrame, endFrame))
-    pc.select(selection)
+
+# {definition: solver.SkeletonStance} kept at lock, emptied by the cleanups
+stances = {}
+
+
+def captureSkeletonStance(namespace, mapping):
+    ''' World rotations and positions of the mapped joints as they are now,
+    as a :class:`solver.SkeletonStance` '''
+    import numpy as np
+    from . import solver
+
+    stance = solver.SkeletonStance()
+    for num in set(mapping.values()):
+        node = namespace + getMappingElement(mapping, num)
+        if not pc.objExists(node):
+            continue
+        stance.rotations[num] = solver.mayaMatrixRotation(
+                pc.xform(node, q=True, ws=True, m=True))[0]
+        stance.positions[num] = np.array(
+                pc.xform(node, q=True, ws=True, t=True))
+    return stance
+
+
+def captureControlStance(namespace, rigControlsMappings):
+    ''' The stance of every control of a cr mapping as it is now, as a list
+    of :class:`solver.ControlStance` '''
+    from . import solver
+
+    nodes = pose.mappingNodes(namespace, rigControlsMappings)
+    controls = dict((node, rigControlsMappings[node[len(namespace):]])
+                    for node in nodes)
+    locked = pose.lockedAttrs(nodes)
+
+    controlStances = []
+    for node, num in controls.items():
+        pynode = pc.PyNode(node)
+        order = solver.ROTATE_ORDERS[pynode.rotateOrder.get()]
+        rotate = pc.getAttr(node + '.rotate')
+        world = solver.mayaMatrixRotation(
+                pc.xform(node, q=True, ws=True, m=True))[0]
+        local = solver.qfromEuler(rotate, order)
+        parent = None
+        for ancestor in pynode.getAllParents():
+            if ancestor.name() in controls:
+                parent = ancestor.name()
+                break
+        controlStances.append(solver.ControlStance(
+            node, num, world, solver.qmul(world, solver.qinv(local)),
+            rotate, pc.getAttr(node + '.translate'),
+            pc.xform(node, q=True, ws=True, t=True),
+            parentWorldRotation=solver.mayaMatrixRotation(
+                pc.getAttr(node + '.parentMatrix'))[0],
+            rotateOrder=order, parent=parent,
+            rotates=not pose.attrIsLocked(locked[node], 'rotate'),
+            translates='FK' not in node and not pose.attrIsLocked(
+                locked[node], 'translate')))
+    return controlStances
+
+
+def quickRetarget(mocapPath, rigNamespace, mocapMappingName='iPi',
+                  rigMappingName='AdvancedSkeleton', rigDefinition=None,
+                  startFrame=None, stanceFrame=None, mocapDefinition=None):
+    ''' Retarget a bvh or ascii fbx take onto the rig controls with the
+    vectorized solver instead of HumanIK
+
+    The take is read straight from the file. The stances are the ones kept
+    in :data:`stances` when rigDefinition and mocapDefinition were locked,
+    see :func:`lockDefinition`, or else the current pose of the rig and the
+    pose of the take at stanceFrame. The solved channels are written as
+    animCurves in bulk.
+
+    :return: names of the animCurves written
+    '''
+    import numpy as np
+    from . import mocapfile, solver, bake
+
+    if not rigNamespace.endswith(':'):
+        rigNamespace += ':'
+    take = mocapfile.read(mocapPath)
+    mocapMapping = loadMapping(mocapMappingName, MappingTypes.sk)
+    rigSkMapping = loadMapping(rigMappingName, MappingTypes.sk)
+    rigCrMapping = loadMapping(rigMappingName, MappingTypes.cr)
+
+    targetStance = stances.get(rigDefinition) or captureSkeletonStance(
+            rigNamespace, rigSkMapping)
+    controls = captureControlStance(rigNamespace, rigCrMapping)
+    solution = solver.retargetTake(
+            take, mocapMapping, targetStance, controls, stanceFrame,
+            sourceStance=stances.get(mocapDefinition))
+
+    # take frames to scene frames
+    if startFrame is None:
+        startFrame = take.startFrame
+    fps = pc.mel.currentTimeUnitToFPS()
+    solution.times = startFrame + (solution.times - take.startFrame) * (
+            fps / take.frameRate if take.frameRate else 1.0)
+
+    curves = solution.curves()
+    for curve in curves:
+        if curve.isRotation:
+            curve.values = np.radians(curve.values)
+    return bake.writeCurves(curves)
 
 
 def getRigControls(namespace, rigControlsMappings, select=False):
+
     controls = [namespace + x for x in rigControlsMappings.keys()]
     pc.select(cl=True)
     if select:
@@ -403,23 +659,22 @@ def getRigControls(namespace, rigControlsMappings, select=False):
 
 
 def getUniqueName(name):
-    cnt = 1
-    while pc.objExists(name):
-        match = re.search('\\d+', name)
-        if match:
-            name = name.replace(match.group(), str(cnt))
-        else:
-            name += str(cnt)
-        cnt += 1
-    return name
+    return allocator.allocate(name, reserve=False)[0]
 
 
+@requiresHIK
 def createHikDefinition(name='MocapCharacter1'):
-    hikDefinitionName = getUniqueName(name)
-    defname = pc.mel.hikCreateCharacter(hikDefinitionName)
-    return defname
+    return createHikDefinitions(1, name)[0]
+
 
+@requiresHIK
+def createHikDefinitions(count, name='MocapCharacter1'):
+    ''' count new definitions, named with one query for the names taken '''
+    return [pc.mel.hikCreateCharacter(hikDefinitionName)
+            for hikDefinitionName in allocator.allocate(name, count)]
 
+
+@requiresFBX
 def importMocap(mocapPath, namespace=None):
     if not mocapPath:
         dialog = cui.SingleInputBox(
@@ -435,12 +690,101 @@ def importMocap(mocapPath, namespace=None):
         pc.warning('Mocap Path does not exist')
         return
 
-    if namespace is None:
-        namespace = osp.splitext(osp.basename(mocapPath))[0]
+    if namespace:
+        pc.importFile(mocapPath, namespace=namespace)
+        return namespace
     pc.importFile(mocapPath)
     return ''
 
 
+def takeCacheKey(mocapPath, mocapMapping, fixTPose=False, preprocess=None):
+    mapping = loadMapping(mocapMapping, MappingTypes.sk)
+    parts = [hashFile(mocapPath), hashData(list(mapping.items())), fixTPose]
+    if preprocess:
+        parts.append(hashData(preprocess))
+    return takeCache.key(*parts)
+
+
+def preprocessMocap(namespace, mocapMapping, preprocess=True):
+    ''' Unroll, smooth and resample the curves of a take with
+    :func:`preprocess.preprocessSkeleton`
+
+    :param preprocess: True for the defaults or a dict of keyword arguments
+        of preprocessSkeleton, cutoff and sampleBy say
+    '''
+    from . import preprocess as pp
+
+    options = preprocess if isinstance(preprocess, dict) else {}
+    with stage('preprocessMocap'):
+        return pp.preprocessSkeleton(namespace, mocapMapping, **options)
+
+
+@requiresHIK
+def importCharacterizedMocap(mocapPath, mocapMapping='iPi', namespace='take',
+                             fixTPose=False, cache=None, preprocess=None,
+                             captureStance=False):
+    ''' Import a mocap take already characterized in HIK
+
+    The take is looked up in the cache by the hash of the file and the
+    mapping. On a miss it is imported and characterized with
+    :func:`mapMocapSkeleton`, preprocessed first with
+    :func:`preprocessMocap` if preprocess and its T pose fixed if fixTPose,
+    and the skeleton
+    and definition are exported to the cache. On a hit the cached scene is
+    imported and nothing needs mapping again.
+
+    :param namespace: imported into this namespace, or a numbered one if
+        taken
+    :param cache: a :class:`diskcache.DiskCache`, :data:`takeCache` by
+        default
+    :param captureStance: keep the stance of the take in :data:`stances`
+        for :func:`quickRetarget`
+    :return: (namespace, definition)
+    '''
+    cache = takeCache if cache is None else cache
+    mapping = loadMapping(mocapMapping, MappingTypes.sk)
+    root = getMappingRoot(mapping)
+    key = takeCacheKey(mocapPath, mocapMapping, fixTPose, preprocess)
+    entry = cache.get(key)
+
+    if entry is None:
+        mocapNamespace = importMocap(mocapPath) or ''
+        if not pc.objExists(mocapNamespace + root):
+            pc.error("Could not find mocap Root node")
+        if preprocess:
+            preprocessMocap(mocapNamespace, mocapMapping, preprocess)
+        if fixTPose:
+            fixMocapTPose(mocapNamespace, mocapMapping)
+        definition = mapMocapSkeleton(mocapNamespace, mapping)
+
+        def export(path):
+            with keepSelection():
+                pc.select([mocapNamespace + root, definition])
+                pc.exportSelected(path, type='mayaBinary', force=True,
+                                  constructionHistory=False, channels=True,
+                                  shader=False)
+        cache.put(key, export, {
+            'mocapPath': mocapPath, 'mocapMapping': mocapMapping,
+            'root': root, 'definition': definition, 'fixTPose': fixTPose,
+            'preprocess': preprocess})
+        # the cached copy goes into its own namespace as on a hit
+        pc.delete(mocapNamespace + root)
+        cleanupMocapHIK(definition)
+
+    namespace = namespace.strip(':')
+    newNodes = pc.importFile(cache.path(key), namespace=namespace,
+                             returnNewNodes=True)
+    definitions = pc.ls(newNodes, type='HIKCharacterNode')
+    if not definitions:
+        pc.error('No HIK definition in cached take %s' % cache.path(key))
+    definition = str(definitions[0])
+    mocapNamespace = definitions[0].namespace()
+    pc.mel.hikUpdateCharacterList()
+    if captureStance:
+        stances[definition] = captureSkeletonStance(mocapNamespace, mapping)
+    return mocapNamespace, definition
+
+
 def importRig(rigPath):
     namespace = '-1'
     if not rigPath:
@@ -467,23 +811,29 @@ def deleteMocap(prefix, mapName):
     pc.delete(prefix + root)
 
 
+@requiresHIK
 def cleanupMocapHIK(definition):
     retargeter = pc.mel.RetargeterGetName(definition)
     if pc.objExists(retargeter):
         pc.mel.RetargeterDelete(retargeter)
     pc.delete(definition)
+    allocator.release(definition)
+    stances.pop(str(definition), None)
 
 
+@requiresHIK
 def cleanupRigHIK(definition):
     retargeter = pc.mel.RetargeterGetName(definition)
     if pc.objExists(retargeter):
         pc.mel.RetargeterDelete(retargeter)
     pc.delete(definition)
+    allocator.release(definition)
+    stances.pop(str(definition), None)
 
 
-def cleanupHIK(mocapRoot):
-    cleanupMocapHIK()
-    cleanupRigHIK()
+def cleanupHIK(mocapDefinition, rigDefinition):
+    cleanupRigHIK(rigDefinition)
+    cleanupMocapHIK(mocapDefinition)
 
 
 def getPrefixFromSelection():
@@ -515,14 +865,7 @@ def getNamespaceFromSelection():
 
 
 def getRefFileFromPath(path):
-    rigPath = osp.normcase(osp.normpath(path))
-    for ref in pc.ls(type='reference'):
-        refFile = ref.referenceFile()
-        if not refFile:
-            continue
-        refPath = osp.normpath(osp.normcase(refFile.path))
-        if rigPath == refPath:
-            return refFile
+    return referenceIndex.fromPath(path)
 
 
 def getNamespaceFromReferencePath(rigPath):
@@ -533,16 +876,13 @@ def getNamespaceFromReferencePath(rigPath):
 
 
 def getReferencePathFromNamespace(namespace):
-    namespace = namespace.strip(':')
-    for ref in pc.ls(type='reference'):
-        refFile = ref.referenceFile()
-        if not refFile:
-            continue
-        if refFile.namespace == namespace:
-            return ref.referenceFile().path
+    refFile = referenceIndex.fromNamespace(namespace)
+    if refFile:
+        return refFile.path
     return ''
 
 
+@requiresHIK
 def prepareHIK(startFrame=0):
     pc.currentTime(startFrame)
 
@@ -582,12 +922,7 @@ def importRigFromReference(rigPath, cleanup=True):
 
 
 def isLocked(node, attr):
-    if not attr.startswith('.'):
-        attr = '.' + attr
-    for add in ('', 'X', 'Y', 'Z'):
-        if pc.getAttr(node + attr + add, l=True):
-            return True
-    return False
+    return pose.attrIsLocked(pose.lockedAttrs([node])[node], attr)
 
 
 ###############################
@@ -595,9 +930,150 @@ def isLocked(node, attr):
 ###############################
 
 
+Retarget = namedtuple(
+        'Retarget', ('mocapNamespace', 'rigNamespace', 'mocapMapping',
+                     'rigMapping', 'mocapDefinition', 'rigDefinition',
+                     'mocapRoot'))
+
+
+def characterize(mocapPath=None, rigNamespace=None, mocapMapping='iPi',
+                 rigMapping='AdvancedSkeleton', rigPath=None,
+                 mocapNamespace=None, useCache=False, preprocess=None):
+    ''' Import a mocap take and a rig, characterize both in HIK and drive
+    the rig from the mocap, everything :func:`apply` does but the bake and
+    the cleanup
+
+    :param mocapNamespace: import the take into this namespace, so that more
+        than one take can be in the scene. With no mocapPath the take is
+        expected to be in the scene under this namespace already.
+    :param useCache: get the take characterized from :data:`takeCache` with
+        :func:`importCharacterizedMocap`, which needs mocapPath and
+        mocapMapping, and the rig from :data:`rigCache` with
+        :func:`mapRigCached`
+    :param preprocess: unroll, smooth and resample the take before it is
+        characterized, see :func:`preprocessMocap`
+    :return: a :class:`Retarget` for :func:`bakeRetargets` and
+        :func:`cleanupRetargets`
+    '''
+    # resolve rig namespace or import
+    if rigPath:
+        with stage('importRig'):
+            rigNamespace = importRig(rigPath)
+    if rigNamespace is None or rigNamespace == '-1':
+        rigNamespace = getNamespaceFromSelection()
+    if not rigNamespace.endswith(':'):
+        rigNamespace += ':'
+
+    mocapDefinition = None
+    if useCache and mocapPath and mocapMapping:
+        with stage('importCharacterizedMocap'):
+            mocapNamespace, mocapDefinition = importCharacterizedMocap(
+                    mocapPath, mocapMapping, mocapNamespace or 'take',
+                    preprocess=preprocess)
+    elif mocapPath or mocapNamespace is None:
+        with stage('importMocap'):
+            mocapNamespace = importMocap(mocapPath, mocapNamespace)
+    if mocapNamespace and not mocapNamespace.endswith(':'):
+        mocapNamespace += ':'
+
+    # detect the mappings not named by the caller
+    with stage('detectMappings'):
+        if mocapMapping is None or rigMapping is None:
+            sceneNodes = listSceneNodes()
+        if rigMapping is None:
+            match = detectMapping(
+                    rigNamespace, sceneNodes=sceneNodes,
+                    names=getMappingNames(MappingTypes.cr))
+            if match is None:
+                pc.error(
+                    "Could not detect a mapping for rig %s" % rigNamespace)
+            rigMapping = match.mapping
+        if mocapMapping is None:
+            match = detectMapping(mocapNamespace, sceneNodes=sceneNodes)
+            if match is None:
+                pc.error("Could not detect a mapping for mocap")
+            mocapMapping = match.mapping
+
+    mocapSkeletonMappings = loadMapping(mocapMapping, MappingTypes.sk)
+    rigSkeletonMappings = loadMapping(rigMapping, MappingTypes.sk)
+    rigControlsMappings = loadMapping(rigMapping, MappingTypes.cr)
+
+    # check if mocap is successfully imported
+    mocapRoot = mocapNamespace + getMappingRoot(mocapSkeletonMappings)
+    if not pc.objExists(mocapRoot):
+        pc.error("Could not find mocap Root node")
+
+    # resample and smooth the take, a cached take was before it was cached
+    if mocapDefinition is None and preprocess:
+        preprocessMocap(mocapNamespace, mocapMapping, preprocess)
+
+    with stage('setRange'):
+        setRange(mocapRoot)
+
+    # define HIK Skeleton, unless it came characterized from the cache
+    if mocapDefinition is None:
+        with stage('mapMocapSkeleton'):
+            mocapDefinition = mapMocapSkeleton(
+                    mocapNamespace, mocapSkeletonMappings)
+
+    # define HIK skeleton and custom_rig for rig
+    if useCache:
+        with stage('mapRigCached'):
+            rigDefinition = mapRigCached(rigNamespace, rigMapping)
+    else:
+        with stage('mapRigSkeleton'):
+            rigDefinition = mapRigSkeleton(rigNamespace, rigSkeletonMappings)
+
+        with stage('mapRigControls'):
+            mapRigControls(rigNamespace, rigDefinition, rigControlsMappings)
+
+    # set mocap as source for this rig
+    with stage('linkMocapHikToRigHik'):
+        linkMocapHikToRigHik(mocapDefinition, rigDefinition)
+
+    return Retarget(mocapNamespace, rigNamespace, mocapMapping, rigMapping,
+                    mocapDefinition, rigDefinition, mocapRoot)
+
+
+def bakeRetargets(retargets, sampleBy=1, chunkSize=None, callback=None):
+    ''' Bake the controls of all the retargeted rigs in a single pass over
+    the union of the mocap ranges, so that the scene is evaluated once per
+    frame whatever the number of characters
+
+    :return: names of the animCurves written
+    '''
+    from . import bake
+
+    controls, ranges = [], []
+    for retarget in retargets:
+        ranges.append(getAnimRange(retarget.mocapRoot))
+        controls.extend(getRigControls(
+            retarget.rigNamespace,
+            loadMapping(retarget.rigMapping, typ=MappingTypes.cr)))
+    if not controls:
+        return []
+    startFrame = min(start for start, _ in ranges)
+    endFrame = max(end for _, end in ranges)
+    pc.playbackOptions(minTime=startFrame, maxTime=endFrame)
+    return bake.bakeControls(controls, startFrame, endFrame, sampleBy,
+                             chunkSize=chunkSize, callback=callback)
+
+
+def cleanupRetargets(retargets):
+    # takes driving more than one rig share their mocap definition
+    mocapDefinitions = []
+    for retarget in retargets:
+        cleanupRigHIK(retarget.rigDefinition)
+        if retarget.mocapDefinition not in mocapDefinitions:
+            mocapDefinitions.append(retarget.mocapDefinition)
+    for definition in mocapDefinitions:
+        cleanupMocapHIK(definition)
+
+
 def apply(
         mocapPath=None, rigNamespace=None,
-        mocapMapping='iPi', rigMapping='AdvancedSkeleton', rigPath=None):
+        mocapMapping='iPi', rigMapping='AdvancedSkeleton', rigPath=None,
+        useCache=False, evaluation=None, preprocess=None):
     '''
     ###########################################################################
     #            Procedure for mapping mocap data to a custom Rig             #
@@ -620,55 +1096,76 @@ def apply(
         import saved mocap skeleton in character file
         select mocap skeleton as source
         select character as Character
-    '''
-    mocapSkeletonMappings = loadMapping(mocapMapping, MappingTypes.sk)
-    rigSkeletonMappings = loadMapping(rigMapping, MappingTypes.sk)
-    rigControlsMappings = loadMapping(rigMapping, MappingTypes.cr)
 
-    startFrame = 0
-    prepareHIK(startFrame)
+    Pass None as mocapMapping or rigMapping to detect the mapping from the
+    scene with :func:`detectMapping`.
 
-    # resolve rig namespace or import
-    if rigPath:
-        rigNamespace = importRig(rigPath)
-    if rigNamespace is None or rigNamespace == '-1':
-        rigNamespace = getNamespaceFromSelection()
-    if not rigNamespace.endswith(':'):
-        rigNamespace += ':'
+    The steps are marked as :mod:`profiling` stages, enable profiling to time
+    them and count the maya commands they send.
 
-    mocapNamespace = importMocap(mocapPath)
-    if mocapNamespace and not mocapNamespace.endswith(':'):
-        mocapNamespace += ':'
+    With useCache the characterized take comes from :data:`takeCache` when
+    it was applied before, see :func:`importCharacterizedMocap`.
 
-    # check if mocap is successfully imported
-    mocapRoot = mocapNamespace + getMappingRoot(mocapSkeletonMappings)
-    if not pc.objExists(mocapRoot):
-        pc.error("Could not find mocap Root node")
+    Everything runs with the viewport refresh suspended and with the
+    selection restored once at the end, see :func:`suspend.suspended`. Undo
+    is off, the bake writes its curves through the API and undo would take
+    back the characterization only, so apply cannot be undone. evaluation
+    sets the evaluation manager mode for the run,
+    :data:`suspend.BAKE_EVALUATION` for instance.
 
-    setRange(mocapRoot)
-    # define HIK Skeleton
-    mocapDefinition = mapMocapSkeleton(mocapNamespace, mocapSkeletonMappings)
+    preprocess unrolls, smooths and resamples the take to the scene rate
+    before it is characterized, see :func:`preprocessMocap`, leaving a take
+    recorded at 120 fps with one key per scene frame instead of five.
+    '''
+    startFrame = 0
+    prepareHIK(startFrame)
 
-    # define HIK skeleton for rig
-    rigDefinition = mapRigSkeleton(rigNamespace, rigSkeletonMappings)
+    with suspended('apply', undo='off', evaluation=evaluation):
+        retarget = characterize(
+                mocapPath, rigNamespace, mocapMapping, rigMapping, rigPath,
+                useCache=useCache, preprocess=preprocess)
 
-    # define HIK custom_rig for rig
-    mapRigControls(rigNamespace, rigDefinition, rigControlsMappings)
+        with stage('setRange'):
+            setRange(retarget.mocapRoot)
 
-    # set mocap as source for this rig
-    linkMocapHikToRigHik(mocapDefinition, rigDefinition)
+        # bake in bulk, this does not step the scene like bakeResults did and
+        # so does not hang maya 2016
+        with stage('bakeRig'):
+            bakeRig(retarget.rigNamespace, retarget.mocapNamespace,
+                    retarget.mocapMapping, retarget.rigMapping)
 
-    # select the controls
-    pc.select(getRigControls(rigNamespace), rigControlsMappings)
+        with stage('cleanupHIK'):
+            cleanupHIK(retarget.mocapDefinition, retarget.rigDefinition)
 
-    setRange(mocapRoot)
 
-    # To stop maya 2016 from hanging on bake call this in MEL instead
-    if pc.about(v=True) >= 2018:
-        # TODO: enable following code for maya 2018 and change the code in
-        # launch.mel
+def applyMany(performers, sampleBy=1, chunkSize=None, callback=None,
+              evaluation=None):
+    ''' Retarget several mocap takes onto several rigs and bake them all in
+    one pass over the frames
 
-        bakeRig()
+    Every mocap/rig pair is characterized first, then the union of the
+    mapped controls is baked at once with :func:`bakeRetargets` rather than
+    one bake per character, and the HIK nodes of all the pairs are cleaned
+    up at the end.
 
-        cleanupHIK(mocapRoot)
+    :param performers: dicts of :func:`characterize` keyword arguments, one
+        per pair. Give each take its own mocapNamespace when more than one
+        take is imported.
+    :param evaluation: see :func:`apply`
+    :return: the :class:`Retarget` of every pair
+    '''
+    startFrame = 0
+    prepareHIK(startFrame)
 
+    retargets = []
+    with suspended('applyMany', undo='off', evaluation=evaluation):
+        try:
+            for performer in performers:
+                retargets.append(characterize(**performer))
+
+            with stage('bakeRig'):
+                bakeRetargets(retargets, sampleBy, chunkSize, callback)
+        finally:
+            with stage('cleanupHIK'):
+                cleanupRetargets(retargets)
+    return retargets
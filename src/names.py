@@ -0,0 +1,76 @@
+'''
+Created on Oct 18, 2026
+
+Unique node names, many at a time.
+
+The names taken are listed with one wildcard ``ls`` instead of an objExists
+per candidate. Names handed out are reserved so that names asked for before
+their nodes are created do not collide either, until the scene lists them:
+from then on the scene holds the name and deleting the node frees it.
+'''
+
+import re
+import pymel.core as pc
+
+
+class NameAllocator(object):
+    ''' Hands out names that are neither in the scene nor reserved
+
+    A name is numbered on its first run of digits, or at its end when it has
+    none: for 'MocapCharacter1' the candidates are MocapCharacter1,
+    MocapCharacter2... and for 'Rig' they are Rig, Rig1, Rig2... '''
+
+    def __init__(self):
+        self.reserved = set()
+
+    @staticmethod
+    def split(name):
+        ''' (prefix, number, suffix) of name, number is None without digits '''
+        match = re.search(r'\d+', name)
+        if not match:
+            return name, None, ''
+        return (name[:match.start()], int(match.group()),
+                name[match.end():])
+
+    def taken(self, prefix, suffix=''):
+        ''' Names in the scene that start with prefix and end with suffix '''
+        return set(str(node).split('|')[-1]
+                   for node in pc.ls(prefix + '*' + suffix))
+
+    def allocate(self, name, count=1, reserve=True):
+        ''' count free names like name, in order, with a single scene query
+
+        :param reserve: keep the names from being handed out again until
+            they are released or listed in the scene
+        '''
+        prefix, number, suffix = self.split(name)
+        taken = self.taken(prefix, suffix)
+        # the nodes of these were created, the scene keeps them taken
+        self.reserved.difference_update(taken)
+        taken |= self.reserved
+
+        names = []
+        if name not in taken:
+            names.append(name)
+        num = 1
+        while len(names) < count:
+            candidate = '%s%d%s' % (prefix, num, suffix)
+            num += 1
+            if candidate not in taken and candidate not in names:
+                names.append(candidate)
+        if reserve:
+            self.reserved.update(names)
+        return names
+
+    def release(self, *names):
+        self.reserved.difference_update(str(name) for name in names)
+
+    def reset(self):
+        self.reserved.clear()
+
+
+allocator = NameAllocator()
+
+
+def uniqueNames(name, count=1, reserve=True):
+    return allocator.allocate(name, count, reserve)
@@ -0,0 +1,285 @@
+'''
+Created on Oct 18, 2026
+
+Reading and writing the channels of many nodes at once.
+
+The per joint helpers of moctor used to send a command per channel per node,
+an objExists before each. Here the nodes of a mapping are checked in a single
+``ls``, writes are collected into one mel script per CHUNK_SIZE statements,
+keys are set with one ``setKeyframe`` over all the plugs, and values and lock
+states are read back with one call of a mel proc per CHUNK_SIZE plugs or
+nodes. A :class:`Pose` is a snapshot of channel values that can be applied,
+keyed or compared with another::
+
+    pose = Pose.read(mappingNodes(namespace, mapping), ('rotate',))
+    zeroOut(pose.nodes)
+    ...
+    pose.apply()
+'''
+
+import pymel.core as pc
+from collections import OrderedDict
+
+from .lazy import evalMel
+
+
+CHUNK_SIZE = 1000
+
+COMPOUNDS = {
+    'translate': ('translateX', 'translateY', 'translateZ'),
+    'rotate': ('rotateX', 'rotateY', 'rotateZ'),
+    'scale': ('scaleX', 'scaleY', 'scaleZ')}
+
+SHORT_NAMES = {
+    'translate': ('tx', 'ty', 'tz'),
+    'rotate': ('rx', 'ry', 'rz'),
+    'scale': ('sx', 'sy', 'sz')}
+
+# defined once, each reads all the plugs or nodes it is given in one call
+READ_PROCS = '''
+global proc float[] moctorGetAttrs(string $plugs[]) {
+    float $values[];
+    string $plug;
+    for ($plug in $plugs)
+        $values[size($values)] = `getAttr $plug`;
+    return $values;
+}
+
+global proc string[] moctorLockedAttrs(string $nodes[]) {
+    string $locked[];
+    string $node;
+    string $attr;
+    for ($node in $nodes) {
+        string $attrs[] = `listAttr -l $node`;
+        for ($attr in $attrs)
+            $locked[size($locked)] = $node + "." + $attr;
+    }
+    return $locked;
+}
+'''
+
+
+def mappingNodes(namespace, mapping):
+    ''' The nodes of mapping that exist under namespace, with one query '''
+    return existing([namespace + name for name in mapping])
+
+
+def existing(nodes):
+    ''' The nodes that exist, in the order given '''
+    nodes = [str(node) for node in nodes]
+    if not nodes:
+        return []
+    found = set()
+    for node in pc.ls(nodes):
+        # a name several nodes share comes back as a path, grp|name
+        found.add(str(node))
+        found.add(str(node).split('|')[-1])
+    return [node for node in nodes if node in found]
+
+
+def _melValue(value):
+    if isinstance(value, (list, tuple)):
+        return ' '.join(_melValue(item) for item in value)
+    if isinstance(value, bool):
+        return str(int(value))
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+def setValues(values, chunkSize=CHUNK_SIZE):
+    ''' Set {node: {attr: value}} with a mel script per chunkSize
+    attributes, compounds take a sequence of values
+
+    :return: number of attributes set
+    '''
+    statements = ['setAttr "%s.%s" %s;' % (node, attr, _melValue(value))
+                  for node, attrs in values.items()
+                  for attr, value in attrs.items()]
+    for start in range(0, len(statements), chunkSize):
+        pc.mel.eval('\n'.join(statements[start:start + chunkSize]))
+    return len(statements)
+
+
+def setAll(nodes, attr, value, chunkSize=CHUNK_SIZE):
+    ''' Set the same value on attr of all nodes '''
+    return setValues(OrderedDict((node, {attr: value}) for node in nodes),
+                     chunkSize)
+
+
+def zeroOut(nodes, attrs=('rotate',)):
+    ''' Set the compound attrs of nodes to zero '''
+    return setValues(OrderedDict(
+        (node, OrderedDict((attr, (0, 0, 0)) for attr in attrs))
+        for node in nodes))
+
+
+def setDrawStyle(nodes, style):
+    ''' drawStyle of the joints among nodes, 2 hides them '''
+    nodes = [str(node) for node in nodes]
+    if not nodes:
+        return 0
+    return setAll([str(node) for node in pc.ls(nodes, type='joint')],
+                  'drawStyle', style)
+
+
+def keyNodes(nodes, attrs=('rotate',), time=None):
+    ''' Key attrs of all nodes with one setKeyframe, compounds are keyed on
+    their children '''
+    plugs = ['%s.%s' % (node, child) for node in nodes for attr in attrs
+             for child in SHORT_NAMES.get(attr, (attr,))]
+    if not plugs:
+        return 0
+    if time is None:
+        pc.setKeyframe(plugs)
+    else:
+        pc.setKeyframe(plugs, t=time)
+    return len(plugs)
+
+
+def getValues(plugs, chunkSize=CHUNK_SIZE):
+    ''' Values of numeric plugs, one mel call per chunkSize plugs '''
+    evalMel(READ_PROCS)
+    plugs = [str(plug) for plug in plugs]
+    values = []
+    for start in range(0, len(plugs), chunkSize):
+        values.extend(pc.mel.moctorGetAttrs(plugs[start:start + chunkSize]))
+    return values
+
+
+def lockedAttrs(nodes, chunkSize=CHUNK_SIZE):
+    ''' {node: set(locked attribute names)}, one mel call per chunkSize
+    nodes '''
+    nodes = [str(node) for node in nodes]
+    locked = dict((node, set()) for node in nodes)
+    if not nodes:
+        return locked
+    evalMel(READ_PROCS)
+    for start in range(0, len(nodes), chunkSize):
+        for plug in pc.mel.moctorLockedAttrs(
+                nodes[start:start + chunkSize]) or []:
+            node, _, attr = str(plug).partition('.')
+            locked[node].add(attr)
+    return locked
+
+
+def attrIsLocked(locked, attr):
+    ''' Whether attr or one of its children is in the set of locked names '''
+    attr = attr.lstrip('.')
+    return any(name in locked for name in (attr,) + COMPOUNDS.get(attr, ()))
+
+
+class Pose(object):
+    ''' A snapshot of the values of some attributes of some nodes
+
+    values are {node: {attr: value}}, compounds hold a tuple of their
+    children's values. locked is {node: set(locked names)} when the locks
+    were read. '''
+
+    def __init__(self, values=None, locked=None):
+        self.values = OrderedDict(values or ())
+        self.locked = locked
+
+    @property
+    def nodes(self):
+        return list(self.values)
+
+    @classmethod
+    def read(cls, nodes, attrs=('rotate',), locks=False,
+             chunkSize=CHUNK_SIZE):
+        ''' Read numeric attrs of the existing nodes with :func:`getValues`,
+        the compounds of COMPOUNDS are read on their children '''
+        nodes = existing(nodes)
+        plugs = ['%s.%s' % (node, child) for node in nodes for attr in attrs
+                 for child in SHORT_NAMES.get(attr, (attr,))]
+        read = iter(getValues(plugs, chunkSize))
+        values = OrderedDict()
+        for node in nodes:
+            values[node] = OrderedDict()
+            for attr in attrs:
+                if attr in SHORT_NAMES:
+                    values[node][attr] = tuple(
+                        next(read) for _ in SHORT_NAMES[attr])
+                else:
+                    values[node][attr] = next(read)
+        return cls(values, lockedAttrs(nodes, chunkSize) if locks else None)
+
+    @classmethod
+    def fromMapping(cls, namespace, mapping, attrs=('rotate',), locks=False):
+        return cls.read([namespace + name for name in mapping], attrs, locks)
+
+    def get(self, node, attr):
+        return self.values[node][attr]
+
+    def set(self, node, attr, value):
+        self.values.setdefault(node, OrderedDict())[attr] = value
+
+    def copy(self):
+        return Pose(OrderedDict((node, OrderedDict(attrs))
+                                for node, attrs in self.values.items()),
+                    None if self.locked is None else dict(
+                        (node, set(names))
+                        for node, names in self.locked.items()))
+
+    def isLocked(self, node, attr):
+        if self.locked is None:
+            self.locked = lockedAttrs(self.nodes)
+        if node not in self.locked:
+            self.locked.update(lockedAttrs([node]))
+        return attrIsLocked(self.locked[node], attr)
+
+    def unlocked(self):
+        ''' values without the attributes known to be locked '''
+        if self.locked is None:
+            return self.values
+        return OrderedDict(
+            (node, OrderedDict(
+                (attr, value) for attr, value in attrs.items()
+                if not attrIsLocked(self.locked.get(node, ()), attr)))
+            for node, attrs in self.values.items())
+
+    def apply(self, chunkSize=CHUNK_SIZE):
+        ''' Set the pose on the scene, skipping locked attributes if the
+        locks were read '''
+        return setValues(self.unlocked(), chunkSize)
+
+    def key(self, time=None):
+        ''' Apply the pose and key its attributes '''
+        self.apply()
+        attrs = []
+        for names in self.values.values():
+            attrs.extend(attr for attr in names if attr not in attrs)
+        return keyNodes(self.nodes, attrs, time)
+
+    def diff(self, other, tolerance=1e-6):
+        ''' {node: {attr: (this value, other value)}} of the attributes that
+        differ by more than tolerance, attributes missing on one side are
+        given as None '''
+        diff = OrderedDict()
+        for node in list(self.values) + [
+                node for node in other.values if node not in self.values]:
+            mine = self.values.get(node, {})
+            theirs = other.values.get(node, {})
+            for attr in list(mine) + [a for a in theirs if a not in mine]:
+                a, b = mine.get(attr), theirs.get(attr)
+                if not _close(a, b, tolerance):
+                    diff.setdefault(node, OrderedDict())[attr] = (a, b)
+        return diff
+
+    def __len__(self):
+        return len(self.values)
+
+    def __repr__(self):
+        return 'Pose(%d nodes)' % len(self.values)
+
+
+def _close(a, b, tolerance):
+    if a is None or b is None:
+        return a is b
+    if isinstance(a, (list, tuple)):
+        return (isinstance(b, (list, tuple)) and len(a) == len(b) and
+                all(_close(x, y, tolerance) for x, y in zip(a, b)))
+    try:
+        return abs(a - b) <= tolerance
+    except TypeError:
+        return a == b
@@ -0,0 +1,243 @@
+'''
+Created on Oct 18, 2026
+
+Clean up of raw mocap before it is characterized. Takes recorded at 60 to 120
+fps come with jitter and with many more keys than the scene rate needs, the
+HIK solve and the bake then evaluate every one of them.
+
+The curves of all the joints of the take are read into one (frames, channels)
+array and, in bulk:
+
+* rotations are unrolled so that no channel jumps by a whole turn
+* every channel is smoothed by a zero phase Butterworth low pass, which is
+  also the anti aliasing filter of the resampling
+* the channels are resampled on whole frames of the scene rate
+
+and the curves are written back in place::
+
+    preprocess.preprocessSkeleton('take:', 'iPi', cutoff=6.0)
+
+:func:`moctor.characterize` and :func:`moctor.importCharacterizedMocap` run
+it before :func:`moctor.mapMocapSkeleton` when given ``preprocess``.
+:func:`preprocessTake` does the same to a :class:`mocapfile.MocapTake`. Only
+:func:`preprocessSkeleton` needs maya.
+'''
+
+import copy
+import math
+
+import numpy as np
+
+from . import bakecurves as bc
+
+
+# Hz, body motion has little above it while the jitter of the solvers does
+DEFAULT_CUTOFF = 8.0
+DEFAULT_ORDER = 2
+
+# of the target Nyquist frequency, the cutoff is lowered to it on a
+# downsample so that the resampling does not alias
+ALIAS_MARGIN = 0.8
+
+
+def butterworth(cutoff, fps, order=DEFAULT_ORDER):
+    ''' Second order sections [(b, a)] of a low pass Butterworth filter
+
+    :param cutoff: -3dB frequency in Hz, under fps / 2
+    :param order: an even number
+    '''
+    if order < 2 or order % 2:
+        raise ValueError('order must be even and at least 2, got %r' % order)
+    if not 0 < cutoff < fps / 2.0:
+        raise ValueError('cutoff %r Hz is not under the Nyquist frequency '
+                         'of %r fps' % (cutoff, fps))
+    k = math.tan(math.pi * cutoff / fps)
+    sections = []
+    for idx in range(order // 2):
+        q = 1.0 / (2 * math.cos(math.pi * (2 * idx + 1) / (2.0 * order)))
+        norm = 1.0 / (1 + k / q + k * k)
+        b0 = k * k * norm
+        sections.append(((b0, 2 * b0, b0),
+                         (1.0, 2 * (k * k - 1) * norm,
+                          (1 - k / q + k * k) * norm)))
+    return sections
+
+
+def lfilter(section, values):
+    ''' Run one second order section over the frames of values, every
+    channel at once, starting at rest on the first frame '''
+    (b0, b1, b2), (_, a1, a2) = section
+    result = np.empty_like(values)
+    x1 = x2 = y1 = y2 = values[0]
+    for idx in range(len(values)):
+        x0 = values[idx]
+        y0 = b0 * x0 + b1 * x1 + b2 * x2 - a1 * y1 - a2 * y2
+        result[idx] = y0
+        x2, x1, y2, y1 = x1, x0, y1, y0
+    return result
+
+
+def filtfilt(sections, values, padding=None):
+    ''' Zero phase filtering of values along the frames, forward then
+    backward, padded by odd reflection at both ends '''
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) < 2:
+        return values.copy()
+    if padding is None:
+        padding = 3 * (2 * len(sections) + 1)
+    padding = min(padding, len(values) - 1)
+    padded = np.concatenate([
+        2 * values[:1] - values[padding:0:-1], values,
+        2 * values[-1:] - values[-2:-padding - 2:-1]])
+    for section in sections:
+        padded = lfilter(section, padded)
+        padded = lfilter(section, padded[::-1])[::-1]
+    return padded[padding:len(padded) - padding]
+
+
+def resample(times, values, newTimes):
+    ''' Linear interpolation of (frames, channels) values keyed at times on
+    newTimes, every channel at once '''
+    times = np.asarray(times, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    newTimes = np.asarray(newTimes, dtype=np.float64)
+    if len(times) == len(newTimes) and np.allclose(times, newTimes):
+        return values.copy()
+    right = np.clip(np.searchsorted(times, newTimes), 1, len(times) - 1)
+    left = right - 1
+    span = times[right] - times[left]
+    weights = np.clip((newTimes - times[left]) / np.where(
+        span > 0, span, 1.0), 0.0, 1.0)
+    weights = weights.reshape((-1,) + (1,) * (values.ndim - 1))
+    return values[left] * (1 - weights) + values[right] * weights
+
+
+def keyRate(times, fps):
+    ''' Frames per second the keys at times, in scene frames, were recorded
+    at '''
+    steps = np.diff(times)
+    steps = steps[steps > 0]
+    if not len(steps):
+        return fps
+    return fps / float(np.median(steps))
+
+
+def preprocess(times, values, rotations, fps, cutoff=DEFAULT_CUTOFF,
+               sampleBy=1.0, order=DEFAULT_ORDER, period=bc.DEGREES_PERIOD):
+    ''' Unroll, smooth and resample the channels of a take
+
+    :param times: (frames,) increasing scene frames of the keys
+    :param values: (frames, channels) values of the keys
+    :param rotations: (channels,) bool, the rotation channels
+    :param fps: scene frames per second
+    :param cutoff: Hz, None or 0 not to smooth
+    :param sampleBy: scene frames between the resampled keys, None not to
+        resample
+    :return: new times and values
+    '''
+    times = np.asarray(times, dtype=np.float64)
+    values = np.array(values, dtype=np.float64)
+    rotations = np.asarray(rotations, dtype=bool)
+    if len(times) < 2:
+        return times, values
+
+    if rotations.any():
+        values[:, rotations] = bc.unrollEuler(values[:, rotations], period)
+
+    newTimes = None
+    if sampleBy:
+        newTimes = bc.frameTimes(math.ceil(times[0] - 1e-6),
+                                 math.floor(times[-1] + 1e-6), sampleBy)
+
+    if cutoff:
+        rate = keyRate(times, fps)
+        if newTimes is not None:
+            cutoff = min(cutoff, ALIAS_MARGIN * fps / (2.0 * sampleBy))
+        cutoff = min(cutoff, ALIAS_MARGIN * rate / 2.0)
+        values = filtfilt(butterworth(cutoff, rate, order), values)
+
+    if newTimes is None:
+        return times, values
+    return newTimes, resample(times, values, newTimes)
+
+
+def preprocessTake(take, fps=None, cutoff=DEFAULT_CUTOFF,
+                   order=DEFAULT_ORDER):
+    ''' A copy of a :class:`mocapfile.MocapTake` smoothed and resampled to
+    fps, its own rate by default '''
+    frames = take.frames.astype(np.float64)
+    fps = fps or take.frameRate
+    shape = take.data.shape
+    rotations = np.zeros(shape[1:], dtype=bool)
+    rotations[:, 3:] = True
+    # take frames stretched to fps frames
+    times = frames * (fps / float(take.frameRate))
+    newTimes, values = preprocess(
+            times, take.data.reshape(shape[0], -1), rotations.ravel(), fps,
+            cutoff, 1.0, order)
+    result = copy.copy(take)
+    result.data = values.reshape((len(newTimes),) + shape[1:]).astype(
+            take.data.dtype)
+    result.frameCount = len(newTimes)
+    result.frameRate = fps
+    result.startFrame = int(newTimes[0]) if len(newTimes) else 0
+    return result
+
+
+##########
+#  Maya  #
+##########
+
+
+def skeletonJoints(namespace, mocapMapping):
+    ''' The root of a mapped mocap skeleton and every joint below it '''
+    import pymel.core as pc
+    from .mappings import MappingTypes, getMappingRoot, loadMapping
+
+    root = namespace + getMappingRoot(
+            loadMapping(mocapMapping, MappingTypes.sk))
+    if not pc.objExists(root):
+        pc.error('Could not find mocap root node %s' % root)
+    return [root] + [str(joint) for joint in pc.listRelatives(
+        root, allDescendents=True, type='joint')]
+
+
+def preprocessSkeleton(namespace, mocapMapping, cutoff=DEFAULT_CUTOFF,
+                       sampleBy=1.0, order=DEFAULT_ORDER,
+                       channels=bc.CHANNELS):
+    ''' Unroll, smooth and resample the animCurves of every joint of a mocap
+    skeleton in place, see :func:`preprocess`
+
+    :return: names of the animCurves written
+    '''
+    import pymel.core as pc
+    import maya.api.OpenMaya as om
+    from . import animfile, bake
+
+    pairs, plugs = bake.getPlugs(
+            skeletonJoints(namespace, mocapMapping), channels)
+    found, foundPlugs, keys = [], [], []
+    for pair, plug in zip(pairs, plugs):
+        animCurve = bake.getAnimCurve(plug)
+        if animCurve is None:
+            continue
+        times, values = bake.getCurveKeys(
+                om.MFnDependencyNode(animCurve).name())
+        if len(times) < 2:
+            continue
+        found.append(pair)
+        foundPlugs.append(plug)
+        keys.append((times, values))
+    if not found:
+        return []
+
+    times, values = animfile.collect(keys, dtype=np.float64)
+    rotations = [bc.isRotateChannel(channel) for _, channel in found]
+    times, values = preprocess(
+            times, values.T, rotations, pc.mel.currentTimeUnitToFPS(),
+            cutoff, sampleBy, order)
+    curves = [bc.BakedCurve(node, channel, times, bake.toInternal(
+                  values[:, idx], rotation))
+              for idx, ((node, channel), rotation) in enumerate(
+                  zip(found, rotations))]
+    return bake.writeCurves(curves, foundPlugs, preserveOutsideKeys=False)
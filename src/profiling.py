@@ -0,0 +1,197 @@
+'''
+Created on Oct 18, 2026
+
+Per stage timing and maya command accounting.
+
+Stages are marked with ``with profiling.stage('name'):``. While profiling is
+disabled, the default, that is all they cost: no timer is read and pymel is
+left untouched. :func:`enable` starts recording wall and cpu time of every
+stage and wraps the pymel commands in COUNTED_COMMANDS and every ``pc.mel``
+procedure so that the calls made inside each stage are counted. The
+recording can be saved as a json trace that chrome://tracing and Perfetto
+open::
+
+    profiling.enable()
+    moctor.apply(...)
+    profiling.disable()
+    profiling.dump('apply.trace.json')
+'''
+
+import os
+import json
+import time
+import threading
+from collections import Counter
+
+
+_cpuTime = getattr(time, 'process_time', None) or time.clock
+
+COUNTED_COMMANDS = (
+    'objExists', 'setAttr', 'getAttr', 'select', 'selected', 'ls',
+    'listConnections', 'setKeyframe', 'keyframe', 'cutKey', 'xform',
+    'rotate', 'delete', 'PyNode', 'currentTime', 'playbackOptions',
+    'importFile', 'connectAttr', 'disconnectAttr', 'bakeResults')
+
+
+class _NullStage(object):
+    ''' What stage() gives when profiling is off '''
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+_nullStage = _NullStage()
+
+
+class _Stage(object):
+
+    def __init__(self, profiler, name, args):
+        self.profiler = profiler
+        self.name = name
+        self.args = args
+        self.calls = Counter()
+
+    def __enter__(self):
+        self.profiler._stack.append(self)
+        self.cpuStart = _cpuTime()
+        self.start = time.time()
+        return self
+
+    def __exit__(self, excType, excValue, tb):
+        end = time.time()
+        cpuEnd = _cpuTime()
+        self.profiler._stack.pop()
+        self.profiler._record(self, end, cpuEnd, excType)
+        return False
+
+
+class _CountingMel(object):
+    ''' Stands in for pc.mel and counts the procedures called through it '''
+
+    def __init__(self, mel, profiler):
+        self._mel = mel
+        self._profiler = profiler
+
+    def __getattr__(self, name):
+        proc = getattr(self._mel, name)
+        if not callable(proc) or name.startswith('_'):
+            return proc
+        return self._profiler._wrap(proc, 'mel.' + name)
+
+
+class Profiler(object):
+    ''' Records stages as chrome trace events '''
+
+    def __init__(self):
+        self.enabled = False
+        self.events = []
+        self.totals = Counter()
+        self._stack = []
+        self._patched = []
+        self._origin = None
+
+    def stage(self, name, **args):
+        if not self.enabled:
+            return _nullStage
+        return _Stage(self, name, args)
+
+    def count(self, command, number=1):
+        if self._stack:
+            self._stack[-1].calls[command] += number
+        self.totals[command] += number
+
+    def _wrap(self, func, command):
+        count = self.count
+
+        def counted(*args, **kwargs):
+            count(command)
+            return func(*args, **kwargs)
+        counted.__name__ = getattr(func, '__name__', command)
+        counted.__wrapped__ = func
+        return counted
+
+    def _record(self, stage, end, cpuEnd, excType):
+        args = dict(stage.args)
+        args['cpu'] = round(cpuEnd - stage.cpuStart, 6)
+        if stage.calls:
+            args['calls'] = dict(stage.calls)
+        if excType is not None:
+            args['error'] = excType.__name__
+        self.events.append({
+            'name': stage.name,
+            'cat': 'moctor',
+            'ph': 'X',
+            'ts': int((stage.start - self._origin) * 1e6),
+            'dur': int((end - stage.start) * 1e6),
+            'pid': os.getpid(),
+            'tid': threading.current_thread().ident or 0,
+            'args': args})
+
+    def enable(self, module=None, commands=COUNTED_COMMANDS):
+        ''' Start recording, counting calls to commands of module (pymel.core
+        by default) '''
+        if self.enabled:
+            return
+        if module is None:
+            import pymel.core as module
+        for command in commands:
+            func = getattr(module, command, None)
+            if func is None:
+                continue
+            self._patched.append((module, command, func))
+            setattr(module, command, self._wrap(func, command))
+        mel = getattr(module, 'mel', None)
+        if mel is not None:
+            self._patched.append((module, 'mel', mel))
+            module.mel = _CountingMel(mel, self)
+        if self._origin is None:
+            self._origin = time.time()
+        self.enabled = True
+
+    def disable(self):
+        ''' Stop recording and put the original commands back '''
+        while self._patched:
+            module, command, func = self._patched.pop()
+            setattr(module, command, func)
+        self.enabled = False
+
+    def reset(self):
+        self.events = []
+        self.totals = Counter()
+        self._origin = time.time() if self.enabled else None
+
+    def summary(self):
+        ''' {stage: {'wall': s, 'cpu': s, 'calls': {command: n}}} summed over
+        all runs of each stage '''
+        summary = {}
+        for event in self.events:
+            entry = summary.setdefault(
+                    event['name'], {'wall': 0.0, 'cpu': 0.0, 'calls': {}})
+            entry['wall'] += event['dur'] / 1e6
+            entry['cpu'] += event['args']['cpu']
+            for command, number in event['args'].get('calls', {}).items():
+                entry['calls'][command] = entry['calls'].get(
+                        command, 0) + number
+        return summary
+
+    def trace(self):
+        return {'traceEvents': list(self.events), 'displayTimeUnit': 'ms',
+                'otherData': {'totals': dict(self.totals)}}
+
+    def dump(self, path):
+        with open(path, 'w+') as _file:
+            json.dump(self.trace(), _file, indent=1)
+        return path
+
+
+profiler = Profiler()
+
+stage = profiler.stage
+enable = profiler.enable
+disable = profiler.disable
+reset = profiler.reset
+summary = profiler.summary
+dump = profiler.dump
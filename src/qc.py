@@ -0,0 +1,270 @@
+'''
+Created on Oct 18, 2026
+
+Quality checks of a retarget over the whole take.
+
+The world matrices of the mocap joints and of the rig joints mapped on the
+same HIK ids are sampled for every frame and the metrics are computed on the
+(frames, joints) arrays at once:
+
+* position error of every joint relative to the hips, the mocap scaled to
+  the rig by a least squares fit
+* foot slide, the horizontal speed of the rig feet while the mocap feet are
+  planted
+* bone length drift of the limbs of the rig
+* rotation flips, frames where a rig joint turns more than ``flipAngle``
+
+Nothing but :func:`sampleMatrices` needs maya, :func:`evaluate` takes plain
+arrays::
+
+    report = qc.checkRetarget('mocap:', 'iPi', 'rig:', 'AdvancedSkeleton')
+    if not report.passed:
+        print(report.summary())
+'''
+
+import numpy as np
+
+from .mappings import MappingTypes, loadMapping
+from .solver import ROOT_ID, qfromMatrix
+
+
+# HIK ids
+FEET = {'LeftFoot': 4, 'RightFoot': 7}
+
+# (parent, child) HIK ids of the rigid limb bones
+LIMBS = ((2, 3), (3, 4), (4, 16), (5, 6), (6, 7), (7, 17), (18, 9), (9, 10),
+         (10, 11), (19, 12), (12, 13), (13, 14), (20, 15))
+
+UP_AXIS = 1
+
+DEFAULT_THRESHOLDS = {
+    # scene units, relative to the hips
+    'positionError': 5.0,
+    # scene units per second while planted
+    'footSlide': 10.0,
+    # planted: foot within contactHeight of its lowest and slower than
+    # contactSpeed in the mocap
+    'contactHeight': 3.0,
+    'contactSpeed': 15.0,
+    # fraction of the median length
+    'boneDrift': 0.02,
+    # degrees in one frame
+    'flipAngle': 90.0,
+    'flips': 0}
+
+
+class QCReport(object):
+    ''' Metrics of a take and whether they are within the thresholds '''
+
+    def __init__(self, frames, thresholds):
+        self.frames = frames
+        self.thresholds = thresholds
+        self.scale = 1.0
+        self.positionError = {}
+        self.footSlide = {}
+        self.boneDrift = {}
+        self.flips = {}
+
+    @property
+    def failures(self):
+        ''' [(metric, subject, value, threshold)] over the thresholds '''
+        limits = self.thresholds
+        failures = []
+        for name, entry in sorted(self.positionError.items()):
+            if entry['max'] > limits['positionError']:
+                failures.append(('positionError', name, entry['max'],
+                                 limits['positionError']))
+        for name, entry in sorted(self.footSlide.items()):
+            if entry['max'] > limits['footSlide']:
+                failures.append(('footSlide', name, entry['max'],
+                                 limits['footSlide']))
+        for name, drift in sorted(self.boneDrift.items()):
+            if drift > limits['boneDrift']:
+                failures.append(('boneDrift', name, drift,
+                                 limits['boneDrift']))
+        flips = sum(len(frames) for frames in self.flips.values())
+        if flips > limits['flips']:
+            failures.append(('flips', ', '.join(sorted(self.flips)), flips,
+                             limits['flips']))
+        return failures
+
+    @property
+    def passed(self):
+        return not self.failures
+
+    def toDict(self):
+        return {
+            'frames': self.frames,
+            'passed': self.passed,
+            'scale': self.scale,
+            'thresholds': dict(self.thresholds),
+            'positionError': self.positionError,
+            'footSlide': self.footSlide,
+            'boneDrift': self.boneDrift,
+            'flips': self.flips,
+            'failures': [list(failure) for failure in self.failures]}
+
+    def summary(self):
+        lines = ['%d frames, %s' % (
+            self.frames, 'passed' if self.passed else 'FAILED')]
+        for metric, subject, value, limit in self.failures:
+            lines.append('  %-14s %-30s %10.4f > %s' % (
+                metric, subject, value, limit))
+        return '\n'.join(lines)
+
+    def __repr__(self):
+        return 'QCReport(%d frames, %d failures)' % (
+            self.frames, len(self.failures))
+
+
+def _speeds(positions, fps, axes=(0, 1, 2)):
+    ''' (frames, joints) speeds, the first frame taking the second's '''
+    deltas = np.diff(positions[..., list(axes)], axis=0)
+    speeds = np.linalg.norm(deltas, axis=-1) * fps
+    return np.concatenate([speeds[:1], speeds], axis=0)
+
+
+def evaluate(ids, mocapMatrices, rigMatrices, fps=24.0, names=None,
+             thresholds=None):
+    ''' Compute the metrics from sampled world matrices
+
+    :param ids: HIK ids of the joints, in the column order of the matrices
+    :param mocapMatrices: (frames, joints, 4, 4) row vector world matrices
+        of the mocap joints
+    :param rigMatrices: the same for the rig joints on the same ids
+    :param names: of the joints in the report, the ids by default
+    :return: :class:`QCReport`
+    '''
+    limits = dict(DEFAULT_THRESHOLDS)
+    limits.update(thresholds or {})
+    ids = list(ids)
+    names = [str(num) for num in ids] if names is None else list(names)
+    mocap = np.asarray(mocapMatrices, dtype=np.float64)[..., 3, :3]
+    rig = np.asarray(rigMatrices, dtype=np.float64)
+    rigPositions = rig[..., 3, :3]
+    report = QCReport(len(rig), limits)
+    column = dict((num, idx) for idx, num in enumerate(ids))
+
+    # position error relative to the hips, mocap fitted to the rig's size
+    root = column.get(ROOT_ID, 0)
+    mocapLocal = mocap - mocap[:, root:root + 1]
+    rigLocal = rigPositions - rigPositions[:, root:root + 1]
+    norm = (mocapLocal * mocapLocal).sum()
+    report.scale = float((mocapLocal * rigLocal).sum() / norm) if norm else 1.0
+    errors = np.linalg.norm(rigLocal - report.scale * mocapLocal, axis=-1)
+    for idx, name in enumerate(names):
+        report.positionError[name] = {
+            'mean': float(errors[:, idx].mean()),
+            'max': float(errors[:, idx].max()),
+            'frame': int(errors[:, idx].argmax())}
+
+    # foot slide while the mocap foot is planted
+    horizontal = [axis for axis in range(3) if axis != UP_AXIS]
+    for foot, num in sorted(FEET.items()):
+        idx = column.get(num)
+        if idx is None:
+            continue
+        heights = mocap[:, idx, UP_AXIS]
+        planted = ((heights - heights.min() < limits['contactHeight']) &
+                   (_speeds(mocap[:, idx:idx + 1], fps)[:, 0] <
+                    limits['contactSpeed']))
+        slide = _speeds(rigPositions[:, idx:idx + 1], fps, horizontal)[:, 0]
+        slide = slide[planted]
+        report.footSlide[foot] = {
+            'contactFrames': int(planted.sum()),
+            'mean': float(slide.mean()) if len(slide) else 0.0,
+            'max': float(slide.max()) if len(slide) else 0.0}
+
+    # bone length drift of the limbs
+    bones = [(column[parent], column[child]) for parent, child in LIMBS
+             if parent in column and child in column]
+    if bones:
+        parents, children = np.array(bones).T
+        lengths = np.linalg.norm(rigPositions[:, children] -
+                                 rigPositions[:, parents], axis=-1)
+        medians = np.median(lengths, axis=0)
+        drift = np.abs(lengths - medians).max(axis=0) / np.where(
+                medians > 1e-9, medians, 1.0)
+        for (parent, child), value in zip(bones, drift):
+            report.boneDrift['%s>%s' % (names[parent], names[child])] = (
+                    float(value))
+
+    # flips, the angle turned between frames from the quaternions
+    if len(rig) > 1:
+        quats = qfromMatrix(np.swapaxes(rig[..., :3, :3], -1, -2))
+        dots = np.abs((quats[1:] * quats[:-1]).sum(axis=-1))
+        angles = np.degrees(2 * np.arccos(np.clip(dots, 0.0, 1.0)))
+        frames, joints = np.nonzero(angles > limits['flipAngle'])
+        for frame, joint in zip(frames, joints):
+            report.flips.setdefault(names[joint], []).append(int(frame) + 1)
+    return report
+
+
+##########
+#  Maya  #
+##########
+
+
+def sampleMatrices(nodes, times):
+    ''' (frames, nodes, 4, 4) world matrices of nodes at times, through
+    context evaluation '''
+    import maya.api.OpenMaya as om
+
+    plugs = []
+    for node in nodes:
+        sel = om.MSelectionList()
+        sel.add(str(node))
+        plugs.append(om.MFnDependencyNode(sel.getDependNode(0)).findPlug(
+            'worldMatrix', False).elementByLogicalIndex(0))
+    unit = om.MTime.uiUnit()
+    matrices = np.empty((len(times), len(plugs), 4, 4))
+    for row, frame in enumerate(times):
+        context = om.MDGContext(om.MTime(float(frame), unit))
+        for column, plug in enumerate(plugs):
+            matrices[row, column] = np.reshape(om.MFnMatrixData(
+                plug.asMObject(context)).matrix(), (4, 4))
+    return matrices
+
+
+def matchedJoints(mocapNamespace, mocapMapping, rigNamespace, rigMapping):
+    ''' [(id, mocap joint, rig joint)] of the HIK ids both skeleton mappings
+    map and that exist '''
+    import pymel.core as pc
+
+    mocap = loadMapping(mocapMapping, MappingTypes.sk)
+    rig = loadMapping(rigMapping, MappingTypes.sk)
+    pairs = [(num, mocapNamespace + mocap.getElement(num),
+              rigNamespace + rig.getElement(num))
+             for num in sorted(set(mocap.getIds()) & set(rig.getIds()))]
+    found = set(str(node) for node in pc.ls(
+        [node for _, mocapJoint, rigJoint in pairs
+         for node in (mocapJoint, rigJoint)]))
+    return [pair for pair in pairs if pair[1] in found and pair[2] in found]
+
+
+def checkRetarget(mocapNamespace, mocapMapping, rigNamespace, rigMapping,
+                  startFrame=None, endFrame=None, thresholds=None):
+    ''' Sample the mocap and rig skeletons over the range, the playback
+    range by default, and evaluate them
+
+    :return: :class:`QCReport`
+    '''
+    import pymel.core as pc
+    from . import bakecurves as bc
+
+    if startFrame is None:
+        startFrame = pc.playbackOptions(q=True, minTime=True)
+    if endFrame is None:
+        endFrame = pc.playbackOptions(q=True, maxTime=True)
+    joints = matchedJoints(mocapNamespace, mocapMapping, rigNamespace,
+                           rigMapping)
+    if not joints:
+        pc.error('No HIK id mapped on both %s and %s' % (
+            mocapMapping, rigMapping))
+    ids, mocapJoints, rigJoints = zip(*joints)
+    times = bc.frameTimes(startFrame, endFrame)
+    matrices = sampleMatrices(mocapJoints + rigJoints, times)
+    return evaluate(ids, matrices[:, :len(ids)], matrices[:, len(ids):],
+                    pc.mel.currentTimeUnitToFPS(),
+                    [joint[len(rigNamespace):] for joint in rigJoints],
+                    thresholds)
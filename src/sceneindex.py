@@ -0,0 +1,264 @@
+'''
+Created on Oct 18, 2026
+
+Cached indices of the scene, kept valid by scene callbacks.
+
+Lookups like "which HIK definition is this joint characterized in" used to
+follow connections from scratch every time, which adds up to quadratic work
+with many characters in a scene. An index is built with a handful of queries
+on first use and then answers from memory until a callback marks it dirty.
+
+An index watches maya's messages from its first lookup on. Without callbacks
+(maya's api not available, or :meth:`SceneIndex.unwatch` called) an index
+cannot know when the scene changed and is rebuilt for every lookup, which is
+as correct as walking the scene each time. :func:`clear` removes the
+callbacks of every index, ``reloadModules`` calls it before reloading this
+module so that the callbacks of the old indices do not pile up.
+'''
+
+import os.path as osp
+
+import pymel.core as pc
+
+
+HIK_TYPES = ('HIKCharacterNode', 'HIKRetargeterNode',
+             'CustomRigDefaultMappingNode')
+
+
+def _split(plug):
+    node, _, attr = str(plug).partition('.')
+    return node, attr.split('[')[0]
+
+
+def _inputs(nodes):
+    ''' [(own plug, source plug)] of all the nodes in one query '''
+    if not nodes:
+        return []
+    return pc.listConnections(nodes, s=True, d=False, c=True, p=True) or []
+
+
+def mayaCallbacks(nodeTypes):
+    ''' A register function for :meth:`SceneIndex.watch` using maya's api
+    messages: nodes of nodeTypes added or removed, connections made to them,
+    renamed nodes and new, opened, imported or referenced scenes '''
+    def register(callback):
+        import maya.api.OpenMaya as om
+
+        def changed(*args):
+            callback()
+
+        def connected(srcPlug, dstPlug, made, *args):
+            if om.MFnDependencyNode(dstPlug.node()).typeName in nodeTypes:
+                callback()
+
+        ids = []
+        for nodeType in nodeTypes:
+            ids.append(om.MDGMessage.addNodeAddedCallback(changed, nodeType))
+            ids.append(om.MDGMessage.addNodeRemovedCallback(
+                changed, nodeType))
+        ids.append(om.MDGMessage.addConnectionCallback(connected))
+        ids.append(om.MNodeMessage.addNameChangedCallback(
+            om.MObject.kNullObj, changed))
+        for message in (om.MSceneMessage.kAfterNew,
+                        om.MSceneMessage.kAfterOpen,
+                        om.MSceneMessage.kAfterImport,
+                        om.MSceneMessage.kAfterCreateReference,
+                        om.MSceneMessage.kAfterLoadReference,
+                        om.MSceneMessage.kAfterUnloadReference,
+                        om.MSceneMessage.kAfterRemoveReference,
+                        om.MSceneMessage.kAfterImportReference):
+            ids.append(om.MSceneMessage.addCallback(message, changed))
+
+        def unregister():
+            om.MMessage.removeCallbacks(ids)
+            del ids[:]
+        return unregister
+    return register
+
+
+class SceneIndex(object):
+    ''' Base of the indices, subclasses fill themselves in :meth:`build` '''
+
+    nodeTypes = ()
+
+    def __init__(self):
+        self.valid = False
+        self.builds = 0
+        self._unregister = None
+        self._triedWatch = False
+
+    @property
+    def watching(self):
+        return self._unregister is not None
+
+    def watch(self, register=None):
+        ''' Keep the index between lookups, invalidated through callbacks
+        that register(callback) sets up and whose return value removes them
+        when called. Maya's messages are used by default.
+
+        :return: whether the callbacks could be set up
+        '''
+        if self.watching:
+            return True
+        register = register or mayaCallbacks(self.nodeTypes)
+        try:
+            self._unregister = register(self.invalidate)
+        except ImportError:
+            return False
+        self.invalidate()
+        return True
+
+    def unwatch(self, retry=False):
+        ''' Remove the callbacks, they are set up again on the next lookup
+        if retry '''
+        self._triedWatch = not retry
+        if self._unregister is not None:
+            self._unregister()
+            self._unregister = None
+        self.invalidate()
+
+    def invalidate(self, *args):
+        self.valid = False
+
+    def ensure(self):
+        if not self._triedWatch:
+            self._triedWatch = True
+            self.watch()
+        if not (self.valid and self.watching):
+            self.clear()
+            self.build()
+            self.builds += 1
+            self.valid = True
+        return self
+
+    def clear(self):
+        pass
+
+    def build(self):
+        raise NotImplementedError
+
+
+class HikIndex(SceneIndex):
+    ''' HIK definitions, the joints characterized in them, the retargeters
+    linking them and the custom rig mapping nodes of the controls '''
+
+    nodeTypes = HIK_TYPES
+
+    def clear(self):
+        self.definitions = set()
+        self.jointDefinitions = {}
+        self.destinationSources = {}
+        self.retargeters = {}
+        self.controlMappings = {}
+        self.mappingSkeletons = {}
+
+    def build(self):
+        # one listConnections per node type, over all the nodes of the type
+        definitions = [str(node) for node in pc.ls(type='HIKCharacterNode')]
+        self.definitions.update(definitions)
+        for own, other in _inputs(definitions):
+            node, attr = _split(other)
+            if attr == 'Character':
+                self.jointDefinitions.setdefault(node, _split(own)[0])
+
+        links = {}
+        for own, other in _inputs(
+                [str(node) for node in pc.ls(type='HIKRetargeterNode')]):
+            retargeter, attr = _split(own)
+            links.setdefault(retargeter, {})[attr] = _split(other)[0]
+        for retargeter, inputs in links.items():
+            destination = inputs.get('InputCharacterDefinitionDst')
+            if not destination:
+                continue
+            source = inputs.get('InputCharacterDefinitionSrc', '')
+            self.retargeters[retargeter] = (source, destination)
+            self.destinationSources[destination] = source
+
+        for own, other in _inputs(
+                [str(node) for node in
+                 pc.ls(type='CustomRigDefaultMappingNode')]):
+            mappingNode, ownAttr = _split(own)
+            node, attr = _split(other)
+            if ownAttr == 'destinationSkeleton':
+                self.mappingSkeletons[mappingNode] = node
+            elif attr == 'message':
+                self.controlMappings.setdefault(node, mappingNode)
+
+    def definitionOfJoint(self, joint):
+        return self.ensure().jointDefinitions.get(str(joint), '')
+
+    def definitionOfControl(self, control):
+        self.ensure()
+        mappingNode = self.controlMappings.get(str(control))
+        skeleton = self.mappingSkeletons.get(mappingNode)
+        return self.jointDefinitions.get(skeleton, '')
+
+    def destinationSourceMapping(self):
+        return dict(self.ensure().destinationSources)
+
+    def destinations(self, source):
+        return sorted(dest for dest, src in
+                      self.ensure().destinationSources.items()
+                      if src == source)
+
+
+hikIndex = HikIndex()
+
+
+def normalizePath(path):
+    return osp.normcase(osp.normpath(path))
+
+
+class ReferenceIndex(SceneIndex):
+    ''' The file references of the scene by normalized path and by
+    namespace
+
+    Unloaded references are indexed as well as loaded ones, nested
+    references by their full namespace (parent:child) and, unless another
+    reference has it, their own namespace. When a file is referenced more
+    than once the first reference listed answers for its path. Renaming the
+    namespace of a reference sends no message, :meth:`invalidate` after
+    doing so. '''
+
+    nodeTypes = ('reference',)
+
+    def clear(self):
+        self.references = []
+        self.byPath = {}
+        self.byNamespace = {}
+
+    def build(self):
+        nested = []
+        for ref in pc.ls(type='reference'):
+            try:
+                refFile = ref.referenceFile()
+            except RuntimeError:
+                # sharedReferenceNode and the like
+                continue
+            if not refFile:
+                continue
+            self.references.append(refFile)
+            self.byPath.setdefault(normalizePath(refFile.path), refFile)
+            fullNamespace = getattr(refFile, 'fullNamespace',
+                                    refFile.namespace).strip(':')
+            self.byNamespace.setdefault(fullNamespace, refFile)
+            if fullNamespace != refFile.namespace:
+                nested.append(refFile)
+        for refFile in nested:
+            self.byNamespace.setdefault(refFile.namespace, refFile)
+
+    def fromPath(self, path):
+        return self.ensure().byPath.get(normalizePath(path))
+
+    def fromNamespace(self, namespace):
+        return self.ensure().byNamespace.get(namespace.strip(':'))
+
+
+referenceIndex = ReferenceIndex()
+
+
+def clear():
+    ''' Remove the callbacks of the indices of this module, they watch the
+    scene again from their next lookup '''
+    for index in (hikIndex, referenceIndex):
+        index.unwatch(retry=True)
@@ -0,0 +1,168 @@
+'''
+Created on Oct 18, 2026
+
+Baking one long take on many cores. The frame range is split into
+overlapping segments, each sampled by a headless mayapy worker that opens the
+characterized scene, and the samples are merged into the curves of the
+controls by :func:`bakecurves.mergeSegments`::
+
+    moctor.bakeRig(namespace, prefix, 'iPi', 'AdvancedSkeleton',
+                   method='sharded', shards=32)
+
+The workers only sample, the curves are built and written once in the
+session that asked for the bake, so the rotations are unrolled over the whole
+range in one go. The overlaps give workers evaluating sequentially
+(``simulation``) frames to settle before the part of the range they own.
+'''
+
+import os.path as osp
+import sys
+import json
+import shutil
+import tempfile
+import traceback
+import multiprocessing
+
+import numpy as np
+
+from . import bakecurves as bc
+from .batch import JobStatus, MayapyLauncher, Scheduler, moduleName
+
+
+DEFAULT_OVERLAP = 10
+
+
+class ShardJob(object):
+    ''' The samples of the controls over a segment of the times '''
+
+    fields = ('scenePath', 'controls', 'channels', 'times', 'simulation',
+              'outputPath', 'name')
+
+    def __init__(self, scenePath, controls, channels, times, simulation,
+                 outputPath, name=None):
+        self.scenePath = scenePath
+        self.controls = list(controls)
+        self.channels = list(channels)
+        self.times = [float(frame) for frame in times]
+        self.simulation = simulation
+        self.outputPath = outputPath
+        self.name = name or osp.splitext(osp.basename(outputPath))[0]
+
+    def toDict(self):
+        return dict((field, getattr(self, field)) for field in self.fields)
+
+    @classmethod
+    def fromDict(cls, data):
+        return cls(**dict((str(key), value) for key, value in data.items()
+                          if key in cls.fields))
+
+    def __repr__(self):
+        return 'ShardJob(%r, %d frames)' % (self.name, len(self.times))
+
+
+class ShardLauncher(MayapyLauncher):
+    ''' Samples every segment in a fresh mayapy process '''
+
+    module = moduleName(__name__, globals().get('__spec__'),
+                        'src.shard')
+
+
+def sampleShard(job):
+    ''' Sample the controls of the scene open over the times of a job into
+    its outputPath npz '''
+    from . import bake
+
+    pairs, plugs = bake.getPlugs(job.controls, job.channels)
+    samples = bake.samplePlugs(plugs, job.times, simulation=job.simulation)
+    np.savez(job.outputPath, times=np.asarray(job.times),
+             samples=samples, plugs=np.array(
+                 ['%s.%s' % pair for pair in pairs], dtype=str))
+
+
+def workerMain(jobPath, resultPath):
+    ''' Entry point of a mayapy worker process '''
+    with open(jobPath) as _file:
+        job = ShardJob.fromDict(json.load(_file))
+    result = {'status': JobStatus.failed}
+    try:
+        import maya.standalone
+        maya.standalone.initialize(name='python')
+        import pymel.core as pc
+        pc.openFile(job.scenePath, force=True)
+        sampleShard(job)
+        result['status'] = JobStatus.done
+    except Exception:
+        result['error'] = traceback.format_exc()
+        sys.stderr.write(result['error'])
+    with open(resultPath, 'w+') as _file:
+        json.dump(result, _file)
+    return 0 if result['status'] == JobStatus.done else 1
+
+
+def loadShard(path, plugs):
+    ''' The samples of a shard npz in the column order of plugs '''
+    data = np.load(path)
+    columns = dict((str(plug), idx) for idx, plug in enumerate(data['plugs']))
+    missing = [plug for plug in plugs if plug not in columns]
+    if missing:
+        raise RuntimeError('Shard %s did not sample %s' % (
+            path, ', '.join(missing[:5])))
+    return data['samples'][:, [columns[plug] for plug in plugs]]
+
+
+def saveScene(path):
+    ''' Save the scene as it is for the workers, references kept, without
+    renaming the scene open '''
+    import pymel.core as pc
+    pc.exportAll(path, force=True, preserveReferences=True,
+                 type='mayaBinary')
+    return path
+
+
+def bakeSharded(controls, startFrame, endFrame, shards=None, sampleBy=1,
+                overlap=DEFAULT_OVERLAP, simulation=False,
+                minimizeRotation=True, preserveOutsideKeys=True,
+                channels=bc.CHANNELS, launcher=None):
+    ''' Bake the driven channels of controls with the range split over
+    shards workers, one per core by default
+
+    :param launcher: runs a :class:`ShardJob`, a :class:`ShardLauncher`
+        starting mayapy by default
+    :return: names of the animCurves written
+    '''
+    from . import bake
+
+    pairs, plugs = bake.getPlugs(controls, channels)
+    if not plugs:
+        return []
+    times = bc.frameTimes(startFrame, endFrame, sampleBy)
+    segments = bc.splitTimes(
+            len(times), shards or multiprocessing.cpu_count(), overlap)
+
+    tmpdir = tempfile.mkdtemp(prefix='moctor_shards_')
+    try:
+        scenePath = saveScene(osp.join(tmpdir, 'scene.mb'))
+        jobs = [ShardJob(scenePath, controls, channels, times[start:stop],
+                         simulation, osp.join(tmpdir, 'shard%03d.npz' % idx))
+                for idx, (start, stop) in enumerate(segments)]
+        results = Scheduler(launcher or ShardLauncher(), len(jobs)).run(jobs)
+        failed = [result for result in results if not result.ok]
+        if failed:
+            raise RuntimeError('%d of %d shards failed:\n%s' % (
+                len(failed), len(results), failed[0].error))
+        names = ['%s.%s' % pair for pair in pairs]
+        samples = bc.mergeSegments(
+                segments, [loadShard(job.outputPath, names) for job in jobs],
+                pairs)[0]
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+    curves = bc.buildCurves(times, samples, pairs,
+                            minimizeRotation=minimizeRotation)
+    return bake.writeCurves(curves, plugs, preserveOutsideKeys)
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['--worker']:
+        sys.exit(workerMain(*sys.argv[2:4]))
+    sys.exit('usage: %s --worker job.json result.json' % sys.argv[0])
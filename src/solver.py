@@ -0,0 +1,484 @@
+'''
+Created on Oct 18, 2026
+
+A vectorized retarget solver that works without HumanIK and without maya.
+
+It reads the same sk / cr mappings and HIK slot ids as the HIK path. For every
+slot the world space rotation the source joint made away from its stance is
+applied to the rig control's stance rotation, for the whole take at once:
+
+    controlWorld(t) = sourceWorld(t) * sourceStance^-1 * controlStance
+    controlLocal(t) = controlParent(t)^-1 * controlWorld(t)
+
+Translating controls (the root and the IK controls, the ones mapRigControls
+maps on "T") follow the source joint's displacement scaled by the ratio of
+the hip heights.
+
+Quaternions are numpy arrays of (w, x, y, z) in the last axis and compose as
+column vector rotations, ``qmul(a, b)`` applies b first. Euler angles are in
+degrees and rotate orders use maya's names, 'xyz' rotating about x first.
+'''
+
+import numpy as np
+
+from . import bakecurves as bc
+
+
+ROTATE_ORDERS = ('xyz', 'yzx', 'zxy', 'xzy', 'yxz', 'zyx')
+
+ROOT_ID = 1
+
+
+#################
+#  Quaternions  #
+#################
+
+
+def qidentity(shape=()):
+    quat = np.zeros(tuple(shape) + (4,))
+    quat[..., 0] = 1.0
+    return quat
+
+
+def qnormalize(q):
+    q = np.asarray(q, dtype=np.float64)
+    return q / np.linalg.norm(q, axis=-1, keepdims=True)
+
+
+def qmul(a, b):
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    aw, ax, ay, az = np.moveaxis(a, -1, 0)
+    bw, bx, by, bz = np.moveaxis(b, -1, 0)
+    return np.stack([
+        aw * bw - ax * bx - ay * by - az * bz,
+        aw * bx + ax * bw + ay * bz - az * by,
+        aw * by - ax * bz + ay * bw + az * bx,
+        aw * bz + ax * by - ay * bx + az * bw], axis=-1)
+
+
+def qinv(q):
+    q = np.array(q, dtype=np.float64)
+    q[..., 1:] *= -1
+    return q
+
+
+def qrotate(q, v):
+    ''' Rotate vectors v by unit quaternions q '''
+    q = np.asarray(q, dtype=np.float64)
+    v = np.asarray(v, dtype=np.float64)
+    u = q[..., 1:]
+    t = 2.0 * np.cross(u, v)
+    return v + q[..., :1] * t + np.cross(u, t)
+
+
+def qaxis(axis, angles):
+    ''' Quaternions of rotations by angles (radians) about axis 0, 1 or 2 '''
+    angles = np.asarray(angles, dtype=np.float64) * 0.5
+    quat = np.zeros(angles.shape + (4,))
+    quat[..., 0] = np.cos(angles)
+    quat[..., axis + 1] = np.sin(angles)
+    return quat
+
+
+def qfromEuler(angles, order='xyz'):
+    ''' Quaternions from (..., 3) euler angles in degrees '''
+    angles = np.radians(np.asarray(angles, dtype=np.float64))
+    quat = None
+    for axis in ('xyz'.index(char) for char in order):
+        rot = qaxis(axis, angles[..., axis])
+        quat = rot if quat is None else qmul(rot, quat)
+    return quat
+
+
+def qtoMatrix(q):
+    ''' (..., 3, 3) column vector rotation matrices '''
+    w, x, y, z = np.moveaxis(qnormalize(q), -1, 0)
+    return np.stack([
+        np.stack([1 - 2 * (y * y + z * z), 2 * (x * y - w * z),
+                  2 * (x * z + w * y)], axis=-1),
+        np.stack([2 * (x * y + w * z), 1 - 2 * (x * x + z * z),
+                  2 * (y * z - w * x)], axis=-1),
+        np.stack([2 * (x * z - w * y), 2 * (y * z + w * x),
+                  1 - 2 * (x * x + y * y)], axis=-1)], axis=-2)
+
+
+def qfromMatrix(m):
+    ''' Quaternions from (..., 3, 3) column vector rotation matrices, any
+    scale in the matrices is removed first '''
+    m = np.asarray(m, dtype=np.float64)
+    m = m / np.linalg.norm(m, axis=-2, keepdims=True)
+    trace = m[..., 0, 0] + m[..., 1, 1] + m[..., 2, 2]
+    quat = np.empty(m.shape[:-2] + (4,))
+
+    # pick the numerically largest component per matrix
+    cases = np.stack([trace, m[..., 0, 0], m[..., 1, 1], m[..., 2, 2]], -1)
+    case = np.argmax(cases, axis=-1)
+
+    mask = case == 0
+    if mask.any():
+        sub = m[mask]
+        s = np.sqrt(np.maximum(trace[mask] + 1.0, 1e-12)) * 2
+        quat[mask] = np.stack([
+            0.25 * s, (sub[:, 2, 1] - sub[:, 1, 2]) / s,
+            (sub[:, 0, 2] - sub[:, 2, 0]) / s,
+            (sub[:, 1, 0] - sub[:, 0, 1]) / s], -1)
+
+    for axis in range(3):
+        mask = case == axis + 1
+        if not mask.any():
+            continue
+        sub = m[mask]
+        i, j, k = axis, (axis + 1) % 3, (axis + 2) % 3
+        s = np.sqrt(np.maximum(
+            1.0 + sub[:, i, i] - sub[:, j, j] - sub[:, k, k], 1e-12)) * 2
+        part = np.empty((len(sub), 4))
+        part[:, 0] = (sub[:, k, j] - sub[:, j, k]) / s
+        part[:, i + 1] = 0.25 * s
+        part[:, j + 1] = (sub[:, j, i] + sub[:, i, j]) / s
+        part[:, k + 1] = (sub[:, k, i] + sub[:, i, k]) / s
+        quat[mask] = part
+    return qnormalize(quat)
+
+
+def qtoEuler(q, order='xyz'):
+    ''' (..., 3) euler angles in degrees in x, y, z slots for rotate order '''
+    m = qtoMatrix(q)
+    i, j, k = ('xyz'.index(char) for char in order)
+    sign = 1.0 if (j - i) % 3 == 1 else -1.0
+
+    first = np.empty(m.shape[:-2])
+    second = np.arcsin(np.clip(-sign * m[..., k, i], -1.0, 1.0))
+    third = np.empty(m.shape[:-2])
+
+    regular = np.abs(m[..., k, i]) < 1.0 - 1e-9
+    first[regular] = np.arctan2(sign * m[..., k, j], m[..., k, k])[regular]
+    third[regular] = np.arctan2(sign * m[..., j, i], m[..., i, i])[regular]
+    # gimbal lock, put the whole rotation on the first axis
+    locked = ~regular
+    first[locked] = np.arctan2(
+            -sign * m[..., j, k], m[..., j, j])[locked]
+    third[locked] = 0.0
+
+    angles = np.empty(m.shape[:-2] + (3,))
+    angles[..., i] = first
+    angles[..., j] = second
+    angles[..., k] = third
+    return np.degrees(angles)
+
+
+def filterEuler(angles, orders, reference=None):
+    ''' Euler filter over (frames, n, 3) angles in degrees
+
+    Every frame is brought to whichever of its two equivalent euler
+    solutions, unrolled by whole turns, lies closest to the previous frame.
+    Unlike plain per channel unrolling this also removes the flips where the
+    middle axis passes +-90 degrees.
+
+    :param orders: rotate order of each of the n rotations
+    :param reference: optional (n, 3) values the first frame is kept close to
+    '''
+    angles = np.asarray(angles, dtype=np.float64)
+    if not len(angles):
+        return angles.copy()
+    perm = np.array([['xyz'.index(char) for char in order]
+                     for order in orders])
+    cols = np.arange(len(orders))[:, None]
+
+    ordered = angles[:, cols, perm]
+    flipped = ordered + (180.0, 0.0, 180.0)
+    flipped[..., 1] = 180.0 - ordered[..., 1]
+
+    result = np.empty_like(ordered)
+    previous = ordered[0] if reference is None else (
+            np.asarray(reference, dtype=np.float64)[cols, perm])
+    for frame in range(len(ordered)):
+        best = None
+        for candidate in (ordered[frame], flipped[frame]):
+            candidate = candidate - 360.0 * np.round(
+                    (candidate - previous) / 360.0)
+            if best is None:
+                best = candidate
+            else:
+                closer = (np.abs(candidate - previous).sum(-1) <
+                          np.abs(best - previous).sum(-1))
+                best = np.where(closer[:, None], candidate, best)
+        result[frame] = previous = best
+
+    filtered = np.empty_like(angles)
+    filtered[:, cols, perm] = result
+    return filtered
+
+
+def mayaMatrixRotation(matrix):
+    ''' Quaternion of the rotation in a flat 16 float maya (row vector)
+    matrix such as ``xform -q -ws -m`` returns '''
+    matrix = np.asarray(matrix, dtype=np.float64).reshape(-1, 4, 4)
+    return qfromMatrix(np.swapaxes(matrix[:, :3, :3], -1, -2))
+
+
+########################
+#  Forward kinematics  #
+########################
+
+
+def forwardKinematics(take):
+    ''' World rotations (frames, joints, 4) and positions (frames, joints, 3)
+    of a :class:`mocapfile.MocapTake` '''
+    frames, joints = take.data.shape[:2]
+    local = np.empty((frames, joints, 4))
+    for joint, order in enumerate(take.rotateOrders):
+        local[:, joint] = qfromEuler(take.data[:, joint, 3:], order)
+    translations = take.data[:, :, :3].astype(np.float64)
+
+    rotations = np.empty((frames, joints, 4))
+    positions = np.empty((frames, joints, 3))
+    for joint in _topologicalOrder(take.parents):
+        parent = take.parents[joint]
+        if parent < 0:
+            rotations[:, joint] = local[:, joint]
+            positions[:, joint] = translations[:, joint]
+        else:
+            rotations[:, joint] = qmul(rotations[:, parent], local[:, joint])
+            positions[:, joint] = positions[:, parent] + qrotate(
+                    rotations[:, parent], translations[:, joint])
+    return rotations, positions
+
+
+def _topologicalOrder(parents):
+    order, done = [], set()
+
+    def visit(joint):
+        if joint in done:
+            return
+        if parents[joint] >= 0:
+            visit(parents[joint])
+        done.add(joint)
+        order.append(joint)
+
+    for joint in range(len(parents)):
+        visit(joint)
+    return order
+
+
+#############
+#  Stances  #
+#############
+
+
+class SkeletonStance(object):
+    ''' World rotation and position of the mapped joints at stance, by HIK
+    slot id '''
+
+    def __init__(self, rotations=None, positions=None):
+        self.rotations = rotations or {}
+        self.positions = positions or {}
+
+    @classmethod
+    def fromTake(cls, take, mapping, frame=None):
+        ''' Stance of the take at frame, or of its rest pose if frame is None
+        (all rotations zero, the T-pose of BVH files) '''
+        rest = take.data[:1].copy() if frame is None else (
+                take.data[frame - take.startFrame][None].copy())
+        if frame is None:
+            rest[..., 3:] = 0
+            rest[0, :, :3] = np.where(
+                    take.animated[:, :3], rest[0, :, :3], take.offsets)
+        restTake = _TakeView(take, rest)
+        rotations, positions = forwardKinematics(restTake)
+        stance = cls()
+        for joint, name in enumerate(take.shortNames):
+            num = mapping.get(name)
+            if num is None:
+                continue
+            stance.rotations[num] = rotations[0, joint]
+            stance.positions[num] = positions[0, joint]
+        return stance
+
+    def height(self, num=ROOT_ID):
+        if num not in self.positions:
+            return 0.0
+        return float(self.positions[num][1])
+
+
+class _TakeView(object):
+
+    def __init__(self, take, data):
+        self.data = data
+        self.rotateOrders = take.rotateOrders
+        self.parents = take.parents
+
+
+class ControlStance(object):
+    ''' Stance of one rig control
+
+    :param worldRotation: quaternion of the control's world rotation
+    :param parentRotation: quaternion such that world = parent * local, the
+        parent world rotation including rotate axis / joint orient
+    :param parentWorldRotation: rotation of the parent's world space, in
+        which translate values are expressed
+    :param parent: name of the nearest ancestor that is a control too
+    '''
+
+    def __init__(self, name, num, worldRotation, parentRotation, rotate,
+                 translate, worldPosition, parentWorldRotation=None,
+                 rotateOrder='xyz', parent=None, rotates=True,
+                 translates=False):
+        self.name = name
+        self.num = num
+        self.worldRotation = np.asarray(worldRotation, dtype=np.float64)
+        self.parentRotation = np.asarray(parentRotation, dtype=np.float64)
+        self.parentWorldRotation = np.asarray(
+                parentRotation if parentWorldRotation is None
+                else parentWorldRotation, dtype=np.float64)
+        self.rotate = np.asarray(rotate, dtype=np.float64)
+        self.translate = np.asarray(translate, dtype=np.float64)
+        self.worldPosition = np.asarray(worldPosition, dtype=np.float64)
+        self.rotateOrder = rotateOrder
+        self.parent = parent
+        self.rotates = rotates
+        self.translates = translates
+
+
+############
+#  Solver  #
+############
+
+
+class Solution(object):
+    ''' Solved channels of every control, rotations in degrees '''
+
+    def __init__(self, times):
+        self.times = np.asarray(times, dtype=np.float64)
+        self.rotations = {}
+        self.translations = {}
+
+    def curves(self):
+        ''' The solution as :class:`bakecurves.BakedCurve` list, rotations
+        still in degrees '''
+        curves = []
+        for channels, values in (
+                (bc.TRANSLATE_CHANNELS, self.translations),
+                (bc.ROTATE_CHANNELS, self.rotations)):
+            for name in sorted(values):
+                for axis, channel in enumerate(channels):
+                    curves.append(bc.BakedCurve(
+                        name, channel, self.times, values[name][:, axis]))
+        return curves
+
+
+class Retargeter(object):
+    ''' Solves rig control channels from source joint world transforms
+
+    :param sourceStance: :class:`SkeletonStance` of the source
+    :param targetStance: :class:`SkeletonStance` of the rig skeleton, only
+        used for scaling translations by hip height
+    :param controls: list of :class:`ControlStance`
+    '''
+
+    def __init__(self, sourceStance, targetStance, controls, scale=None):
+        self.sourceStance = sourceStance
+        self.targetStance = targetStance
+        self.controls = dict((ctrl.name, ctrl) for ctrl in controls)
+        if scale is None:
+            sourceHeight = sourceStance.height()
+            targetHeight = targetStance.height() if targetStance else 0.0
+            scale = targetHeight / sourceHeight if (
+                    sourceHeight and targetHeight) else 1.0
+        self.scale = scale
+
+    def _order(self):
+        order, done = [], set()
+
+        def visit(name):
+            if name in done:
+                return
+            done.add(name)
+            parent = self.controls[name].parent
+            if parent in self.controls:
+                visit(parent)
+            order.append(name)
+
+        for name in sorted(self.controls):
+            visit(name)
+        return order
+
+    def solve(self, times, sourceRotations, sourcePositions):
+        ''' Solve all controls for a whole take
+
+        :param sourceRotations: {slot id: (frames, 4) world quaternions}
+        :param sourcePositions: {slot id: (frames, 3) world positions}
+        :rtype: :class:`Solution`
+        '''
+        solution = Solution(times)
+        frames = len(solution.times)
+        worlds = {}
+
+        for name in self._order():
+            ctrl = self.controls[name]
+            source = sourceRotations.get(ctrl.num)
+            if source is not None and ctrl.num in self.sourceStance.rotations:
+                delta = qmul(source, qinv(
+                    self.sourceStance.rotations[ctrl.num]))
+                world = qmul(delta, ctrl.worldRotation)
+            else:
+                world = np.broadcast_to(ctrl.worldRotation, (frames, 4))
+            worlds[name] = world
+
+            # the parent moves with the nearest solved ancestor control
+            parentRotation = np.broadcast_to(ctrl.parentRotation, (frames, 4))
+            parentWorld = np.broadcast_to(ctrl.parentWorldRotation,
+                                          (frames, 4))
+            ancestor = self.controls.get(ctrl.parent)
+            if ancestor is not None and ancestor.name in worlds:
+                follow = qmul(worlds[ancestor.name],
+                              qinv(ancestor.worldRotation))
+                parentRotation = qmul(follow, ctrl.parentRotation)
+                parentWorld = qmul(follow, ctrl.parentWorldRotation)
+
+            if ctrl.rotates and source is not None:
+                local = qmul(qinv(parentRotation), world)
+                solution.rotations[name] = qtoEuler(local, ctrl.rotateOrder)
+            if ctrl.translates and ctrl.num in sourcePositions and (
+                    ctrl.num in self.sourceStance.positions):
+                offset = (sourcePositions[ctrl.num] -
+                          self.sourceStance.positions[ctrl.num]) * self.scale
+                solution.translations[name] = ctrl.translate + qrotate(
+                        qinv(parentWorld), offset)
+
+        # filter all the rotations in one pass over the frames
+        names = sorted(solution.rotations)
+        if names:
+            controls = [self.controls[name] for name in names]
+            filtered = filterEuler(
+                    np.stack([solution.rotations[name] for name in names], 1),
+                    [ctrl.rotateOrder for ctrl in controls],
+                    np.stack([ctrl.rotate for ctrl in controls]))
+            for idx, name in enumerate(names):
+                solution.rotations[name] = filtered[:, idx]
+        return solution
+
+
+def sourceFromTake(take, mapping):
+    ''' World rotations and positions of the mapped joints of a take by slot
+    id, ready for :meth:`Retargeter.solve` '''
+    rotations, positions = forwardKinematics(take)
+    sourceRotations, sourcePositions = {}, {}
+    for joint, name in enumerate(take.shortNames):
+        num = mapping.get(name)
+        if num is None or num in sourceRotations:
+            continue
+        sourceRotations[num] = rotations[:, joint]
+        sourcePositions[num] = positions[:, joint]
+    return sourceRotations, sourcePositions
+
+
+def retargetTake(take, mapping, targetStance, controls, stanceFrame=None,
+                 scale=None, sourceStance=None):
+    ''' Solve controls for a :class:`mocapfile.MocapTake` in one go, from
+    sourceStance or else the stance of the take at stanceFrame '''
+    if sourceStance is None:
+        sourceStance = SkeletonStance.fromTake(take, mapping, stanceFrame)
+    rotations, positions = sourceFromTake(take, mapping)
+    retargeter = Retargeter(sourceStance, targetStance, controls, scale)
+    return retargeter.solve(take.frames, rotations, positions)
@@ -0,0 +1,961 @@
+'''
+Created on Oct 18, 2026
+
+An in-memory, pure python stand-in for the part of ``pymel.core`` that
+:mod:`moctor` uses, so that it can be run and timed without maya.
+
+The scene is a dict of nodes with plain attribute values, keys and
+connections. Every command counts itself in ``scene.calls``, the ``mel``
+procedures of HumanIK are recorders that do just enough bookkeeping (creating
+definitions and retargeters, connecting characterized joints) for the moctor
+lookups to find what they made. Nothing is evaluated.
+
+:func:`install` registers the module as ``pymel.core`` (and placeholders for
+the studio ui modules moctor imports if those are missing) before moctor is
+imported::
+
+    from mocapToRig.src import standin
+    standin.install()
+    from mocapToRig.src import moctor
+'''
+
+import re
+import sys
+import types
+from collections import Counter
+
+
+class MayaNodeError(RuntimeError):
+    pass
+
+
+class MayaAttributeError(AttributeError):
+    pass
+
+
+class MayaObjectError(MayaNodeError):
+    pass
+
+
+ATTR_ALIASES = {
+    'tx': 'translateX', 'ty': 'translateY', 'tz': 'translateZ',
+    'rx': 'rotateX', 'ry': 'rotateY', 'rz': 'rotateZ',
+    'sx': 'scaleX', 'sy': 'scaleY', 'sz': 'scaleZ',
+    't': 'translate', 'r': 'rotate', 's': 'scale', 'v': 'visibility'}
+
+COMPOUNDS = {
+    'translate': ('translateX', 'translateY', 'translateZ'),
+    'rotate': ('rotateX', 'rotateY', 'rotateZ'),
+    'scale': ('scaleX', 'scaleY', 'scaleZ')}
+
+TRANSFORM_DEFAULTS = {
+    'translateX': 0.0, 'translateY': 0.0, 'translateZ': 0.0,
+    'rotateX': 0.0, 'rotateY': 0.0, 'rotateZ': 0.0,
+    'scaleX': 1.0, 'scaleY': 1.0, 'scaleZ': 1.0,
+    'visibility': True, 'rotateOrder': 0}
+
+IDENTITY = [1.0, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0,
+            0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 0.0, 1.0]
+
+
+class NodeData(object):
+
+    def __init__(self, name, nodeType, parent=None):
+        self.name = name
+        self.type = nodeType
+        self.parent = parent
+        self.attrs = {}
+        self.locked = set()
+        if nodeType in ('transform', 'joint'):
+            self.attrs.update(TRANSFORM_DEFAULTS)
+        if nodeType == 'joint':
+            self.attrs['drawStyle'] = 0
+
+
+class Scene(object):
+    ''' Nodes, connections, selection and time of the stand-in '''
+
+    def __init__(self):
+        self.nodes = {}
+        self.sources = {}
+        self.destinations = {}
+        self.selection = []
+        self.time = 0.0
+        self.playback = [1.0, 120.0]
+        self.calls = Counter()
+        self.warnings = []
+        self.plugins = set()
+        self.callbacks = {}
+        # refresh suspended, undo on, open undo chunks, evaluation mode
+        self.ui = {'suspend': False, 'undo': True, 'chunks': [],
+                   'evaluation': 'parallel'}
+
+    def reset(self):
+        callbacks = self.callbacks
+        self.__init__()
+        self.callbacks = callbacks
+        self.notify('new', '')
+
+    def addCallback(self, func):
+        ''' func(event, name) is called on node creation and deletion,
+        connections and new scenes '''
+        key = max(self.callbacks or [0]) + 1
+        self.callbacks[key] = func
+        return key
+
+    def removeCallback(self, key):
+        self.callbacks.pop(key, None)
+
+    def notify(self, event, name):
+        for func in list(self.callbacks.values()):
+            func(event, name)
+
+    def createNode(self, nodeType, name, parent=None):
+        if name in self.nodes:
+            raise RuntimeError('Node %s exists' % name)
+        self.nodes[name] = NodeData(name, nodeType, parent)
+        self.notify('added', name)
+        return name
+
+    def node(self, name):
+        name = str(name).split('|')[-1].lstrip(':')
+        try:
+            return self.nodes[name]
+        except KeyError:
+            raise MayaNodeError(name)
+
+    def splitPlug(self, plug):
+        node, _, attr = str(plug).partition('.')
+        data = self.node(node)
+        return data, ATTR_ALIASES.get(attr, attr)
+
+    def connect(self, source, destination):
+        self.disconnect(destination)
+        self.sources[destination] = source
+        self.destinations.setdefault(source, set()).add(destination)
+        self.notify('connected', destination)
+
+    def disconnect(self, destination):
+        source = self.sources.pop(destination, None)
+        if source is not None:
+            self.destinations.get(source, set()).discard(destination)
+            self.notify('disconnected', destination)
+
+    def connected(self, node, source=True, destination=True, nodeType=None,
+                  attr=None, plugs=False, pairs=False):
+        ''' Nodes or plugs connected to node (or to its attr), with pairs
+        [(own plug, other)] '''
+        prefix = node + '.' + (attr + '' if attr else '')
+        found = []
+        if source:
+            for dst, src in self.sources.items():
+                if dst.startswith(prefix):
+                    found.append((dst, src))
+        if destination:
+            for src, dsts in self.destinations.items():
+                if src.startswith(prefix):
+                    found.extend((src, dst) for dst in dsts)
+        result = []
+        for own, plug in found:
+            other = plug.partition('.')[0]
+            if other not in self.nodes:
+                continue
+            if nodeType and not _isType(self.nodes[other].type, nodeType):
+                continue
+            item = plug if plugs else other
+            if pairs:
+                item = (own, item)
+            if item not in result:
+                result.append(item)
+        return result
+
+    def delete(self, name):
+        name = str(name)
+        for child in [n for n, d in self.nodes.items() if d.parent == name]:
+            self.delete(child)
+        if self.nodes.pop(name, None) is not None:
+            self.notify('removed', name)
+        for dst in [d for d in self.sources if d.partition('.')[0] == name]:
+            self.disconnect(dst)
+        for src in [s for s in self.destinations
+                    if s.partition('.')[0] == name]:
+            for dst in list(self.destinations[src]):
+                self.disconnect(dst)
+        if name in self.selection:
+            self.selection.remove(name)
+
+
+def _isType(nodeType, wanted):
+    if isinstance(wanted, (list, tuple, set)):
+        return any(_isType(nodeType, item) for item in wanted)
+    wanted = str(wanted)
+    if wanted == 'animCurve':
+        return nodeType.startswith('animCurve')
+    if wanted == 'transform':
+        return nodeType in ('transform', 'joint')
+    return nodeType == wanted
+
+
+scene = Scene()
+
+
+def _command(func):
+    name = func.__name__
+
+    def command(*args, **kwargs):
+        scene.calls[name] += 1
+        return func(*args, **kwargs)
+    command.__name__ = name
+    command.__doc__ = func.__doc__
+    return command
+
+
+###################
+#  Node wrappers  #
+###################
+
+
+class _NodeTypes(object):
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return name
+
+
+nt = _NodeTypes()
+
+
+class Attribute(object):
+
+    def __init__(self, node, attr):
+        self._node = node
+        self._attr = ATTR_ALIASES.get(attr, attr)
+
+    def name(self):
+        return '%s.%s' % (self._node, self._attr)
+
+    __str__ = name
+
+    def __repr__(self):
+        return 'Attribute(%r)' % self.name()
+
+    def get(self, **kwargs):
+        return getAttr(self.name(), **kwargs)
+
+    def set(self, *args, **kwargs):
+        return setAttr(self.name(), *args, **kwargs)
+
+    def node(self):
+        return _node(self._node)
+
+    def inputs(self, type=None, plugs=False):
+        return [_wrap(item) for item in scene.connected(
+            self._node, destination=False, nodeType=type, attr=self._attr,
+            plugs=plugs)]
+
+    def outputs(self, type=None, plugs=False):
+        return [_wrap(item) for item in scene.connected(
+            self._node, source=False, nodeType=type, attr=self._attr,
+            plugs=plugs)]
+
+
+class PyNode(object):
+
+    def __new__(cls, name):
+        scene.calls['PyNode'] += 1
+        if '.' in str(name):
+            node, _, attr = str(name).partition('.')
+            scene.node(node)
+            return Attribute(node, attr)
+        return cls._make(scene.node(name).name)
+
+    @classmethod
+    def _make(cls, name):
+        ''' Wrap an existing node without counting a command, the way
+        nodes returned by other commands come back from maya '''
+        self = object.__new__(cls)
+        self._name = name
+        return self
+
+    def __init__(self, name):
+        pass
+
+    def name(self):
+        return self._name
+
+    nodeName = name
+    __str__ = name
+
+    def __repr__(self):
+        return 'nt.%s(%r)' % (self.type().capitalize(), self._name)
+
+    def __eq__(self, other):
+        return str(self) == str(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self._name)
+
+    def type(self):
+        return scene.node(self._name).type
+
+    def namespace(self):
+        namespace = self._name.rpartition(':')[0]
+        return namespace + ':' if namespace else ''
+
+    def getParent(self):
+        parent = scene.node(self._name).parent
+        return _node(parent) if parent else None
+
+    def getAllParents(self):
+        parents = []
+        parent = scene.node(self._name).parent
+        while parent:
+            parents.append(_node(parent))
+            parent = scene.node(parent).parent
+        return parents
+
+    def attr(self, name):
+        return Attribute(self._name, name)
+
+    def referenceFile(self):
+        data = scene.node(self._name)
+        if data.type != 'reference':
+            return None
+        return FileReference(self._name)
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return Attribute(self._name, name)
+
+
+# nodes coming back from commands, not counted and safe from profiling
+# wrapping the PyNode command
+_node = PyNode._make
+
+
+class FileReference(object):
+    ''' The reference of a reference node, see :func:`createReference` '''
+
+    def __init__(self, refNode):
+        self.refNode = _node(refNode)
+
+    @property
+    def _data(self):
+        return scene.node(self.refNode.name())
+
+    @property
+    def path(self):
+        return self._data.attrs['path']
+
+    @property
+    def namespace(self):
+        return self._data.attrs['namespace']
+
+    @property
+    def fullNamespace(self):
+        parent = self._data.attrs.get('parentNamespace')
+        return '%s:%s' % (parent, self.namespace) if parent else self.namespace
+
+    def isLoaded(self):
+        return self._data.attrs['loaded']
+
+    def load(self):
+        scene.calls['FileReference.load'] += 1
+        self._data.attrs['loaded'] = True
+        scene.notify('loaded', self.refNode.name())
+
+    def unload(self):
+        scene.calls['FileReference.unload'] += 1
+        self._data.attrs['loaded'] = False
+        scene.notify('unloaded', self.refNode.name())
+
+    def importContents(self):
+        scene.calls['FileReference.importContents'] += 1
+        scene.delete(self.refNode.name())
+
+    def __repr__(self):
+        return 'FileReference(%r, refnode=%r)' % (self.path, str(self.refNode))
+
+
+def _wrap(item):
+    if '.' in item:
+        node, _, attr = item.partition('.')
+        return Attribute(node, attr)
+    return _node(item)
+
+
+##############
+#  Commands  #
+##############
+
+
+@_command
+def objExists(name):
+    try:
+        data, attr = (scene.splitPlug(name) if '.' in str(name)
+                      else (scene.node(name), None))
+    except MayaNodeError:
+        return False
+    return attr is None or attr in data.attrs or attr in COMPOUNDS
+
+
+@_command
+def createNode(nodeType, name=None, parent=None, **kwargs):
+    name = name or '%s1' % nodeType
+    return _node(
+            scene.createNode(nodeType, name, parent and str(parent)))
+
+
+@_command
+def setAttr(plug, *values, **kwargs):
+    return _setAttr(plug, *values, **kwargs)
+
+
+def _setAttr(plug, *values, **kwargs):
+    data, attr = scene.splitPlug(plug)
+    if 'l' in kwargs or 'lock' in kwargs:
+        locked = kwargs.get('l', kwargs.get('lock'))
+        for name in COMPOUNDS.get(attr, (attr,)):
+            (data.locked.add if locked else data.locked.discard)(name)
+        if not values:
+            return
+    if attr in data.locked:
+        raise RuntimeError('The attribute %s.%s is locked' % (data.name, attr))
+    if attr in COMPOUNDS:
+        if len(values) == 1:
+            values = values[0]
+        for name, value in zip(COMPOUNDS[attr], values):
+            data.attrs[name] = value
+    else:
+        data.attrs[attr] = values[0] if values else None
+
+
+@_command
+def getAttr(plug, **kwargs):
+    data, attr = scene.splitPlug(plug)
+    if kwargs.get('l') or kwargs.get('lock'):
+        return attr in data.locked
+    time = kwargs.get('time', kwargs.get('t'))
+    if attr in COMPOUNDS:
+        return [_value(data, name, time) for name in COMPOUNDS[attr]]
+    if attr in ('worldMatrix', 'parentMatrix', 'matrix'):
+        return list(IDENTITY)
+    if attr not in data.attrs:
+        raise MayaAttributeError('%s.%s' % (data.name, attr))
+    return _value(data, attr, time)
+
+
+def _value(data, attr, time=None):
+    source = scene.sources.get('%s.%s' % (data.name, attr))
+    if source:
+        curve = scene.nodes.get(source.partition('.')[0])
+        if curve is not None and curve.type.startswith('animCurve'):
+            return _evaluate(curve, scene.time if time is None else time)
+    return data.attrs.get(attr)
+
+
+def _evaluate(curve, time):
+    keys = curve.attrs.get('keys') or {}
+    if not keys:
+        return 0.0
+    times = sorted(keys)
+    if time <= times[0]:
+        return keys[times[0]]
+    for before, after in zip(times, times[1:]):
+        if before <= time <= after:
+            weight = (time - before) / float(after - before)
+            return keys[before] + (keys[after] - keys[before]) * weight
+    return keys[times[-1]]
+
+
+@_command
+def addAttr(node, longName=None, ln=None, defaultValue=0, **kwargs):
+    scene.node(node).attrs[longName or ln] = kwargs.get('dv', defaultValue)
+
+
+@_command
+def connectAttr(source, destination, f=False, force=False):
+    scene.connect(str(source), str(destination))
+
+
+@_command
+def disconnectAttr(source, destination):
+    scene.disconnect(str(destination))
+
+
+@_command
+def listConnections(node, s=True, d=True, source=None, destination=None,
+                    type=None, p=False, plugs=None, c=False, scn=False,
+                    **kwargs):
+    source = s if source is None else source
+    destination = d if destination is None else destination
+    plugs = p if plugs is None else plugs
+    result = []
+    for node in (node if isinstance(node, (list, tuple)) else [node]):
+        node = str(node)
+        attr = None
+        if '.' in node:
+            node, _, attr = node.partition('.')
+            attr = ATTR_ALIASES.get(attr, attr)
+        scene.node(node)
+        if c:
+            result.extend((_wrap(own), _wrap(other))
+                          for own, other in scene.connected(
+                              node, source, destination, type, attr, plugs,
+                              pairs=True))
+        else:
+            result.extend(_wrap(item) for item in scene.connected(
+                node, source, destination, type, attr, plugs))
+    return result
+
+
+@_command
+def ls(*names, **kwargs):
+    nodeType = kwargs.get('type', kwargs.get('typ'))
+    if kwargs.get('sl') or kwargs.get('selection'):
+        result = list(scene.selection)
+    elif names:
+        result = []
+        patterns = []
+        for name in names:
+            patterns.extend(name if isinstance(name, (list, tuple))
+                            else [name])
+        for pattern in patterns:
+            pattern = str(pattern)
+            if '*' not in pattern:
+                if pattern in scene.nodes:
+                    result.append(pattern)
+                continue
+            regex = re.compile(
+                    '^' + re.escape(str(pattern)).replace('\\*', '.*') + '$')
+            result.extend(name for name in scene.nodes if regex.match(name))
+    else:
+        result = list(scene.nodes)
+    if nodeType:
+        result = [name for name in result
+                  if _isType(scene.nodes[name].type, nodeType)]
+    return [_node(name) for name in result]
+
+
+@_command
+def select(*names, **kwargs):
+    if kwargs.get('cl') or kwargs.get('clear'):
+        scene.selection = []
+        return
+    flat = []
+    for name in names:
+        if isinstance(name, (list, tuple)):
+            flat.extend(str(item) for item in name)
+        elif name is not None:
+            flat.append(str(name))
+    for name in flat:
+        scene.node(name)
+    if kwargs.get('add'):
+        scene.selection.extend(n for n in flat if n not in scene.selection)
+    else:
+        scene.selection = flat
+
+
+@_command
+def selected(**kwargs):
+    return [_node(name) for name in scene.selection
+            if name in scene.nodes]
+
+
+@_command
+def delete(*names, **kwargs):
+    for name in names:
+        for item in (name if isinstance(name, (list, tuple)) else [name]):
+            scene.delete(str(item))
+
+
+@_command
+def currentTime(*args, **kwargs):
+    if args:
+        scene.time = float(args[0])
+    return scene.time
+
+
+@_command
+def playbackOptions(q=False, minTime=None, maxTime=None, **kwargs):
+    if q:
+        return scene.playback[0] if minTime else scene.playback[1]
+    if minTime is not None:
+        scene.playback[0] = minTime
+    if maxTime is not None:
+        scene.playback[1] = maxTime
+
+
+@_command
+def setKeyframe(plug, t=None, time=None, v=None, value=None, **kwargs):
+    plugs = plug if isinstance(plug, (list, tuple)) else [plug]
+    for plug in plugs:
+        _setKey(plug, t, time, v, value)
+    return len(plugs)
+
+
+def _setKey(plug, t, time, v, value):
+    data, attr = scene.splitPlug(plug)
+    at = time if time is not None else (t if t is not None else scene.time)
+    destination = '%s.%s' % (data.name, attr)
+    curveName = scene.sources.get(destination, '').partition('.')[0]
+    if curveName not in scene.nodes:
+        curveName = scene.createNode(
+                'animCurveTA' if attr.startswith('rotate') else 'animCurveTL',
+                '%s_%s' % (data.name.replace(':', '_'), attr))
+        scene.nodes[curveName].attrs['keys'] = {}
+        scene.connect(curveName + '.output', destination)
+    value = value if value is not None else v
+    if value is None:
+        value = data.attrs.get(attr, 0.0)
+    scene.nodes[curveName].attrs['keys'][float(at)] = value
+
+
+@_command
+def listAttr(node, l=False, locked=False, **kwargs):
+    data = scene.node(node)
+    if l or locked:
+        return sorted(data.locked)
+    return sorted(data.attrs)
+
+
+@_command
+def keyframe(curve, q=False, query=False, timeChange=False, tc=False,
+             valueChange=False, vc=False, **kwargs):
+    data = scene.node(curve)
+    if not data.type.startswith('animCurve'):
+        sources = scene.connected(data.name, destination=False,
+                                  nodeType='animCurve')
+        if not sources:
+            return []
+        data = scene.node(sources[0])
+    keys = sorted(data.attrs.get('keys', {}).items())
+    times = timeChange or tc
+    values = valueChange or vc
+    if times and values:
+        return [item for key in keys for item in key]
+    if values:
+        return [value for _, value in keys]
+    return [time for time, _ in keys]
+
+
+@_command
+def cutKey(curve, clear=False, time=None, index=None, **kwargs):
+    data = scene.node(curve)
+    keys = data.attrs.get('keys', {})
+    if index is not None:
+        ordered = sorted(keys)
+        for start, end in index:
+            for idx in range(start, end + 1):
+                keys.pop(ordered[idx], None)
+    elif time is not None:
+        for key in [k for k in keys if time[0] <= k <= time[1]]:
+            keys.pop(key)
+    else:
+        keys.clear()
+
+
+@_command
+def xform(node, q=False, ws=False, m=False, t=False, ro=False, **kwargs):
+    data = scene.node(node)
+    if q and m:
+        return list(data.attrs.get('worldMatrix', IDENTITY))
+    if q and t:
+        return [data.attrs['translateX'], data.attrs['translateY'],
+                data.attrs['translateZ']]
+    if q and ro:
+        return [data.attrs['rotateX'], data.attrs['rotateY'],
+                data.attrs['rotateZ']]
+    if not q and t is not False and t is not True:
+        setAttr(node + '.translate', t)
+
+
+@_command
+def rotate(node, values, **kwargs):
+    setAttr(str(node) + '.rotate', values)
+
+
+@_command
+def createReference(path, namespace=None, parentNamespace=None,
+                    loaded=True, **kwargs):
+    ''' A reference node for path, nothing is read '''
+    namespace = namespace or re.sub(
+            r'\W', '_', path.replace('\\', '/').split('/')[-1].split('.')[0])
+    name = (parentNamespace + ':' if parentNamespace else '') + namespace
+    refNode = scene.createNode('reference', name + 'RN')
+    scene.nodes[refNode].attrs.update({
+        'path': path, 'namespace': namespace,
+        'parentNamespace': parentNamespace, 'loaded': loaded})
+    return FileReference(refNode)
+
+
+@_command
+def importFile(path, **kwargs):
+    return [path]
+
+
+@_command
+def loadPlugin(name, **kwargs):
+    scene.plugins.add(name)
+    return [name]
+
+
+@_command
+def pluginInfo(name, q=False, loaded=False, **kwargs):
+    return name in scene.plugins
+
+
+@_command
+def refresh(suspend=None, **kwargs):
+    if suspend is not None:
+        scene.ui['suspend'] = bool(suspend)
+
+
+@_command
+def undoInfo(q=False, state=None, stateWithoutFlush=None, openChunk=False,
+             closeChunk=False, chunkName='', **kwargs):
+    if q:
+        return scene.ui['undo']
+    for value in (state, stateWithoutFlush):
+        if value is not None:
+            scene.ui['undo'] = bool(value)
+    if openChunk:
+        scene.ui['chunks'].append(chunkName)
+    if closeChunk:
+        scene.ui['chunks'].pop()
+
+
+@_command
+def evaluationManager(q=False, mode=None, **kwargs):
+    if q:
+        return [scene.ui['evaluation']]
+    scene.ui['evaluation'] = mode
+
+
+@_command
+def about(v=False, **kwargs):
+    return 2018 if v else ''
+
+
+def warning(*args):
+    scene.warnings.append(' '.join(str(arg) for arg in args))
+
+
+def error(*args):
+    raise RuntimeError(' '.join(str(arg) for arg in args))
+
+
+#########
+#  MEL  #
+#########
+
+
+def _hikCreateCharacter(name):
+    scene.createNode('HIKCharacterNode', name)
+    scene.nodes[name].attrs['InputCharacterizationLock'] = False
+    return name
+
+
+def _setCharacterObject(node, defname, num, flag):
+    data = scene.node(node)
+    data.attrs.setdefault('Character', None)
+    scene.node(defname).attrs.setdefault('slot%d' % num, None)
+    scene.connect('%s.Character' % data.name, '%s.slot%d' % (defname, num))
+
+
+def _retargeterName(defname):
+    return '%s_Retargeter' % defname
+
+
+def _retargeterCreate(defname):
+    ''' The custom rig retargeter and its default mapping node, whose
+    destinationSkeleton is the hips of the definition '''
+    name = _retargeterName(defname)
+    if name not in scene.nodes:
+        scene.createNode('CustomRigRetargeterNode', name)
+        mapping = scene.createNode('CustomRigDefaultMappingNode',
+                                   '%s_DefaultMapping' % defname)
+        scene.nodes[name].attrs['defaultMapping'] = mapping
+        hips = scene.sources.get('%s.slot1' % defname)
+        if hips:
+            scene.connect(hips.partition('.')[0] + '.message',
+                          mapping + '.destinationSkeleton')
+    return name
+
+
+def _retargeterAddMapping(retargeter, body, kind, node, num):
+    scene.node(node)
+    data = scene.node(retargeter)
+    data.attrs.setdefault('mappings', []).append((body, kind, node, num))
+    mapping = data.attrs.get('defaultMapping')
+    if mapping in scene.nodes:
+        scene.connect('%s.message' % node,
+                      '%s.%s%s' % (mapping, body, kind))
+
+
+def _retargeterDelete(retargeter):
+    mapping = scene.node(retargeter).attrs.get('defaultMapping')
+    if mapping:
+        scene.delete(mapping)
+    scene.delete(retargeter)
+
+
+def _characterInput(defname, source=None):
+    ''' Sets the input of a definition through an HIKRetargeterNode, or
+    returns it '''
+    data = scene.node(defname)
+    if source is not None:
+        data.attrs['input'] = source
+        retargeter = '%s_HIKRetargeter' % defname
+        if retargeter not in scene.nodes:
+            scene.createNode('HIKRetargeterNode', retargeter)
+        scene.connect(defname + '.message',
+                      retargeter + '.InputCharacterDefinitionDst')
+        scene.connect(source + '.message',
+                      retargeter + '.InputCharacterDefinitionSrc')
+    return data.attrs.get('input', '')
+
+
+def _getAttrs(plugs):
+    return [_value(*scene.splitPlug(plug)) for plug in plugs]
+
+
+def _lockedAttrs(nodes):
+    return ['%s.%s' % (node, attr) for node in nodes
+            for attr in sorted(scene.node(node).locked)]
+
+
+MEL_PROCS = {
+    'hikCreateCharacter': _hikCreateCharacter,
+    'setCharacterObject': _setCharacterObject,
+    'RetargeterGetName': _retargeterName,
+    'RetargeterExists': lambda name: name in scene.nodes,
+    'RetargeterCreate': _retargeterCreate,
+    'RetargeterAddMapping': _retargeterAddMapping,
+    'RetargeterDelete': _retargeterDelete,
+    'hikCustomRigElementNameFromId': lambda defname, num: 'Element%d' % num,
+    'hikSetCharacterInput': _characterInput,
+    'hikGetCharacterInputString': _characterInput,
+    'currentTimeUnitToFPS': lambda: 24.0,
+    'moctorGetAttrs': _getAttrs,
+    'moctorLockedAttrs': _lockedAttrs,
+}
+
+
+_SET_ATTR = re.compile(r'^\s*setAttr\s+"([^"]+)"\s+([^;]*);', re.M)
+
+
+def _melNumber(value):
+    number = float(value)
+    return int(number) if number.is_integer() and '.' not in value else number
+
+
+_PROC_CALL = re.compile(r'^\s*(\w+)\((.*)\);\s*$', re.M)
+_TOKEN = re.compile(r'\s*(?:"([^"]*)"|(\w+)\(|([-+.\w]+)|(\))|(,))')
+
+
+def _melCall(text, pos=0):
+    ''' Evaluates the arguments of a proc(...) call in text from pos, calls
+    in arguments are carried out first
+
+    :return: (values, position after the closing parenthesis)
+    '''
+    args = []
+    while pos < len(text):
+        match = _TOKEN.match(text, pos)
+        if match is None:
+            raise ValueError('Cannot parse mel %r' % text[pos:])
+        pos = match.end()
+        string, proc, number, close, _ = match.groups()
+        if string is not None:
+            args.append(string)
+        elif proc is not None:
+            values, pos = _melCall(text, pos)
+            args.append(MEL_PROCS[proc](*values))
+        elif number is not None:
+            args.append(_melNumber(number))
+        elif close is not None:
+            return args, pos
+    return args, pos
+
+
+class Mel(object):
+    ''' Records every procedure called through pc.mel '''
+
+    def __init__(self):
+        self.history = []
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        proc = MEL_PROCS.get(name)
+
+        def call(*args):
+            scene.calls['mel.' + name] += 1
+            self.history.append((name, args))
+            if proc is not None:
+                return proc(*args)
+        call.__name__ = name
+        return call
+
+    def eval(self, command):
+        ''' Records the script, its setAttr statements and its calls of the
+        procs in MEL_PROCS, with function syntax, are carried out '''
+        scene.calls['mel.eval'] += 1
+        self.history.append(('eval', (command,)))
+        if command.lstrip().startswith('global proc'):
+            # a definition, its body runs when the proc is called
+            return
+        for line in command.splitlines():
+            for plug, values in _SET_ATTR.findall(line):
+                values = [_melNumber(value) for value in values.split()]
+                _setAttr(plug, *values)
+            for name, args in _PROC_CALL.findall(line):
+                if name in MEL_PROCS:
+                    MEL_PROCS[name](*_melCall(args + ')')[0])
+
+    def source(self, path):
+        scene.calls['mel.source'] += 1
+
+
+mel = Mel()
+
+
+def addCallback(func):
+    return scene.addCallback(func)
+
+
+def removeCallback(key):
+    scene.removeCallback(key)
+
+
+#############
+#  Install  #
+#############
+
+
+def install(placeholders=('cui', 'qtify_maya_window', 'imaya')):
+    ''' Register this module as pymel.core, placeholder modules are added
+    for the named imports that cannot be found '''
+    module = sys.modules[__name__]
+    installed = sys.modules.get('pymel.core')
+    if installed is not None and installed is not module:
+        raise RuntimeError('pymel.core is already imported from %s' % (
+            getattr(installed, '__file__', installed)))
+    pymel = sys.modules.get('pymel') or types.ModuleType('pymel')
+    pymel.core = module
+    sys.modules['pymel'] = pymel
+    sys.modules['pymel.core'] = module
+    for name in placeholders:
+        if name in sys.modules:
+            continue
+        try:
+            __import__(name)
+        except ImportError:
+            sys.modules[name] = types.ModuleType(name)
+    return scene
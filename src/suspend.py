@@ -0,0 +1,203 @@
+'''
+Created on Oct 18, 2026
+
+Running the pipeline with maya's overheads suspended.
+
+While HIK is set up and the rig baked maya would redraw the viewport, record
+undo for thousands of small edits and each helper would save and restore the
+selection. :func:`suspended` turns that off once around the whole run and
+puts everything back however the run ends::
+
+    with suspended('apply', undo='off', evaluation=BAKE_EVALUATION):
+        ...
+
+Contexts nest, an inner one only changes what the outer one left alone, but
+for undo turned off inside an undo chunk.
+
+The bake creates and keys animCurves through the API, which records no undo.
+An undo chunk around it would only take back the commands, leaving the
+curves behind, so the bake runs with undo off, see :func:`undoOff`, and
+cannot be undone.
+Helpers that change the selection use :func:`keepSelection`, which does
+nothing inside a context that already keeps it.
+
+:func:`compare` times the :mod:`profiling` stages of a run with and without
+the suspension.
+'''
+
+import functools
+
+import pymel.core as pc
+
+from . import profiling
+
+
+# DG evaluation: the bake samples by context evaluation and the
+# characterization keeps invalidating the parallel evaluation graph
+BAKE_EVALUATION = 'off'
+
+# suspended() does nothing while False, compare() runs with it both ways
+enabled = True
+
+_active = []
+
+
+def active():
+    ''' The innermost :class:`Suspension` running or None '''
+    return _active[-1] if _active else None
+
+
+class Suspension(object):
+    ''' What :func:`suspended` returns, restores what it changed on exit
+
+    :param undo: 'chunk' to undo the run as one step, 'off' to record no
+        undo at all, None to leave undo alone
+    :param evaluation: evaluation manager mode for the run ('off',
+        'serial', 'parallel') or None to leave it alone
+    '''
+
+    def __init__(self, name='moctor', refresh=True, undo='chunk',
+                 selection=True, evaluation=None):
+        if undo not in (None, 'chunk', 'off'):
+            raise ValueError('Unknown undo option %r' % undo)
+        self.name = name
+        self.refresh = refresh
+        self.undo = undo
+        self.selection = selection
+        self.evaluation = evaluation
+        self._restore = []
+
+    def _covered(self, option):
+        return any(getattr(outer, option) for outer in _active)
+
+    def __enter__(self):
+        if not enabled:
+            return self
+        try:
+            if self.selection and not self._covered('selection'):
+                selection = pc.selected()
+                self._restore.append(lambda: pc.select(selection))
+            if self.refresh and not self._covered('refresh'):
+                pc.refresh(suspend=True)
+                self._restore.append(lambda: pc.refresh(suspend=False))
+            if self.undo == 'off' and not any(
+                    outer.undo == 'off' for outer in _active):
+                state = pc.undoInfo(q=True, state=True)
+                pc.undoInfo(stateWithoutFlush=False)
+                self._restore.append(
+                        lambda: pc.undoInfo(stateWithoutFlush=state))
+            elif self.undo == 'chunk' and not self._covered('undo'):
+                pc.undoInfo(openChunk=True, chunkName=self.name)
+                self._restore.append(lambda: pc.undoInfo(closeChunk=True))
+            if self.evaluation and not self._covered('evaluation'):
+                mode = pc.evaluationManager(q=True, mode=True)
+                mode = mode[0] if isinstance(mode, (list, tuple)) else mode
+                if mode != self.evaluation:
+                    pc.evaluationManager(mode=self.evaluation)
+                    self._restore.append(
+                            lambda: pc.evaluationManager(mode=mode))
+        except BaseException:
+            self._exit()
+            raise
+        _active.append(self)
+        return self
+
+    def _exit(self):
+        errors = []
+        while self._restore:
+            try:
+                self._restore.pop()()
+            except Exception as error:
+                errors.append(error)
+        if errors:
+            pc.warning('Could not restore the scene state after %s: %s' % (
+                self.name, '; '.join(str(error) for error in errors)))
+
+    def __exit__(self, *args):
+        if self in _active:
+            _active.remove(self)
+        self._exit()
+        return False
+
+
+def suspended(name='moctor', refresh=True, undo='chunk', selection=True,
+              evaluation=None):
+    ''' Context suspending the viewport refresh, undo and selection changes,
+    see :class:`Suspension` '''
+    return Suspension(name, refresh, undo, selection, evaluation)
+
+
+def undoOff(func):
+    ''' Run func with undo off, for functions editing the scene through the
+    API which undo would only partly take back '''
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with Suspension(func.__name__, refresh=False, undo='off',
+                        selection=False):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+class keepSelection(object):
+    ''' Restores the selection on exit, unless a :func:`suspended` context
+    does already '''
+
+    def __enter__(self):
+        outer = active()
+        self.selection = None
+        if not (outer is not None and outer.selection):
+            self.selection = pc.selected()
+        return self
+
+    def __exit__(self, *args):
+        if self.selection is not None:
+            pc.select(self.selection)
+        return False
+
+
+def compare(run, setup=None, **options):
+    ''' Time the profiling stages of run() with and without suspending
+
+    :param setup: called before each run to put the scene back, reopening
+        the file say
+    :param options: of :func:`suspended`
+    :return: {stage: {'plain': s, 'suspended': s, 'speedup': plain /
+        suspended}}, 'total' being the whole run
+    '''
+    global enabled
+
+    wasProfiling = profiling.profiler.enabled
+    wasEnabled = enabled
+    timings = {}
+    try:
+        profiling.enable()
+        for label, enable in (('plain', False), ('suspended', True)):
+            if setup is not None:
+                setup()
+            enabled = enable
+            profiling.reset()
+            with profiling.stage('total'):
+                with suspended('compare', **options):
+                    run()
+            for name, entry in profiling.summary().items():
+                timings.setdefault(name, {})[label] = entry['wall']
+    finally:
+        enabled = wasEnabled
+        if not wasProfiling:
+            profiling.disable()
+
+    for entry in timings.values():
+        plain, fast = entry.get('plain'), entry.get('suspended')
+        entry['speedup'] = plain / fast if plain and fast else None
+    return timings
+
+
+def report(timings):
+    lines = ['%-28s %10s %10s %8s' % ('stage', 'plain', 'suspended',
+                                      'speedup')]
+    for name, entry in sorted(timings.items()):
+        speedup = entry.get('speedup')
+        lines.append('%-28s %10.3f %10.3f %8s' % (
+            name, entry.get('plain', 0.0), entry.get('suspended', 0.0),
+            '%.2fx' % speedup if speedup else '-'))
+    return '\n'.join(lines)
@@ -0,0 +1,7 @@
+import os.path as osp
+import sys
+
+# the modules are imported as src.*, from the root of the repository
+ROOT = osp.dirname(osp.dirname(osp.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
@@ -0,0 +1,136 @@
+import math
+
+import numpy as np
+import pytest
+
+from src import bakecurves as bc
+
+
+PLUGS = [('ctrl', 'translateX'), ('ctrl', 'rotateY')]
+
+
+def test_frame_times_includes_both_ends():
+    assert bc.frameTimes(1, 5).tolist() == [1, 2, 3, 4, 5]
+    assert bc.frameTimes(0, 1, 0.25).tolist() == [0, 0.25, 0.5, 0.75, 1]
+    # an end off the step is still sampled
+    assert bc.frameTimes(0, 5, 2).tolist() == [0, 2, 4, 5]
+    assert bc.frameTimes(3, 3).tolist() == [3]
+
+
+def test_frame_times_rejects_bad_step():
+    with pytest.raises(ValueError):
+        bc.frameTimes(0, 10, 0)
+
+
+def test_frame_times_rejects_reversed_range():
+    with pytest.raises(ValueError):
+        bc.frameTimes(10, 2)
+
+
+def test_unroll_euler_removes_whole_turns():
+    angles = np.radians([170.0, 179.0, -179.0, -170.0, 175.0])
+    unrolled = bc.unrollEuler(angles)
+    assert np.allclose(np.degrees(unrolled), [170, 179, 181, 190, 175])
+    assert np.abs(np.diff(unrolled)).max() < math.pi
+
+
+def test_unroll_euler_reference_and_axis():
+    values = np.array([[350.0, 10.0], [355.0, 15.0]])
+    unrolled = bc.unrollEuler(values, bc.DEGREES_PERIOD,
+                              reference=[-5.0, 370.0])
+    assert np.allclose(unrolled, [[-10, 370], [-5, 375]])
+    assert np.allclose(
+        bc.unrollEuler(values.T, bc.DEGREES_PERIOD, axis=1,
+                       reference=[-5.0, 370.0]), unrolled.T)
+
+
+def test_build_curves():
+    times = bc.frameTimes(1, 4)
+    samples = np.array([[0.0, 3.0], [1.0, -3.1], [2.0, 3.0], [3.0, -3.1]])
+    curves = bc.buildCurves(times, samples, PLUGS)
+    assert [curve.plug for curve in curves] == [
+        'ctrl.translateX', 'ctrl.rotateY']
+    assert np.allclose(curves[0].values, samples[:, 0])
+    assert np.abs(np.diff(curves[1].values)).max() < math.pi
+    raw = bc.buildCurves(times, samples, PLUGS, minimizeRotation=False)
+    assert np.allclose(raw[1].values, samples[:, 1])
+
+
+def test_build_curves_reference_and_shape():
+    times = bc.frameTimes(1, 2)
+    samples = np.array([[0.0, 0.1], [0.0, 0.2]])
+    curves = bc.buildCurves(times, samples, PLUGS,
+                            references={'ctrl.rotateY': 2 * math.pi})
+    assert np.allclose(curves[1].values, [0.1 + 2 * math.pi,
+                                          0.2 + 2 * math.pi])
+    with pytest.raises(ValueError):
+        bc.buildCurves(times, samples[:1], PLUGS)
+
+
+def test_overlap_weights_sum_to_one():
+    segments = bc.splitTimes(100, 4, overlap=10)
+    covered = np.zeros(100)
+    for (start, stop), weight in zip(segments,
+                                     bc._overlapWeights(segments, 100)):
+        assert len(weight) == stop - start
+        covered[start:stop] += weight
+    assert np.allclose(covered, 1.0)
+
+
+def test_split_times_caps_overlap():
+    segments = bc.splitTimes(10, 5, overlap=50)
+    assert segments[0][0] == 0 and segments[-1][1] == 10
+    # only neighbours overlap
+    for (_, stop), (start, _) in zip(segments[:-2], segments[2:]):
+        assert stop <= start
+
+
+def test_merge_segments_aligns_turns_and_cross_fades():
+    times = np.arange(60, dtype=np.float64)
+    truth = np.stack([times * 0.5, np.sin(times / 10.0)], axis=1)
+    segments = bc.splitTimes(60, 3, overlap=8)
+    blocks = []
+    for idx, (start, stop) in enumerate(segments):
+        block = truth[start:stop].copy()
+        # a worker ending up whole turns away
+        block[:, 1] += idx * 2 * math.pi
+        blocks.append(block)
+    merged, discrepancy = bc.mergeSegments(segments, blocks, PLUGS)
+    assert np.allclose(merged, truth)
+    assert discrepancy < 1e-9
+
+
+def test_merge_segments_reports_discrepancy():
+    segments = [(0, 6), (4, 10)]
+    blocks = [np.zeros((6, 2)), np.zeros((6, 2))]
+    blocks[1][:2, 0] = 0.5
+    merged, discrepancy = bc.mergeSegments(segments, blocks, PLUGS)
+    assert discrepancy == pytest.approx(0.5)
+    assert merged.shape == (10, 2)
+    with pytest.raises(ValueError):
+        bc.mergeSegments(segments, [np.zeros((6, 2)), np.zeros((5, 2))],
+                         PLUGS)
+
+
+def test_reduce_keys_within_tolerance():
+    times = bc.frameTimes(0, 100)
+    values = np.stack([np.sin(times / 10.0), times * 2.0])
+    kept, slopes, error = bc.reduceKeys(times, values, 0.01)
+    assert kept[:, 0].all() and kept[:, -1].all()
+    assert (error <= 0.01).all()
+    # a line needs its ends only
+    assert kept[1].sum() == 2
+    assert kept[0].sum() < len(times)
+    rebuilt = bc.hermite(times, values, slopes, kept)
+    assert np.abs(rebuilt - values).max() <= 0.01
+
+
+def test_reduce_keys_without_frames():
+    kept, slopes, errors = bc.reduceKeys(np.zeros(0), np.zeros((2, 0)), 0.1)
+    assert kept.shape == slopes.shape == (2, 0)
+    assert list(errors) == [0.0, 0.0]
+
+
+def test_reduce_keys_single_frame():
+    kept, _, errors = bc.reduceKeys([3.0], [[1.0], [2.0]], 0.1)
+    assert kept.all() and not errors.any()
@@ -0,0 +1,153 @@
+import json
+import os
+import os.path as osp
+import stat
+import subprocess
+import sys
+import time
+
+import pytest
+
+from src import batch
+from src.batch import (CallableLauncher, Job, JobStatus, MayapyLauncher,
+                       Scheduler)
+
+from conftest import ROOT
+
+
+# stands in for mayapy: imports the module it is asked to run like mayapy
+# would and writes the result the worker would
+FAKE_MAYAPY = '''#!%(python)s
+import importlib
+import json
+import sys
+
+args = sys.argv[1:]
+assert args[0] == '-m' and args[2] == '--worker', args
+module = importlib.import_module(args[1])
+assert hasattr(module, 'workerMain'), args[1]
+with open(args[3]) as _file:
+    job = json.load(_file)
+with open(args[4], 'w') as _file:
+    json.dump({'status': 'done', 'stages': {'module': args[1],
+                                            'name': job['name']}}, _file)
+'''
+
+
+def makeJobs(count, tmpdir):
+    return [Job('take%d.fbx' % idx, 'rig.ma', 'iPi', 'AdvancedSkeleton',
+                osp.join(str(tmpdir), 'out%d.mb' % idx))
+            for idx in range(count)]
+
+
+@pytest.fixture
+def fakeMayapy(tmpdir):
+    path = osp.join(str(tmpdir), 'mayapy')
+    with open(path, 'w') as _file:
+        _file.write(FAKE_MAYAPY % {'python': sys.executable})
+    os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC)
+    return path
+
+
+def test_scheduler_keeps_manifest_order(tmpdir):
+    def work(job):
+        time.sleep(0.01 * (int(job.name[-1]) % 3))
+        return {'name': job.name}
+    jobs = makeJobs(6, tmpdir)
+    results = Scheduler(CallableLauncher(work), workers=3).run(jobs)
+    assert [result.job.name for result in results] == [
+        job.name for job in jobs]
+    assert all(result.ok for result in results)
+
+
+def test_scheduler_failing_worker(tmpdir):
+    seen = []
+
+    def work(job):
+        if job.name == 'out1':
+            raise RuntimeError('no mocap root')
+        return {}
+    results = Scheduler(CallableLauncher(work), 2, seen.append).run(
+        makeJobs(3, tmpdir))
+    assert [result.status for result in results] == [
+        JobStatus.done, JobStatus.failed, JobStatus.done]
+    assert 'no mocap root' in results[1].error
+    assert len(seen) == 3
+    assert batch.summarize(results)['failed'] == 1
+
+
+def test_scheduler_launcher_raising(tmpdir):
+    def launcher(job):
+        raise OSError('cannot launch')
+    results = Scheduler(launcher).run(makeJobs(2, tmpdir))
+    assert all(result.status == JobStatus.failed for result in results)
+    assert 'cannot launch' in results[0].error
+
+
+def test_mayapy_launcher_timeout(tmpdir):
+    path = osp.join(str(tmpdir), 'slowpy')
+    with open(path, 'w') as _file:
+        _file.write('#!/bin/sh\nsleep 30\n')
+    os.chmod(path, 0o755)
+    start = time.time()
+    results = Scheduler(MayapyLauncher(path, timeout=0.5)).run(
+        makeJobs(1, tmpdir))
+    assert time.time() - start < 10
+    assert results[0].status == JobStatus.failed
+    assert 'timeout' in results[0].error
+
+
+def test_mayapy_launcher_missing_mayapy(tmpdir):
+    results = Scheduler(MayapyLauncher(
+        osp.join(str(tmpdir), 'nothing'))).run(makeJobs(1, tmpdir))
+    assert results[0].status == JobStatus.failed
+    assert 'Could not start' in results[0].error
+
+
+def test_mayapy_launcher_runs_worker_module(tmpdir, fakeMayapy):
+    results = Scheduler(MayapyLauncher(fakeMayapy), 2).run(
+        makeJobs(2, tmpdir))
+    assert all(result.ok for result in results), results[0].log
+    assert results[0].stages['module'] == 'src.batch'
+    assert batch.getPackageRoot() == ROOT
+
+
+def test_module_name_when_run_as_main():
+    class Spec(object):
+        name = 'mocapToRig.src.batch'
+    assert batch.moduleName('src.batch') == 'src.batch'
+    assert batch.moduleName('__main__', Spec()) == 'mocapToRig.src.batch'
+    assert batch.moduleName('__main__', None, 'src.batch') == 'src.batch'
+    assert batch.getPackageRoot('mocapToRig.src.batch',
+                                '/x/mocapToRig/src/batch.py') == '/x'
+
+
+def test_batch_run_as_main(tmpdir, fakeMayapy):
+    manifest = osp.join(str(tmpdir), 'manifest.json')
+    report = osp.join(str(tmpdir), 'report.json')
+    with open(manifest, 'w') as _file:
+        json.dump([job.toDict() for job in makeJobs(2, tmpdir)], _file)
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'src.batch', manifest, '--mayapy',
+         fakeMayapy, '--workers', '2', '--report', report],
+        cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    output = process.communicate()[0].decode('utf-8', 'replace')
+    assert process.returncode == 0, output
+    with open(report) as _file:
+        results = json.load(_file)['results']
+    assert [result['stages']['module'] for result in results] == [
+        'src.batch', 'src.batch']
+
+
+def test_job_runs_plain_chain_by_default(tmpdir):
+    job = Job.fromDict(makeJobs(1, tmpdir)[0].toDict())
+    assert job.useCache is False
+    data = dict(job.toDict(), useCache=True)
+    assert Job.fromDict(data).useCache is True
+
+
+def test_stage_times_sum_trace_events():
+    events = [{'name': 'bakeRig', 'dur': 1500000},
+              {'name': 'setRange', 'dur': 250000},
+              {'name': 'bakeRig', 'dur': 500000}]
+    assert batch.stageTimes(events) == {'bakeRig': 2.0, 'setRange': 0.25}
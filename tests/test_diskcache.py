@@ -0,0 +1,31 @@
+from src import diskcache
+from src.diskcache import DiskCache, hashFile
+
+
+def test_file_hash_reads_changed_files_only(tmp_path, monkeypatch):
+    cache = DiskCache(str(tmp_path / 'cache'))
+    rig = tmp_path / 'rig.ma'
+    rig.write_text(u'createNode joint;')
+    reads = []
+
+    def counted(path, *args):
+        reads.append(path)
+        return hashFile(path, *args)
+    monkeypatch.setattr(diskcache, 'hashFile', counted)
+
+    first = cache.fileHash(str(rig))
+    assert first == hashFile(str(rig))
+    assert cache.fileHash(str(rig)) == first
+    assert len(reads) == 1
+
+    rig.write_text(u'createNode joint -n "Hips";')
+    assert cache.fileHash(str(rig)) == hashFile(str(rig)) != first
+    assert len(reads) == 2
+
+
+def test_file_hashes_are_not_entries(tmp_path):
+    cache = DiskCache(str(tmp_path / 'cache'))
+    rig = tmp_path / 'rig.ma'
+    rig.write_text(u'createNode joint;')
+    cache.fileHash(str(rig))
+    assert cache.entries() == []
@@ -0,0 +1,70 @@
+import numpy as np
+
+from src import incremental
+from src.incremental import blockChecksums, blockWindows, diff
+
+
+def record(values, start=0, controls=None, blockSize=4):
+    times = np.arange(start, start + len(values), dtype=np.float64)
+    return {'version': incremental.VERSION, 'mocapMapping': 'iPi',
+            'rigMapping': 'AdvancedSkeleton', 'mocapSkeleton': 'a',
+            'rigSkeleton': 'b', 'sampleBy': 1, 'blockSize': blockSize,
+            'preprocess': None,
+            'range': [start, start + len(values) - 1],
+            'controls': controls or {'Hips_ctrl': 'x', 'Arm_ctrl': 'y'},
+            'blocks': blockChecksums(times, values, {'Hips': [0, 1],
+                                                     'Spine': [2]},
+                                     blockSize)}
+
+
+def take(frames=16):
+    return np.tile(np.arange(frames, dtype=np.float64)[:, None], (1, 3))
+
+
+def test_block_checksums_by_block():
+    values = take()
+    checksums = blockChecksums(np.arange(16.0), values, {'Hips': [0, 1]}, 4)
+    assert sorted(checksums['Hips']) == ['0', '1', '2', '3']
+    values[5, 1] += 1
+    changed = blockChecksums(np.arange(16.0), values, {'Hips': [0, 1]}, 4)
+    assert [block for block in sorted(changed['Hips'])
+            if changed['Hips'][block] != checksums['Hips'][block]] == ['1']
+
+
+def test_block_windows_merge_pad_and_clip():
+    assert blockWindows([0, 1, 3], 4, 1, 0, 15) == [(0, 8), (11, 15)]
+    assert blockWindows([5], 4, 2, 0, 15) == []
+
+
+def test_diff_without_record_is_full():
+    assert diff(None, record(take())).full
+
+
+def test_diff_same_take_is_clean():
+    assert diff(record(take()), record(take())).clean
+
+
+def test_diff_changed_frames():
+    values = take()
+    values[9, 2] = 100.0
+    dirty = diff(record(take()), record(values), margin=1)
+    assert not dirty.full
+    assert dirty.windows == [(7, 12)]
+    assert dirty.controls == []
+
+
+def test_diff_changed_controls():
+    dirty = diff(record(take()), record(take(), controls={
+        'Hips_ctrl': 'x', 'Arm_ctrl': 'z'}))
+    assert dirty.controls == ['Arm_ctrl'] and not dirty.windows
+
+
+def test_diff_shorter_take_is_full():
+    dirty = diff(record(take(16)), record(take(10)))
+    assert dirty.full
+    assert 'range changed' in dirty.reasons
+
+
+def test_diff_global_change_is_full():
+    changed = dict(record(take()), rigSkeleton='c')
+    assert diff(record(take()), changed).reasons == ['rigSkeleton changed']
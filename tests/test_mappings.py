@@ -0,0 +1,120 @@
+import json
+import os
+import pickle
+
+import pytest
+
+from src import mappings
+from src.mappings import (Mapping, MappingRegistry, MappingTypes,
+                          rankMappings, scoreMapping)
+
+
+MAPPING = {'Hips': 1, 'Spine': 8, 'Head': 15}
+
+SCENE = {'': {'Hips', 'Spine', 'persp'},
+         'take:': {'Hips', 'Spine', 'Head'},
+         'rig:': {'Spine'}}
+
+
+@pytest.mark.parametrize('namespace', ['take', 'take:', ':take', ':take:'])
+def test_score_namespace_forms(namespace):
+    assert scoreMapping(MAPPING, SCENE, namespace) == [
+        ('take:', 3, 3, True)]
+
+
+@pytest.mark.parametrize('namespace', ['', ':'])
+def test_score_root_namespace(namespace):
+    assert scoreMapping(MAPPING, SCENE, namespace) == [('', 2, 3, True)]
+
+
+def test_score_unknown_namespace():
+    assert scoreMapping(MAPPING, SCENE, 'other') == []
+
+
+def test_score_every_namespace():
+    scores = sorted(scoreMapping(MAPPING, SCENE))
+    assert scores == [('', 2, 3, True), ('rig:', 1, 3, False),
+                      ('take:', 3, 3, True)]
+
+
+def test_rank_in_namespace(monkeypatch):
+    import src.mappings as mappings
+    monkeypatch.setattr(mappings, 'loadMapping', lambda name, typ: MAPPING)
+    matches = rankMappings(SCENE, 'take', names=['iPi'])
+    assert [(m.mapping, m.namespace, m.coverage) for m in matches] == [
+        ('iPi', 'take:', 1.0)]
+
+
+def writeMapping(directory, name, items, typ=MappingTypes.sk):
+    path = directory.join('%s.%s.json' % (name, typ))
+    path.write(json.dumps(items))
+    return str(path)
+
+
+def test_registry_parses_once(tmpdir):
+    writeMapping(tmpdir, 'iPi', MAPPING)
+    registry = MappingRegistry(str(tmpdir))
+    first = registry.get('iPi')
+    assert registry.get('iPi') is first
+    assert (registry.hits, registry.misses) == (1, 1)
+    assert registry.names() == ['iPi']
+    assert registry.names(MappingTypes.cr) == []
+
+
+def test_registry_reparses_on_change(tmpdir):
+    path = writeMapping(tmpdir, 'iPi', MAPPING)
+    registry = MappingRegistry(str(tmpdir))
+    first = registry.get('iPi')
+    writeMapping(tmpdir, 'iPi', dict(MAPPING, Neck=14))
+    # the same size and mtime would hide the change
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+    second = registry.get('iPi')
+    assert second is not first
+    assert second.getElement(14) == 'Neck'
+    assert registry.misses == 2
+
+
+def test_dump_mapping_invalidates(tmpdir, monkeypatch):
+    registry = MappingRegistry(str(tmpdir))
+    monkeypatch.setattr(mappings, 'registry', registry)
+    mappings.dumpMapping(MAPPING, 'iPi')
+    first = mappings.loadMapping('iPi')
+    mappings.dumpMapping(dict(MAPPING, Hips=0), 'iPi')
+    assert mappings.loadMapping('iPi') is not first
+    assert mappings.loadMapping('iPi')['Hips'] == 0
+
+
+@pytest.mark.parametrize('edit', [
+    lambda m: m.__setitem__('Neck', 14),
+    lambda m: m.__delitem__('Hips'),
+    lambda m: m.update({'Neck': 14}),
+    lambda m: m.setdefault('Neck', 14),
+    lambda m: m.pop('Hips'),
+    lambda m: m.popitem(),
+    lambda m: m.clear()])
+def test_mapping_is_read_only(edit):
+    mapping = Mapping(MAPPING.items(), 'iPi')
+    with pytest.raises(TypeError):
+        edit(mapping)
+    assert dict(mapping) == MAPPING
+
+
+def test_mapping_copy_is_editable():
+    copy = Mapping(MAPPING.items(), 'iPi').copy()
+    copy['Neck'] = 14
+    assert copy['Neck'] == 14
+
+
+def test_mapping_duplicate_ids():
+    mapping = Mapping([('Hips', 1), ('LeftUpLeg', 2), ('Pelvis', 1)], 'x')
+    assert mapping.getElements(1) == ['Hips', 'Pelvis']
+    assert mapping.getElement(1) == 'Hips'
+    assert mapping.getElements(3) == [] and mapping.getElement(3) == ''
+    assert mapping.getIds() == [1, 2]
+
+
+def test_mapping_pickles():
+    mapping = Mapping(MAPPING.items(), 'iPi', MappingTypes.cr)
+    copy = pickle.loads(pickle.dumps(mapping))
+    assert (dict(copy), copy.name, copy.typ) == (MAPPING, 'iPi', 'cr')
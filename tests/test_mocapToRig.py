@@ -0,0 +1,17 @@
+from src import standin
+
+standin.install()
+
+from src import lazy  # noqa: E402
+from src import _mocapToRig as mr  # noqa: E402
+
+
+def test_plugins_load_before_hik(monkeypatch):
+    standin.scene.reset()
+    lazy.reset()
+    seen = []
+    monkeypatch.setitem(standin.MEL_PROCS, 'HIKCharacterControlsTool',
+                        lambda: seen.append(set(standin.scene.plugins)))
+    # nothing is selected, it stops after opening the HIK tool
+    mr.applyMocapToRig('take.fbx')
+    assert seen == [{'fbxmaya', 'mayaHIK'}]
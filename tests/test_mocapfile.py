@@ -0,0 +1,91 @@
+import numpy as np
+
+from src import mocapfile
+
+
+SECOND = int(mocapfile.FBX_TICKS_PER_SECOND)
+
+FBX = '''; FBX 7.4.0 project file
+FBXHeaderExtension:  {
+    FBXVersion: 7400
+}
+GlobalSettings:  {
+    Properties70:  {
+        P: "TimeMode", "enum", "", "",11
+    }
+}
+Objects:  {
+    Model: 1, "Model::Hips", "LimbNode" {
+        Properties70:  {
+            P: "Lcl Translation", "Lcl Translation", "", "A",0,100,0
+        }
+    }
+    Model: 2, "Model::Spine", "LimbNode" {
+    }
+    AnimationCurveNode: 3, "AnimCurveNode::R", "" {
+    }
+    AnimationCurve: 4, "AnimCurve::", "" {
+        KeyTime: *2 {
+            a: 0,%(second)d
+        }
+        KeyValueFloat: *2 {
+            a: 0,90
+        }
+    }
+    AnimationCurveNode: 5, "AnimCurveNode::T", "" {
+    }
+    AnimationCurve: 6, "AnimCurve::", "" {
+        KeyTime: *1 {
+            a: 0
+        }
+        KeyValueFloat: *1 {
+            a: 7
+        }
+    }
+}
+Connections:  {
+    C: "OO",1,0
+    C: "OO",2,1
+    C: "OP",3,2, "Lcl Rotation"
+    C: "OP",4,3, "d|Y"
+    C: "OP",5,1, "Lcl Translation"
+    C: "OP",6,5, "d|X"
+}
+Takes:  {
+    Take: "Take 001" {
+        LocalTime: 0,%(second)d
+    }
+}
+''' % {'second': SECOND}
+
+
+def writeFbx(tmpdir):
+    path = str(tmpdir.join('take.fbx'))
+    with open(path, 'w') as _file:
+        _file.write(FBX)
+    return path
+
+
+def test_read_fbx(tmpdir):
+    take = mocapfile.read(writeFbx(tmpdir))
+    assert take.joints == ['Hips', 'Spine']
+    assert take.parents == [-1, 0]
+    assert (take.frameCount, take.frameRate) == (25, 24.0)
+    assert np.allclose(take.data[:, 1, 4], np.linspace(0, 90, 25))
+    assert np.allclose(take.data[:, 0, :3], (7, 100, 0))
+    assert take.animated[1, 4] and take.animated[0, 0]
+    assert not take.animated[0, 1]
+
+
+def test_fbx_curves_are_handed_over_one_at_a_time(tmpdir):
+    seen = []
+    scene = mocapfile._parseFbx(writeFbx(tmpdir), onCurve=lambda uid, curve:
+                                seen.append((uid, len(curve['KeyTime']))))
+    assert seen == [(4, 2), (6, 1)]
+    assert all('KeyTime' not in curve for curve in scene.curves.values())
+
+
+def test_read_fbx_info_skips_keys(tmpdir):
+    info = mocapfile.readInfo(writeFbx(tmpdir))
+    assert info.frameRange == (0, 24)
+    assert info.rotateOrders == ['xyz', 'xyz']
@@ -0,0 +1,37 @@
+import pytest
+
+from src import standin
+
+standin.install()
+
+import pymel.core as pc  # noqa: E402
+from src import moctor  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def scene():
+    standin.scene.reset()
+    moctor.stances.clear()
+    yield standin.scene
+    moctor.stances.clear()
+
+
+@pytest.mark.parametrize('cleanup', ['cleanupMocapHIK', 'cleanupRigHIK'])
+def test_cleanup_forgets_stance(cleanup):
+    pc.createNode('HIKCharacterNode', 'MocapCharacter1')
+    moctor.stances['MocapCharacter1'] = object()
+    getattr(moctor, cleanup)('MocapCharacter1')
+    assert 'MocapCharacter1' not in moctor.stances
+
+
+def test_lock_captures_stance_on_request_only(scene):
+    pytest.importorskip('numpy')
+    pc.createNode('HIKCharacterNode', 'MocapCharacter1')
+    pc.createNode('joint', 'Hips')
+    mapping = {'Hips': 1}
+    moctor.lockDefinition('MocapCharacter1', '', mapping)
+    assert moctor.stances == {}
+    scene.calls.clear()
+    moctor.lockDefinition('MocapCharacter1', '', mapping, captureStance=True)
+    assert list(moctor.stances['MocapCharacter1'].rotations) == [1]
+    assert scene.calls['xform'] == 2
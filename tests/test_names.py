@@ -0,0 +1,32 @@
+from src import standin
+
+standin.install()
+
+import pymel.core as pc  # noqa: E402
+from src.names import NameAllocator  # noqa: E402
+
+
+def setup_function(function):
+    standin.scene.reset()
+
+
+def test_numbered_after_scene_names():
+    pc.createNode('transform', 'Rig')
+    pc.createNode('transform', 'Rig1')
+    assert NameAllocator().allocate('Rig', 2) == ['Rig2', 'Rig3']
+
+
+def test_reserved_until_created():
+    allocator = NameAllocator()
+    assert allocator.allocate('Character1') == ['Character1']
+    assert allocator.allocate('Character1') == ['Character2']
+
+
+def test_deleted_nodes_free_their_names():
+    allocator = NameAllocator()
+    name, = allocator.allocate('Character1')
+    pc.createNode('HIKCharacterNode', name)
+    assert allocator.allocate('Character1', reserve=False) == ['Character2']
+    assert name not in allocator.reserved
+    pc.delete(name)
+    assert allocator.allocate('Character1') == ['Character1']
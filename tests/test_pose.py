@@ -0,0 +1,44 @@
+from src import standin
+
+standin.install()
+
+import pymel.core as pc  # noqa: E402
+from src import lazy, pose  # noqa: E402
+
+
+def setup_function(function):
+    standin.scene.reset()
+    lazy.reset()
+
+
+def test_existing_keeps_order_and_drops_missing():
+    for name in ('Hips', 'Spine'):
+        pc.createNode('joint', name)
+    assert pose.existing(['Spine', 'Head', 'Hips']) == ['Spine', 'Hips']
+
+
+def test_existing_accepts_names_shared_by_nodes(monkeypatch):
+    # the short name is in two groups, ls answers with their paths
+    monkeypatch.setattr(standin, 'ls', lambda names, **kwargs: [
+        'grpA|Hips', 'grpB|Hips', 'grpA|Spine'])
+    assert pose.existing(['Hips', 'grpA|Spine', 'grpB|Spine']) == [
+        'Hips', 'grpA|Spine']
+
+
+def test_read_in_one_call():
+    pc.createNode('joint', 'Hips')
+    pc.createNode('joint', 'Spine')
+    pc.setAttr('Hips.rotate', 10, 20, 30)
+    pc.setAttr('Spine.translateX', 4)
+    pc.setAttr('Spine.rotate', l=True)
+    standin.scene.calls.clear()
+    read = pose.Pose.read(['Hips', 'Neck', 'Spine'],
+                          ('rotate', 'translateX'), locks=True)
+    assert read.nodes == ['Hips', 'Spine']
+    assert read.get('Hips', 'rotate') == (10, 20, 30)
+    assert read.get('Spine', 'translateX') == 4
+    assert read.isLocked('Spine', 'rotate')
+    assert not read.isLocked('Hips', 'rotate')
+    assert standin.scene.calls['mel.moctorGetAttrs'] == 1
+    assert standin.scene.calls['mel.moctorLockedAttrs'] == 1
+    assert not standin.scene.calls['getAttr']
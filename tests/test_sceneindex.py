@@ -0,0 +1,56 @@
+import pytest
+
+from src import standin
+
+standin.install()
+
+from src import sceneindex  # noqa: E402
+
+
+class Register(object):
+    ''' Stands in for maya's messages, counts the callbacks set up '''
+
+    def __init__(self):
+        self.active = 0
+
+    def __call__(self, callback):
+        self.active += 1
+
+        def unregister():
+            self.active -= 1
+        return unregister
+
+
+@pytest.fixture
+def register():
+    register = Register()
+    for index in (sceneindex.hikIndex, sceneindex.referenceIndex):
+        index.unwatch()
+        index.watch(register)
+    yield register
+    sceneindex.clear()
+
+
+def test_clear_removes_callbacks(register):
+    assert register.active == 2
+    sceneindex.clear()
+    assert register.active == 0
+    assert not sceneindex.hikIndex.watching
+    assert not sceneindex.referenceIndex.watching
+
+
+def test_clear_watches_again_on_lookup(register, monkeypatch):
+    sceneindex.clear()
+    monkeypatch.setattr(sceneindex, 'mayaCallbacks',
+                        lambda nodeTypes: register)
+    sceneindex.hikIndex.definitionOfJoint('Hips')
+    assert sceneindex.hikIndex.watching
+    assert register.active == 1
+
+
+def test_unwatch_stays_unwatched(register, monkeypatch):
+    sceneindex.hikIndex.unwatch()
+    monkeypatch.setattr(sceneindex, 'mayaCallbacks',
+                        lambda nodeTypes: register)
+    sceneindex.hikIndex.definitionOfJoint('Hips')
+    assert not sceneindex.hikIndex.watching
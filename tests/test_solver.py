@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+
+from src import solver
+from src.solver import (ControlStance, Retargeter, SkeletonStance,
+                        filterEuler, qfromEuler, qmul, qinv, qtoEuler)
+
+
+def sameRotation(a, b):
+    ''' q and -q are the same rotation '''
+    return np.allclose(np.abs((np.asarray(a) * np.asarray(b)).sum(-1)), 1.0)
+
+
+@pytest.mark.parametrize('order', solver.ROTATE_ORDERS)
+def test_euler_round_trip(order):
+    rng = np.random.RandomState(7)
+    angles = rng.uniform(-180, 180, (200, 3))
+    angles[:, 'xyz'.index(order[1])] = rng.uniform(-89, 89, 200)
+    quats = qfromEuler(angles, order)
+    back = qtoEuler(quats, order)
+    assert sameRotation(qfromEuler(back, order), quats)
+    assert np.allclose(back, angles, atol=1e-6)
+
+
+@pytest.mark.parametrize('order', solver.ROTATE_ORDERS)
+def test_euler_round_trip_gimbal_lock(order):
+    angles = np.zeros((2, 3))
+    angles[:, 'xyz'.index(order[1])] = (90.0, -90.0)
+    angles[:, 'xyz'.index(order[0])] = 30.0
+    quats = qfromEuler(angles, order)
+    assert sameRotation(qfromEuler(qtoEuler(quats, order), order), quats)
+
+
+def test_euler_order_is_first_axis_first():
+    # 'xyz' rotates about x first: z(90) * x(90)
+    quat = qfromEuler([90.0, 0.0, 90.0], 'xyz')
+    expected = qmul(qfromEuler([0, 0, 90.0]), qfromEuler([90.0, 0, 0]))
+    assert sameRotation(quat, expected)
+
+
+def test_filter_euler_continuity():
+    frames = np.linspace(0, 720, 145)
+    angles = np.zeros((len(frames), 2, 3))
+    angles[:, 0, 1] = frames
+    angles[:, 1, 0] = frames
+    orders = ['xyz', 'zxy']
+    # what a decomposition hands back: wrapped, flipped solutions
+    wrapped = qtoEuler(qfromEuler(angles[:, 0], 'xyz'), 'xyz')
+    raw = np.stack([wrapped, qtoEuler(qfromEuler(angles[:, 1], 'zxy'),
+                                      'zxy')], 1)
+    filtered = filterEuler(raw, orders, reference=angles[0])
+    assert np.abs(np.diff(filtered, axis=0)).max() < 10.0
+    for idx, order in enumerate(orders):
+        assert sameRotation(qfromEuler(filtered[:, idx], order),
+                            qfromEuler(raw[:, idx], order))
+    assert np.allclose(filtered[-1, 0, 1], 720.0, atol=1e-6)
+
+
+def test_retargeter_two_joint_chain():
+    identity = solver.qidentity()
+    source = SkeletonStance({1: identity, 9: identity},
+                            {1: np.array([0.0, 100.0, 0.0]),
+                             9: np.array([20.0, 150.0, 0.0])})
+    target = SkeletonStance({1: identity}, {1: np.array([0.0, 50.0, 0.0])})
+    hips = ControlStance('hips_ctrl', 1, identity, identity, [0, 0, 0],
+                         [0, 0, 0], [0, 50, 0], translates=True)
+    arm = ControlStance('arm_ctrl', 9, identity, identity, [0, 0, 0],
+                        [10, 25, 0], [10, 75, 0], parent='hips_ctrl')
+
+    frames = 5
+    times = np.arange(frames, dtype=np.float64)
+    hipsEuler = np.zeros((frames, 3))
+    hipsEuler[:, 1] = np.linspace(0, 90, frames)
+    armEuler = np.zeros((frames, 3))
+    armEuler[:, 2] = np.linspace(0, 60, frames)
+    hipsWorld = qfromEuler(hipsEuler)
+    # the arm bends about z in the space of the turning hips
+    armWorld = qmul(hipsWorld, qfromEuler(armEuler))
+    hipsPosition = np.zeros((frames, 3)) + (0.0, 100.0, 0.0)
+    hipsPosition[:, 0] = np.linspace(0, 20, frames)
+
+    solution = Retargeter(source, target, [hips, arm]).solve(
+        times, {1: hipsWorld, 9: armWorld},
+        {1: hipsPosition, 9: hipsPosition})
+
+    assert np.allclose(solution.rotations['hips_ctrl'], hipsEuler)
+    assert np.allclose(solution.rotations['arm_ctrl'], armEuler)
+    # translations scaled by the hip heights, 50 / 100
+    assert np.allclose(solution.translations['hips_ctrl'][:, 0],
+                       np.linspace(0, 10, frames))
+    assert 'arm_ctrl' not in solution.translations
+    local = qmul(qinv(hipsWorld), armWorld)
+    assert sameRotation(local, qfromEuler(armEuler))
+    assert [curve.plug for curve in solution.curves()][:3] == [
+        'hips_ctrl.translateX', 'hips_ctrl.translateY',
+        'hips_ctrl.translateZ']